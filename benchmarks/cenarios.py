@@ -0,0 +1,131 @@
+"""
+Cenários medidos pelo benchmark.
+
+Cada cenário recebe o Contexto, faz a preparação (fora da medição) e devolve
+a função que será cronometrada. Os cenários reproduzem o trabalho de dados
+das telas (sem desenhar widgets), sobre o DatabaseService real ligado ao
+cliente falso do Supabase.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from services import agenda, derivados
+from services.aggregates import AGREGADOS, agregar_frame
+from services.backends.supabase_backend import SupabaseBackend
+from services.cache import SharedDataCache
+from services.database import DatabaseService, MAX_CONCORRENCIA, PAGE_SIZE
+from services.lookups import lookup
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+
+try:
+    import plotly.express as px
+except ImportError:
+    px = None
+
+# Mesmo tamanho do histórico recente do dashboard
+HISTORICO_RECENTE = 200
+CADASTROS = ['clientes', 'produtos', 'servicos', 'atendentes']
+
+
+@dataclass
+class Contexto:
+    cliente: FakeSupabaseClient
+    db: DatabaseService  # sem cache: cada chamada refaz o trabalho todo
+    tabelas: dict        # tabelas já carregadas e tipadas (como no cache do app)
+
+
+def novo_db(cliente: FakeSupabaseClient, cache: SharedDataCache = None) -> DatabaseService:
+    return DatabaseService(cache=cache, backend=SupabaseBackend(client=cliente),
+                           max_concorrencia=MAX_CONCORRENCIA, page_size=PAGE_SIZE)
+
+
+def carga_completa(ctx: Contexto):
+    """fetch_all_tables: todas as tabelas, paginadas e em paralelo, já tipadas."""
+    return lambda: ctx.db.fetch_all_tables()
+
+
+def sincronizacao_delta(ctx: Contexto):
+    """Depois de uma venda, o cache relê transacoes por delta (marca d'água)."""
+    cache = SharedDataCache(ttl_segundos=3600, max_bytes=2**40)
+    db = novo_db(ctx.cliente, cache)
+    cache.get_tables(db, ['transacoes'])
+
+    def rodar():
+        db.insert('transacoes', {'valor_total': 10.0, 'pagamento': 'Pix', 'origem': 'Balcão',
+                                 'data_transacao': str(date.today()), 'id_cliente': 1})
+        cache.get_tables(db, ['transacoes'])
+    return rodar
+
+
+def dashboard(ctx: Contexto):
+    """KPIs, séries e rankings do dashboard (agregados no "servidor") + figuras, se houver plotly."""
+    db, t = ctx.db, ctx.tabelas
+
+    def rodar():
+        db.agregar('vendas_totais')
+        semanal = derivados.vendas_por_periodo(db, 'W')
+        pagamentos = db.agregar('vendas_por_pagamento')
+        ag_servico = db.agregar('agendamentos_por_servico')
+        ag_prof = db.agregar('atendimentos_por_profissional')
+        db.agregar('clientes_novos', desde=date.today().replace(day=1))
+        servicos = lookup(db, 'servicos', t['servicos']).mapear(ag_servico['id_servico'], padrao='N/A')
+        profs = lookup(db, 'atendentes', t['atendentes']).mapear(ag_prof['id_atendente'], padrao='N/A')
+        derivados.transacoes_recentes(db, t['clientes'], HISTORICO_RECENTE)
+        if px is not None:
+            px.area(semanal, x='periodo', y='valor_total')
+            px.pie(pagamentos, values='qtd', names='pagamento', hole=0.5)
+            px.bar(ag_servico.assign(nome=servicos), x='qtd', y='nome', orientation='h')
+            px.bar(ag_prof.assign(nome=profs), x='qtd', y='nome', orientation='h')
+    return rodar
+
+
+def agregados_pandas(ctx: Contexto):
+    """Os mesmos agregados calculados localmente (fallback de backend sem agregação)."""
+    def rodar():
+        for definicao in AGREGADOS.values():
+            agregar_frame(definicao, ctx.tabelas[definicao.tabela])
+    return rodar
+
+
+def inicio(ctx: Contexto):
+    """Tela inicial: agendamentos de hoje tipados e ordenados."""
+    return lambda: derivados.agendamentos_do_dia(ctx.db, ctx.tabelas['agendamentos'], date.today())
+
+
+def grade_agenda(ctx: Contexto):
+    """Índice da agenda, grade de uma semana de cada profissional e busca de horário livre."""
+    df_ag, atendentes = ctx.tabelas['agendamentos'], ctx.tabelas['atendentes']
+    hoje = date.today()
+
+    def rodar():
+        indice = agenda.IndiceAgenda(df_ag)
+        for d in range(7):
+            for prof in atendentes['id']:
+                agenda.grade_dia(indice.intervalos_do_dia(hoje + timedelta(days=d), prof))
+        agenda.proximos_horarios(indice, atendentes, 60, hoje, hoje + timedelta(days=30), n=10)
+    return rodar
+
+
+def listagem_crud(ctx: Contexto):
+    """Listagem e seleção de registro dos cadastros (components/crud.py)."""
+    def rodar():
+        for tabela in CADASTROS:
+            df = ctx.tabelas[tabela]
+            indice = lookup(ctx.db, tabela, df)
+            df.drop(columns=[c for c in ('id', 'created_at') if c in df.columns])
+            if len(indice):
+                indice.linha(indice.ids[len(indice) // 2])
+    return rodar
+
+
+# A delta fica por último porque grava no cliente falso
+CENARIOS = {
+    'carga_completa': carga_completa,
+    'dashboard': dashboard,
+    'agregados_pandas': agregados_pandas,
+    'inicio': inicio,
+    'grade_agenda': grade_agenda,
+    'listagem_crud': listagem_crud,
+    'sincronizacao_delta': sincronizacao_delta,
+}
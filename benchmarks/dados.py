@@ -0,0 +1,153 @@
+"""
+Gerador de dados sintéticos (reprodutível pela semente) para os benchmarks.
+
+A escala é o número de linhas das tabelas de histórico (transacoes e
+agendamentos); compras fica com 1/10 disso e os cadastros crescem bem
+menos, como numa loja real. Os valores seguem o formato que o banco devolve
+(datas em texto ISO, ids inteiros, nulos como None).
+"""
+import numpy as np
+import pandas as pd
+
+ESCALAS = {'1k': 1_000, '100k': 100_000, '1M': 1_000_000}
+
+PAGAMENTOS = ['Pix', 'Dinheiro', 'Cartão', 'Boleto', 'Doação']
+PESOS_PAGAMENTO = [0.45, 0.25, 0.22, 0.03, 0.05]
+TIPOS_PRODUTO = ['Chá', 'Óleo', 'Tintura', 'Cápsula', 'Pomada', 'Xarope']
+ERVAS = ['Camomila', 'Hortelã', 'Erva-doce', 'Boldo', 'Alecrim', 'Lavanda', 'Guaco', 'Melissa',
+         'Gengibre', 'Canela', 'Calêndula', 'Arnica', 'Espinheira-santa', 'Carqueja', 'Cavalinha']
+SERVICOS = [('Massagem', 60), ('Reflexologia', 45), ('Acupuntura', 45), ('Reiki', 30), ('Ventosaterapia', 30),
+            ('Drenagem', 60), ('Auriculoterapia', 30), ('Quick massage', 30), ('Aromaterapia', 45),
+            ('Consulta naturopata', 60), ('Shiatsu', 60), ('Moxabustão', 30), ('Florais', 30),
+            ('Pedras quentes', 90), ('Bambuterapia', 60)]
+NOMES = ['Ana', 'Maria', 'José', 'João', 'Francisca', 'Antônio', 'Carlos', 'Paulo', 'Lúcia', 'Pedro',
+         'Márcia', 'Luiz', 'Rita', 'Sandra', 'Rafael', 'Juliana', 'Marcos', 'Helena', 'Tereza', 'Vera']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Costa',
+              'Rodrigues', 'Almeida', 'Nascimento', 'Carvalho', 'Mosquer', 'Sartori', 'Ribeiro']
+
+# Dias de histórico gerados (até hoje) e dias de agenda futura
+DIAS_HISTORICO = 730
+DIAS_FUTUROS = 60
+
+
+def _datas(rng, n: int, hoje: pd.Timestamp, dias_antes: int, dias_depois: int = 0) -> pd.Series:
+    dias = rng.integers(-dias_antes, dias_depois + 1, n)
+    return pd.Series(hoje + pd.to_timedelta(dias, unit='D'))
+
+
+def _horas(rng, n: int, inicio: int = 8 * 60, fim: int = 19 * 60, passo: int = 1) -> np.ndarray:
+    """Minutos do dia sorteados no expediente, múltiplos de `passo`."""
+    return rng.integers(inicio // passo, fim // passo, n) * passo
+
+
+def _nomes_pessoas(rng, n: int) -> list:
+    nomes = rng.choice(NOMES, n)
+    sobrenomes = rng.choice(SOBRENOMES, (n, 2))
+    return [f"{a} {b} {c}" for a, (b, c) in zip(nomes, sobrenomes)]
+
+
+def gerar(escala, semente: int = 42, hoje=None) -> dict:
+    """
+    Devolve {tabela: DataFrame} com todas as tabelas do app, inclusive
+    vendas_diarias já consolidada a partir das transações geradas.
+    `escala` pode ser '1k', '100k', '1M' ou um número de linhas.
+    """
+    n = ESCALAS[escala] if isinstance(escala, str) else int(escala)
+    rng = np.random.default_rng(semente)
+    hoje = pd.Timestamp(hoje or pd.Timestamp.now()).normalize()
+
+    n_cli = max(50, n // 20)
+    clientes = pd.DataFrame({
+        'id': np.arange(1, n_cli + 1),
+        'created_at': (_datas(rng, n_cli, hoje, DIAS_HISTORICO)
+                       + pd.to_timedelta(_horas(rng, n_cli), unit='min')).dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'nome': _nomes_pessoas(rng, n_cli),
+        'cpf': [f"{c:011d}" for c in rng.integers(10**9, 10**11, n_cli)],
+        'telefone': [f"119{t:08d}" for t in rng.integers(0, 10**8, n_cli)],
+    })
+
+    n_prod = len(TIPOS_PRODUTO) * len(ERVAS)
+    produtos = pd.DataFrame({
+        'id': np.arange(1, n_prod + 1),
+        'created_at': (hoje - pd.Timedelta(days=DIAS_HISTORICO)).strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'nome': [f"{t} de {e}" for t in TIPOS_PRODUTO for e in ERVAS],
+        'tipo': [t for t in TIPOS_PRODUTO for _ in ERVAS],
+        'valor_original': rng.integers(800, 12000, n_prod) / 100,
+        'estoque': rng.integers(0, 200, n_prod),
+    })
+
+    servicos = pd.DataFrame({
+        'id': np.arange(1, len(SERVICOS) + 1),
+        'created_at': produtos['created_at'].iloc[0],
+        'nome': [s for s, _ in SERVICOS],
+        'valor': rng.integers(60, 250, len(SERVICOS)).astype(float),
+        'duracao_estimada': [d for _, d in SERVICOS],
+    })
+
+    n_prof = 8
+    atendentes = pd.DataFrame({
+        'id': np.arange(1, n_prof + 1),
+        'created_at': produtos['created_at'].iloc[0],
+        'nome': _nomes_pessoas(rng, n_prof),
+        'ativo': [True] * (n_prof - 1) + [False],
+        'observacao': None,
+        'valor': 50.0,
+    })
+
+    pagamento = rng.choice(PAGAMENTOS, n, p=PESOS_PAGAMENTO)
+    valor = np.where(pagamento == 'Doação', 0.0, rng.gamma(2.0, 40.0, n).round(2))
+    id_cliente = rng.integers(1, n_cli + 1, n).astype(object)
+    id_cliente[rng.random(n) < 0.3] = None  # consumidor final
+    data_transacao = (_datas(rng, n, hoje, DIAS_HISTORICO)
+                      + pd.to_timedelta(_horas(rng, n) * 60 + rng.integers(0, 60, n), unit='s'))
+    transacoes = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'created_at': data_transacao.dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'data_transacao': data_transacao.dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'pagamento': pagamento,
+        'origem': rng.choice(['Balcão', 'Agendamento'], n, p=[0.8, 0.2]),
+        'valor_total': valor,
+        'id_cliente': id_cliente,
+    })
+
+    n_comp = max(10, n // 10)
+    id_produto = rng.integers(1, n_prod + 1, n_comp)
+    quantidade = rng.integers(1, 50, n_comp)
+    data_compra = _datas(rng, n_comp, hoje, DIAS_HISTORICO)
+    compras = pd.DataFrame({
+        'id': np.arange(1, n_comp + 1),
+        'created_at': data_compra.dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'id_produto': id_produto,
+        'quantidade': quantidade,
+        'valor_total': (produtos['valor_original'].to_numpy()[id_produto - 1] * 0.5 * quantidade).round(2),
+        'fornecedor': rng.choice(['Distribuidora Verde', 'Ervanário Central', 'Natural Sul', None], n_comp),
+        'data_compra': data_compra.dt.strftime('%Y-%m-%d'),
+    })
+
+    data_ag = _datas(rng, n, hoje, DIAS_HISTORICO, DIAS_FUTUROS)
+    passado = (data_ag < hoje).to_numpy()
+    status = np.where(passado, rng.choice(['Concluído', 'Cancelado'], n, p=[0.9, 0.1]),
+                      rng.choice(['Agendado', 'Cancelado'], n, p=[0.95, 0.05]))
+    minutos = _horas(rng, n, fim=18 * 60 + 30, passo=15)
+    agendamentos = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'created_at': (data_ag - pd.Timedelta(days=7)).dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'id_cliente': rng.integers(1, n_cli + 1, n),
+        'id_servico': rng.integers(1, len(SERVICOS) + 1, n),
+        'id_atendente': rng.integers(1, n_prof + 1, n),
+        'data_agendamento': data_ag.dt.strftime('%Y-%m-%d'),
+        'horario': [f"{m // 60:02d}:{m % 60:02d}:00" for m in minutos],
+        'status': status,
+    })
+
+    vendas_diarias = (
+        transacoes.assign(data=transacoes['data_transacao'].str[:10])
+        .groupby(['data', 'pagamento'], as_index=False)
+        .agg(qtd=('id', 'count'), valor_total=('valor_total', 'sum'))
+    )
+
+    return {
+        'clientes': clientes, 'produtos': produtos, 'servicos': servicos, 'atendentes': atendentes,
+        'transacoes': transacoes, 'compras': compras, 'agendamentos': agendamentos,
+        'vendas_diarias': vendas_diarias,
+    }
@@ -0,0 +1,256 @@
+"""
+Cliente falso, em memória, com a mesma API de query builder do supabase-py
+usada por SupabaseBackend:
+
+    client.table('agendamentos').select("*, clientes(nome)").eq('id', 3) \\
+          .order('id', desc=True).range(0, 999).execute().data
+    client.rpc('agg_vendas_totais', {'p_desde': None}).execute().data
+
+As tabelas ficam em DataFrames (uma linha por registro, valores no formato
+do JSON da API). A ordenação de cada consulta é guardada, então paginar uma
+tabela grande não reordena tudo a cada página. `latencia` (segundos) simula
+a ida e volta da rede em cada execute().
+"""
+import json
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.aggregates import AGREGADOS, agregar_frame
+from services.backends.base import CHAVES_ESTRANGEIRAS
+
+_COMPARADORES = {
+    'eq': lambda s, v: s == v, 'neq': lambda s, v: s != v,
+    'gt': lambda s, v: s > v, 'gte': lambda s, v: s >= v,
+    'lt': lambda s, v: s < v, 'lte': lambda s, v: s <= v,
+    'in': lambda s, v: s.isin(list(v)),
+}
+
+_EMBUTIDO = re.compile(r'^(\w+)\((.*)\)$')
+
+
+def _separar_colunas(colunas: str) -> list:
+    """Divide "a, b, rel(x, y)" nas vírgulas de primeiro nível."""
+    partes, nivel, atual = [], 0, ''
+    for ch in colunas:
+        if ch == ',' and nivel == 0:
+            partes.append(atual.strip())
+            atual = ''
+            continue
+        nivel += (ch == '(') - (ch == ')')
+        atual += ch
+    if atual.strip():
+        partes.append(atual.strip())
+    return partes
+
+
+def _registros(df: pd.DataFrame) -> list:
+    """Linhas como dicts com tipos do Python e None no lugar de NaN (como no JSON)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class Resposta:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Consulta:
+    def __init__(self, cliente, tabela: str):
+        self._cliente = cliente
+        self.tabela = tabela
+        self.operacao = 'select'
+        self.colunas = '*'
+        self.dados = None
+        self.filtros = []
+        self.ordem = []
+        self.faixa = None
+
+    def select(self, colunas: str = '*'):
+        self.operacao, self.colunas = 'select', colunas
+        return self
+
+    def insert(self, dados):
+        self.operacao, self.dados = 'insert', dados
+        return self
+
+    def update(self, dados: dict):
+        self.operacao, self.dados = 'update', dados
+        return self
+
+    def delete(self):
+        self.operacao = 'delete'
+        return self
+
+    def _filtro(self, coluna, op, valor):
+        self.filtros.append((coluna, op, valor))
+        return self
+
+    def eq(self, coluna, valor):
+        return self._filtro(coluna, 'eq', valor)
+
+    def neq(self, coluna, valor):
+        return self._filtro(coluna, 'neq', valor)
+
+    def gt(self, coluna, valor):
+        return self._filtro(coluna, 'gt', valor)
+
+    def gte(self, coluna, valor):
+        return self._filtro(coluna, 'gte', valor)
+
+    def lt(self, coluna, valor):
+        return self._filtro(coluna, 'lt', valor)
+
+    def lte(self, coluna, valor):
+        return self._filtro(coluna, 'lte', valor)
+
+    def in_(self, coluna, valores):
+        return self._filtro(coluna, 'in', valores)
+
+    def order(self, coluna: str, desc: bool = False):
+        self.ordem.append((coluna, desc))
+        return self
+
+    def range(self, inicio: int, fim: int):
+        self.faixa = (inicio, fim)
+        return self
+
+    def limit(self, n: int):
+        self.faixa = (0, n - 1)
+        return self
+
+    def execute(self) -> Resposta:
+        return self._cliente._executar(self)
+
+
+class _Rpc:
+    def __init__(self, cliente, funcao: str, params: dict):
+        self._cliente, self.funcao, self.params = cliente, funcao, params
+
+    def execute(self) -> Resposta:
+        return self._cliente._executar_rpc(self.funcao, self.params)
+
+
+class FakeSupabaseClient:
+    """Substituto do supabase.Client para medir o app sem rede nem servidor."""
+
+    def __init__(self, tabelas: dict, latencia: float = 0.0):
+        self.tabelas = {nome: df.reset_index(drop=True) for nome, df in tabelas.items()}
+        self.latencia = latencia
+        self._lock = threading.Lock()
+        self._ordens = {}     # (tabela, filtros, ordem) -> posições já ordenadas
+        self._embutidos = {}  # (tabela, colunas) -> {id: dict}
+        # Contadores por execute(): chamadas, linhas devolvidas e bytes do JSON
+        self.requisicoes = 0
+        self.linhas = 0
+        self.bytes = 0
+
+    def table(self, nome: str) -> _Consulta:
+        return _Consulta(self, nome)
+
+    def rpc(self, funcao: str, params: dict = None) -> _Rpc:
+        return _Rpc(self, funcao, params or {})
+
+    # --- Execução ---
+    def _responder(self, linhas: list) -> Resposta:
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            self.requisicoes += 1
+            self.linhas += len(linhas)
+            self.bytes += len(json.dumps(linhas, default=str))
+        return Resposta(linhas)
+
+    def _mascara(self, df: pd.DataFrame, filtros: list) -> np.ndarray:
+        mascara = np.ones(len(df), dtype=bool)
+        for coluna, op, valor in filtros:
+            mascara &= _COMPARADORES[op](df[coluna], valor).to_numpy(dtype=bool)
+        return mascara
+
+    def _posicoes(self, consulta: _Consulta) -> np.ndarray:
+        chave = (consulta.tabela, repr(consulta.filtros), tuple(consulta.ordem))
+        with self._lock:
+            if chave in self._ordens:
+                return self._ordens[chave]
+        df = self.tabelas[consulta.tabela]
+        pos = np.flatnonzero(self._mascara(df, consulta.filtros))
+        if consulta.ordem and len(pos):
+            sub = df.iloc[pos]
+            ordenado = sub.sort_values([c for c, _ in consulta.ordem],
+                                       ascending=[not d for _, d in consulta.ordem], kind='stable')
+            # o índice das tabelas é 0..n-1, então ele já é a posição de cada linha
+            pos = ordenado.index.to_numpy()
+        with self._lock:
+            self._ordens[chave] = pos
+        return pos
+
+    def _mapa_embutido(self, tabela: str, colunas: str) -> dict:
+        chave = (tabela, colunas)
+        if chave not in self._embutidos:
+            df = self.tabelas[tabela]
+            cols = [c.strip() for c in colunas.split(',')] if colunas.strip() != '*' else list(df.columns)
+            self._embutidos[chave] = dict(zip(df['id'].tolist(), _registros(df[cols])))
+        return self._embutidos[chave]
+
+    def _select(self, consulta: _Consulta) -> list:
+        df = self.tabelas[consulta.tabela]
+        pos = self._posicoes(consulta)
+        if consulta.faixa:
+            pos = pos[consulta.faixa[0]:consulta.faixa[1] + 1]
+        pagina = df.iloc[pos]
+
+        simples, embutidos = [], []
+        for parte in _separar_colunas(consulta.colunas):
+            achado = _EMBUTIDO.match(parte)
+            if achado:
+                embutidos.append(achado.groups())
+            elif parte == '*':
+                simples.extend(df.columns)
+            else:
+                simples.append(parte)
+
+        linhas = _registros(pagina[list(dict.fromkeys(simples))])
+        for rel, cols in embutidos:
+            mapa = self._mapa_embutido(rel, cols)
+            fks = pagina[CHAVES_ESTRANGEIRAS[rel]].tolist()
+            for linha, fk in zip(linhas, fks):
+                linha[rel] = mapa.get(fk) if fk is not None and not pd.isna(fk) else None
+        return linhas
+
+    def _invalidar(self, tabela: str):
+        with self._lock:
+            self._ordens = {k: v for k, v in self._ordens.items() if k[0] != tabela}
+            self._embutidos = {k: v for k, v in self._embutidos.items() if k[0] != tabela}
+
+    def _executar(self, consulta: _Consulta) -> Resposta:
+        if consulta.operacao == 'select':
+            return self._responder(self._select(consulta))
+
+        df = self.tabelas[consulta.tabela]
+        if consulta.operacao == 'insert':
+            novos = pd.DataFrame(consulta.dados if isinstance(consulta.dados, list) else [consulta.dados])
+            proximo = int(df['id'].max()) + 1 if len(df) else 1
+            novos.insert(0, 'id', np.arange(proximo, proximo + len(novos)))
+            self.tabelas[consulta.tabela] = pd.concat([df, novos], ignore_index=True)
+            afetadas = novos
+        else:
+            mascara = self._mascara(df, consulta.filtros)
+            if consulta.operacao == 'update':
+                for coluna, valor in consulta.dados.items():
+                    df.loc[mascara, coluna] = valor
+                afetadas = df[mascara]
+            else:
+                afetadas = df[mascara]
+                self.tabelas[consulta.tabela] = df[~mascara].reset_index(drop=True)
+        self._invalidar(consulta.tabela)
+        return self._responder(_registros(afetadas))
+
+    def _executar_rpc(self, funcao: str, params: dict) -> Resposta:
+        # agg_<nome>: agregado calculado "no servidor", só o resumo trafega
+        if funcao.startswith('agg_') and funcao[4:] in AGREGADOS:
+            definicao = AGREGADOS[funcao[4:]]
+            resultado = agregar_frame(definicao, self.tabelas[definicao.tabela], params.get('p_desde'))
+            return self._responder(_registros(resultado))
+        raise Exception(f"Função {funcao} não existe no cliente falso")
@@ -0,0 +1,151 @@
+"""
+Roda os cenários de benchmarks/cenarios.py sobre dados sintéticos e compara
+com a linha de base guardada.
+
+    python -m benchmarks.run --escala 100k
+    python -m benchmarks.run --escala 1M --repeticoes 3 --cenarios carga_completa,dashboard
+    python -m benchmarks.run --escala 100k --salvar-baseline   # grava a nova linha de base
+
+O resultado vai para benchmarks/resultados/<escala>.json. Havendo
+benchmarks/baseline/<escala>.json, cada cenário é comparado pela mediana e o
+comando sai com código 1 se algum ficou mais lento que a tolerância.
+Linhas de base só valem para a mesma máquina: gere-as no PC de referência.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from services import schema
+
+from benchmarks.cenarios import CENARIOS, Contexto, novo_db
+from benchmarks.dados import ESCALAS, gerar
+from benchmarks.fake_supabase import FakeSupabaseClient
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+TOLERANCIA = 0.25  # 25% mais lento que a linha de base conta como regressão
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        'mediana_s': statistics.median(tempos),
+        'min_s': min(tempos),
+        'max_s': max(tempos),
+        'repeticoes': repeticoes,
+    }
+
+
+def executar(escala: str, repeticoes: int, cenarios: list, semente: int, latencia: float) -> dict:
+    inicio = time.perf_counter()
+    cliente = FakeSupabaseClient(gerar(escala, semente), latencia=latencia)
+    print(f"Dados gerados ({escala}) em {time.perf_counter() - inicio:.1f} s")
+
+    db = novo_db(cliente)
+    ctx = Contexto(cliente=cliente, db=db, tabelas=db.fetch_all_tables())
+
+    resultados = {}
+    for nome in cenarios:
+        funcao = CENARIOS[nome](ctx)
+        antes = (cliente.requisicoes, cliente.linhas, cliente.bytes)
+        medida = medir(funcao, repeticoes)
+        medida.update({
+            'requisicoes': (cliente.requisicoes - antes[0]) // repeticoes,
+            'linhas': (cliente.linhas - antes[1]) // repeticoes,
+            'bytes': (cliente.bytes - antes[2]) // repeticoes,
+        })
+        resultados[nome] = medida
+        print(f"  {nome:<22} {medida['mediana_s'] * 1000:10.1f} ms  ({medida['requisicoes']} req)")
+
+    memoria = schema.relatorio_memoria(ctx.tabelas)
+    return {
+        'escala': escala,
+        'semente': semente,
+        'latencia_s': latencia,
+        'quando': datetime.now().isoformat(timespec='seconds'),
+        'maquina': {'python': platform.python_version(), 'pandas': pd.__version__,
+                    'sistema': platform.platform(), 'processador': platform.processor()},
+        'memoria_mb': {r.tabela: round(r.MB, 2) for r in memoria.itertuples()},
+        'cenarios': resultados,
+    }
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list:
+    """Imprime a comparação cenário a cenário e devolve os nomes que regrediram."""
+    regressoes = []
+    print(f"\nComparação com a linha de base de {base.get('quando', '?')} (tolerância {tolerancia:.0%}):")
+    for nome, medida in atual['cenarios'].items():
+        anterior = base.get('cenarios', {}).get(nome)
+        if not anterior:
+            print(f"  {nome:<22} sem linha de base")
+            continue
+        razao = medida['mediana_s'] / anterior['mediana_s'] if anterior['mediana_s'] else float('inf')
+        situacao = 'ok'
+        if razao > 1 + tolerancia:
+            situacao = 'REGRESSÃO'
+            regressoes.append(nome)
+        elif razao < 1 - tolerancia:
+            situacao = 'melhorou'
+        print(f"  {nome:<22} {anterior['mediana_s'] * 1000:10.1f} -> {medida['mediana_s'] * 1000:10.1f} ms"
+              f"  x{razao:.2f}  {situacao}")
+    return regressoes
+
+
+def _gravar(caminho: str, dados: dict):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do Fluxo de Caixa com dados sintéticos.")
+    parser.add_argument('--escala', choices=list(ESCALAS), default='1k')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--cenarios', help="lista separada por vírgula (padrão: todos)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help="ida e volta simulada por requisição")
+    parser.add_argument('--saida', help="arquivo JSON do resultado")
+    parser.add_argument('--baseline', help="arquivo JSON da linha de base")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--salvar-baseline', action='store_true', help="grava o resultado como nova linha de base")
+    args = parser.parse_args(argv)
+
+    cenarios = args.cenarios.split(',') if args.cenarios else list(CENARIOS)
+    desconhecidos = [c for c in cenarios if c not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"cenários desconhecidos: {', '.join(desconhecidos)}")
+
+    resultado = executar(args.escala, args.repeticoes, cenarios, args.semente, args.latencia_ms / 1000)
+
+    saida = args.saida or os.path.join(PASTA, 'resultados', f"{args.escala}.json")
+    _gravar(saida, resultado)
+    print(f"\nResultado gravado em {saida}")
+
+    baseline = args.baseline or os.path.join(PASTA, 'baseline', f"{args.escala}.json")
+    if args.salvar_baseline:
+        _gravar(baseline, resultado)
+        print(f"Linha de base gravada em {baseline}")
+        return 0
+    if not os.path.exists(baseline):
+        print("Sem linha de base para comparar (use --salvar-baseline).")
+        return 0
+    with open(baseline, encoding='utf-8') as f:
+        regressoes = comparar(resultado, json.load(f), args.tolerancia)
+    if regressoes:
+        print(f"\nRegressões: {', '.join(regressoes)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
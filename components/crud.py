@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
+from services.lookups import lookup
+from services.importacao import CAMPOS_INTEIROS, ler_planilha, preparar, gravar
 
-def render_generic_crud(table_name: str, title: str, fields: list, df_current: pd.DataFrame):
+def render_generic_crud(table_name: str, title: str, fields: list, df_current: pd.DataFrame, import_keys: list = None):
     """
     Renderiza uma interface CRUD genérica para uma tabela.
     Usa o serviço de banco injetado na sessão.
+    import_keys: campos que identificam um registro já existente na importação
+    em lote (na ordem de preferência); sem eles a tela não oferece importação.
     """
     db = st.session_state['db_service']
     
@@ -55,7 +59,7 @@ def render_generic_crud(table_name: str, title: str, fields: list, df_current: p
                             for k, v in payload.items():
                                 field_config = next((f for f in fields if f['name'] == k), None)
                                 if field_config:
-                                    if k in ['estoque', 'quantidade', 'duracao_estimada']:
+                                    if k in CAMPOS_INTEIROS:
                                         clean_payload[k] = int(v)
                                     else:
                                         clean_payload[k] = v
@@ -68,7 +72,7 @@ def render_generic_crud(table_name: str, title: str, fields: list, df_current: p
     # 3. UPDATE / DELETE
     with c2:
         with st.expander(f"✏️ Alterar ou Apagar {title}", expanded=False):
-            opts = df_current.set_index('id')['nome'].to_dict() if not df_current.empty else {}
+            opts = lookup(db, table_name, df_current).nomes
             sel_id = st.selectbox(f"Escolha {title} para mudar", [None] + list(opts.keys()), format_func=lambda x: opts[x] if x else "Selecione...")
 
             if sel_id:
@@ -87,7 +91,7 @@ def render_generic_crud(table_name: str, title: str, fields: list, df_current: p
                         elif f['type'] == 'textarea':
                             payload_edit[f['name']] = st.text_area(f['label'], value=str(current_val) if pd.notna(current_val) else "")
                         elif f['type'] == 'checkbox':
-                            payload_edit[f['name']] = st.checkbox(f['label'], value=bool(current_val))
+                            payload_edit[f['name']] = st.checkbox(f['label'], value=bool(current_val) if pd.notna(current_val) else False)
 
                     col_save, col_del = st.columns(2)
                     
@@ -112,4 +116,51 @@ def render_generic_crud(table_name: str, title: str, fields: list, df_current: p
                             except Exception as e:
                                 st.error("Erro ao apagar. Verifique se não há vendas ou agendamentos vinculados.")
                         else:
-                            st.warning("Marque a caixa de confirmação acima para apagar.")
\ No newline at end of file
+                            st.warning("Marque a caixa de confirmação acima para apagar.")
+
+    # 4. IMPORTAÇÃO EM LOTE
+    if import_keys:
+        render_importacao(table_name, title, fields, df_current, import_keys)
+
+
+def render_importacao(table_name: str, title: str, fields: list, df_current: pd.DataFrame, import_keys: list):
+    """Importa uma planilha inteira: valida tudo antes e grava em lotes."""
+    db = st.session_state['db_service']
+
+    with st.expander(f"📥 Importar planilha de {title}", expanded=False):
+        colunas = ', '.join(f"**{f['name']}**" for f in fields)
+        st.caption(f"CSV ou Excel com as colunas {colunas}. Quem já estiver cadastrado "
+                   f"(mesmo {' ou '.join(import_keys)}) é atualizado; células vazias mantêm o valor atual.")
+        arquivo = st.file_uploader("Planilha", type=['csv', 'xlsx'], key=f"import_{table_name}")
+        if arquivo is None:
+            return
+
+        try:
+            plano = preparar(ler_planilha(arquivo), fields, df_current, import_keys)
+        except Exception as e:
+            st.error(f"Não consegui ler a planilha: {e}")
+            return
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Novos", len(plano.novos))
+        c2.metric("Atualizar", len(plano.atualizar))
+        c3.metric("Com erro", plano.erros['linha'].nunique())
+        if plano.ignoradas:
+            st.caption(f"{plano.ignoradas} linha(s) repetida(s) na planilha: vale a última.")
+
+        if not plano.erros.empty:
+            st.warning("As linhas abaixo têm erro e não serão importadas.")
+            st.dataframe(plano.erros, use_container_width=True, hide_index=True)
+            st.download_button("Baixar erros (CSV)", plano.erros.to_csv(index=False).encode('utf-8'),
+                               file_name=f"erros_{table_name}.csv", mime='text/csv')
+
+        total = len(plano.novos) + len(plano.atualizar)
+        if st.button(f"Importar {total} linha(s)", disabled=total == 0, key=f"import_btn_{table_name}"):
+            barra = st.progress(0.0, text="Gravando...")
+            try:
+                feitos = gravar(db, table_name, plano,
+                                on_progress=lambda n, t: barra.progress(n / t, text=f"Gravando... {n}/{t}"))
+                st.success(f"Importação concluída: {feitos['inseridos']} novo(s), {feitos['atualizados']} atualizado(s).")
+                st.session_state['refresh'] = True
+            except Exception as e:
+                st.error(f"Erro ao importar (as linhas anteriores ao erro já foram gravadas): {e}")
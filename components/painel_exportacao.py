@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import streamlit as st
+from services.database import TODAS_TABELAS
+from services.exportacao import COLUNA_DATA, FORMATOS, exportar, nome_arquivo
+
+# Uma pasta só para os arquivos gerados; os esquecidos (sessão fechada) são apagados depois de VALIDADE_S
+PASTA = os.path.join(tempfile.gettempdir(), "fluxo_exportacao")
+VALIDADE_S = 3600
+
+def _limpar_antigos():
+    limite = time.time() - VALIDADE_S
+    for entrada in os.scandir(PASTA):
+        try:
+            if entrada.is_file() and entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+        except OSError:
+            pass  # já apagado por outra sessão
+
+def render_exportacao(db):
+    """Exporta uma tabela (ou um período dela) para CSV/Parquet, gravando direto em arquivo."""
+    with st.expander("📤 Exportar dados (contabilidade)", expanded=False):
+        c1, c2 = st.columns([2, 1])
+        tabela = c1.selectbox("Tabela", list(COLUNA_DATA) + [t for t in TODAS_TABELAS if t not in COLUNA_DATA],
+                              key="exportar_tabela")
+        formato = c2.radio("Formato", FORMATOS, horizontal=True, key="exportar_formato",
+                           format_func=str.upper)
+
+        inicio = fim = None
+        if tabela in COLUNA_DATA:
+            hoje = datetime.now().date()
+            periodo = st.date_input("Período", value=(hoje.replace(day=1), hoje), format="DD/MM/YYYY",
+                                    key="exportar_periodo")
+            if len(periodo) != 2:
+                st.caption("Escolha o último dia do período.")
+                return
+            inicio, fim = periodo
+
+        if st.button("Gerar arquivo", key="exportar_gerar"):
+            anterior = st.session_state.pop('exportacao', None)
+            if anterior and os.path.exists(anterior['caminho']):
+                os.remove(anterior['caminho'])
+
+            os.makedirs(PASTA, exist_ok=True)
+            _limpar_antigos()
+            nome = nome_arquivo(tabela, formato, inicio, fim)
+            # Nome único no disco: outras sessões podem exportar a mesma tabela ao mesmo tempo
+            fd, caminho = tempfile.mkstemp(dir=PASTA, suffix=f"_{nome}")
+            os.close(fd)
+            status = st.empty()
+            try:
+                linhas = exportar(db, tabela, caminho, formato, inicio, fim,
+                                  on_progress=lambda t, n: status.caption(f"Lendo {t}... {n} linhas"))
+            except Exception as e:
+                os.remove(caminho)
+                status.empty()
+                st.error(f"Erro ao exportar: {e}")
+                return
+            status.empty()
+            # Só o caminho fica na sessão: o arquivo continua em disco
+            st.session_state['exportacao'] = {'caminho': caminho, 'nome': nome, 'linhas': linhas}
+
+        pronto = st.session_state.get('exportacao')
+        if pronto and os.path.exists(pronto['caminho']):
+            with open(pronto['caminho'], 'rb') as arquivo:
+                st.download_button(f"⬇️ Baixar {pronto['nome']} ({pronto['linhas']} linhas)", arquivo,
+                                   file_name=pronto['nome'], key="exportar_baixar")
@@ -0,0 +1,46 @@
+import json
+from datetime import datetime
+
+import streamlit as st
+
+def _descrever(op: dict) -> str:
+    """Título da operação recusada; vendas e compras em termos do caixa."""
+    quando = datetime.fromtimestamp(op['criada_em']).strftime('%d/%m %H:%M')
+    dados = json.loads(op['dados'])
+    if op['tipo'] == 'registrar_venda':
+        itens = sum(i['quantidade'] for i in dados['p_itens'])
+        return f"**#{op['seq']}** 💰 Venda de R$ {float(dados['p_transacao'].get('valor_total') or 0):.2f} ({itens} item(ns), {quando})"
+    if op['tipo'] == 'registrar_compra':
+        return f"**#{op['seq']}** 📦 Compra de {dados['p_compra']['quantidade']} unidade(s) ({quando})"
+    return f"**#{op['seq']}** {op['tipo']} em {op['tabela']} ({quando})"
+
+def render_indicador(fila):
+    """Gravações aguardando envio ao banco e as recusadas (fila de escrita local)."""
+    situacao = fila.situacao()
+
+    if situacao['pendentes']:
+        st.sidebar.caption(f"⏳ {situacao['pendentes']} gravação(ões) aguardando envio "
+                           f"(a mais antiga há {situacao['espera_s']:.0f}s)")
+        if situacao['ultimo_erro']:
+            st.sidebar.caption(f"📡 Sem conexão com o banco: {situacao['ultimo_erro']}")
+    else:
+        st.sidebar.caption("✅ Todas as gravações enviadas")
+
+    if not situacao['recusadas']:
+        return
+    with st.sidebar.expander(f"⚠️ {situacao['recusadas']} gravação(ões) recusada(s)", expanded=True):
+        for op in fila.recusadas():
+            st.markdown(_descrever(op))
+            if op['tipo'] == 'registrar_venda':
+                # Estoque conferido no caixa pelo cache; o servidor recusou no envio
+                st.caption("A venda não foi gravada. Confira o estoque e reenvie, ou descarte.")
+            st.caption(op['erro'] or '')
+            with st.popover("Ver dados"):
+                st.json(json.loads(op['dados']))
+            c1, c2 = st.columns(2)
+            if c1.button("Reenviar", key=f"fila_reenviar_{op['seq']}"):
+                fila.reenviar(op['seq'])
+                st.rerun()
+            if c2.button("Descartar", key=f"fila_descartar_{op['seq']}"):
+                fila.descartar(op['seq'])
+                st.rerun()
@@ -0,0 +1,33 @@
+import streamlit as st
+from services.metrics import METRICAS
+
+def render_painel():
+    """Painel de desempenho (só para administradores): p50/p95 por chamada e tela, lentas e exportação."""
+    with st.sidebar.expander("📈 Desempenho", expanded=False):
+        resumo = METRICAS.resumo()
+        if resumo.empty:
+            st.caption("Nenhuma medição ainda.")
+            return
+
+        st.dataframe(
+            resumo.sort_values('p95_ms', ascending=False),
+            column_config={
+                "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.0f"),
+                "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.0f"),
+                "max_ms": st.column_config.NumberColumn("máx (ms)", format="%.0f"),
+                "kb": st.column_config.NumberColumn("KB", format="%.0f"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+        lentas = METRICAS.lentas()
+        if lentas:
+            st.caption("Chamadas lentas recentes")
+            st.dataframe(lentas[::-1], hide_index=True, use_container_width=True)
+
+        c1, c2 = st.columns(2)
+        c1.download_button("Exportar", METRICAS.prometheus(), "metricas.prom", mime="text/plain")
+        if c2.button("Zerar"):
+            METRICAS.limpar()
+            st.rerun()
@@ -0,0 +1,28 @@
+import streamlit as st
+from services.cache import get_shared_cache
+
+# Segundos entre as conferências de versão feitas no navegador de cada sessão
+INTERVALO_S = 1.0
+
+def mudaram(cache, tabelas: list, tentadas: dict) -> bool:
+    """
+    Alguma tabela está numa versão que a página ainda não tentou carregar?
+    Compara com a última versão tentada (utils/session.refresh_data), e não
+    com a exibida: se a carga falhou (banco fora), a mesma versão não faz a
+    página rodar de novo a cada conferência.
+    """
+    return any(t in tentadas and cache.versao(t) != tentadas[t] for t in tabelas)
+
+@st.fragment(run_every=INTERVALO_S)
+def render_vigia(tabelas: list):
+    """
+    Confere, sem redesenhar a página, se alguma tabela da tela mudou no cache
+    (feed de alterações, gravação de outra sessão). Se mudou, roda a página de
+    novo para ela pegar a versão nova.
+    """
+    if mudaram(get_shared_cache(), tabelas, st.session_state['versoes_tentadas']):
+        st.rerun()
+
+    feed = st.session_state['db_service'].feed
+    if feed is not None:
+        st.caption("🟢 Tempo real" if feed.ativo else "🟡 Tempo real reconectando...")
@@ -1,6 +1,7 @@
 import streamlit as st
-from utils.session import init_session_state, refresh_data
+import importlib
 import time
+from utils.startup import etapa, render_painel
 
 # 1. Configuração da Página 
 st.set_page_config(page_title="Fluxo de Caixa - Farmácia", page_icon="🌿", layout="wide")
@@ -15,8 +16,11 @@ def check_password():
         senha = st.text_input("Digite a senha de acesso", type="password")
         
         if st.button("Entrar"):
-            if senha == st.secrets['APP_PASSWORD']:
+            senha_admin = st.secrets.get('ADMIN_PASSWORD')
+            if senha == st.secrets['APP_PASSWORD'] or (senha_admin and senha == senha_admin):
                 st.session_state['logged_in'] = True
+                # Administrador vê os painéis de desempenho
+                st.session_state['admin'] = bool(senha_admin) and senha == senha_admin
                 st.success("Login realizado!")
                 time.sleep(0.5)
                 st.rerun()
@@ -25,26 +29,29 @@ def check_password():
         return False
     return True
 
-if not check_password():
+# A tela de login não importa pandas, serviços nem views
+with etapa("login"):
+    autenticado = check_password()
+if not autenticado:
     st.stop()
 
-# 2. Inicializa Serviços e Estado
-init_session_state()
-refresh_data()
+# 2. Inicializa Serviços e Estado (cliente do banco só depois do login)
+with etapa("serviços"):
+    from utils.session import init_session_state, refresh_data
+    from services.metrics import METRICAS
+    init_session_state()
 
-# 3. Importação das Views
-from views import home, vendas, estoque, agendamento, cadastros, dashboard
-
-# 4. Navegação Lateral
+# 3. Navegação Lateral
 st.sidebar.title("Menu Principal")
 
+# 4. Views importadas só quando escolhidas (o dashboard puxa o plotly)
 menu_options = {
-    "inicio":       {"title": "🏠 Início",           "module": home},
-    "vendas":       {"title": "💰 Vender",           "module": vendas},
-    "repor_estoque":{"title": "📦 Repor Estoque",    "module": estoque},
-    "agendamento":  {"title": "🗓️ Marcar Horário",  "module": agendamento},
-    "cadastros":    {"title": "📝 Cadastros",        "module": cadastros},
-    "visualizacao": {"title": "🔍 Visualização",     "module": dashboard}
+    "inicio":       {"title": "🏠 Início",           "module": "views.home"},
+    "vendas":       {"title": "💰 Vender",           "module": "views.vendas"},
+    "repor_estoque":{"title": "📦 Repor Estoque",    "module": "views.estoque"},
+    "agendamento":  {"title": "🗓️ Marcar Horário",  "module": "views.agendamento"},
+    "cadastros":    {"title": "📝 Cadastros",        "module": "views.cadastros"},
+    "visualizacao": {"title": "🔍 Visualização",     "module": "views.dashboard"}
 }
 
 selection = st.sidebar.radio(
@@ -55,8 +62,40 @@ selection = st.sidebar.radio(
 
 if st.sidebar.button("🔄 Atualizar Tudo"):
     st.session_state['refresh'] = True
+    st.session_state['refresh_total'] = True
     st.rerun()
 
+with etapa("import da tela"):
+    module = importlib.import_module(menu_options[selection]["module"])
+# Carrega (ou atualiza) só as tabelas que esta tela declarou
+with etapa("dados"):
+    refresh_data(module.TABELAS)
+
+# Tempo real: a página roda de novo quando uma tabela da tela muda no cache
+from components.tempo_real import render_vigia
+with st.sidebar:
+    render_vigia(module.TABELAS)
+
+# Fila de escrita local: quantas gravações ainda não chegaram ao banco
+if st.session_state['db_service'].fila:
+    from components.painel_fila import render_indicador
+    render_indicador(st.session_state['db_service'].fila)
+
+with st.sidebar.expander("💾 Memória em uso", expanded=False):
+    memoria = st.session_state['db_service'].cache.relatorio_memoria()
+    st.caption(f"Total: {memoria['MB'].sum():.1f} MB")
+    st.dataframe(memoria, hide_index=True, use_container_width=True,
+                 column_config={"MB": st.column_config.NumberColumn(format="%.2f")})
+
 # 5. Renderização da Tela Escolhida
-module = menu_options[selection]["module"]
-module.render_view()
\ No newline at end of file
+with etapa("tela"), METRICAS.cronometrar('tela', selection):
+    module.render_view()
+render_painel()
+
+if st.session_state.get('admin'):
+    from components.painel_metricas import render_painel as render_painel_metricas
+    render_painel_metricas()
+
+# Exportação contínua para o Prometheus (textfile collector), se configurada
+if st.secrets.get("METRICAS_ARQUIVO"):
+    METRICAS.exportar_arquivo(st.secrets["METRICAS_ARQUIVO"])
\ No newline at end of file
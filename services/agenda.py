@@ -0,0 +1,235 @@
+"""
+Motor de ocupação da agenda.
+
+Os agendamentos são convertidos uma única vez em intervalos de minutos
+inteiros [início, fim) e a ocupação dos blocos da grade é calculada de forma
+vetorizada (NumPy), para um dia de um profissional ou para semanas/meses de
+todos ao mesmo tempo.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+INICIO_EXPEDIENTE = 8 * 60   # 08:00
+FIM_EXPEDIENTE = 19 * 60     # 19:00
+PASSO_GRADE = 30             # blocos de 30 min
+DURACAO_PADRAO = 30          # quando o serviço não tem duração cadastrada
+
+
+def horario_em_minutos(horarios: pd.Series) -> pd.Series:
+    """'HH:MM' ou 'HH:MM:SS' -> minutos desde 00:00 (NaN se inválido)."""
+    partes = horarios.astype(str).str.extract(r'^\s*(\d{1,2}):(\d{2})')
+    return pd.to_numeric(partes[0], errors='coerce') * 60 + pd.to_numeric(partes[1], errors='coerce')
+
+
+def minutos_em_horario(minutos: int) -> str:
+    return f"{int(minutos) // 60:02d}:{int(minutos) % 60:02d}"
+
+
+def minutos_em_time(minutos: int) -> time:
+    return time(int(minutos) // 60, int(minutos) % 60)
+
+
+def montar_intervalos(df: pd.DataFrame, col_horario: str = 'horario', col_duracao: str = 'duracao') -> pd.DataFrame:
+    """
+    Devolve uma cópia enxuta de `df` com as colunas inteiras 'inicio' e 'fim'
+    (minutos), ordenada por início. Linhas com horário inválido são descartadas.
+    """
+    if df is None or df.empty or col_horario not in df.columns:
+        return pd.DataFrame(columns=['inicio', 'fim'])
+
+    inicio = horario_em_minutos(df[col_horario])
+    if col_duracao in df.columns:
+        duracao = pd.to_numeric(df[col_duracao], errors='coerce').fillna(DURACAO_PADRAO)
+    else:
+        duracao = pd.Series(DURACAO_PADRAO, index=df.index)
+
+    validos = inicio.notna()
+    out = df.loc[validos].assign(
+        inicio=inicio[validos].astype('int32'),
+        fim=(inicio[validos] + duracao[validos]).astype('int32'),
+    )
+    return out.sort_values('inicio', kind='stable')
+
+
+@dataclass
+class IndiceIntervalos:
+    """Intervalos ordenados por início + máximo acumulado dos fins, para busca O(log n)."""
+    inicio: np.ndarray
+    fim: np.ndarray
+    fim_max: np.ndarray
+
+    @classmethod
+    def de_frame(cls, intervalos: pd.DataFrame) -> 'IndiceIntervalos':
+        inicio = intervalos['inicio'].to_numpy(dtype=np.int32) if not intervalos.empty else np.empty(0, np.int32)
+        fim = intervalos['fim'].to_numpy(dtype=np.int32) if not intervalos.empty else np.empty(0, np.int32)
+        fim_max = np.maximum.accumulate(fim) if len(fim) else fim
+        return cls(inicio, fim, fim_max)
+
+    def conflita(self, inicio: int, fim: int) -> bool:
+        """Há algum intervalo com início < fim e fim > início?"""
+        k = int(np.searchsorted(self.inicio, fim, side='left'))
+        return k > 0 and int(self.fim_max[k - 1]) > inicio
+
+
+def ocupacao(intervalos: pd.DataFrame, chaves: list = None, inicio: int = INICIO_EXPEDIENTE,
+             fim: int = FIM_EXPEDIENTE, passo: int = PASSO_GRADE) -> pd.DataFrame:
+    """
+    Para cada intervalo, calcula quais blocos da grade ele cobre (sem laço por bloco):
+    devolve uma linha por (chaves..., slot) ocupado, com 'pos' = posição da linha
+    em `intervalos` que ocupa o bloco (a que começa primeiro).
+    `chaves` agrupa as grades, ex.: ['data_agendamento', 'id_atendente'].
+    """
+    chaves = chaves or []
+    n_slots = (fim - inicio) // passo
+    if intervalos.empty or n_slots <= 0:
+        return pd.DataFrame(columns=chaves + ['slot', 'pos'])
+
+    ini = intervalos['inicio'].to_numpy(dtype=np.int64)
+    fi = intervalos['fim'].to_numpy(dtype=np.int64)
+    primeiro = np.clip(np.floor_divide(ini - inicio, passo), 0, None)
+    ultimo = np.clip(-np.floor_divide(-(fi - inicio), passo) - 1, None, n_slots - 1)
+    qtd = np.clip(ultimo - primeiro + 1, 0, None)
+
+    pos = np.repeat(np.arange(len(intervalos)), qtd)
+    deslocamento = np.arange(qtd.sum()) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+    slots = np.repeat(primeiro, qtd) + deslocamento
+
+    out = pd.DataFrame({'slot': slots.astype('int32'), 'pos': pos})
+    for chave in chaves:
+        out[chave] = intervalos[chave].to_numpy()[pos]
+    # intervalos já vêm ordenados por início: o primeiro de cada bloco é o que começou antes
+    out = out.drop_duplicates(subset=chaves + ['slot'], keep='first')
+    return out[chaves + ['slot', 'pos']].reset_index(drop=True)
+
+
+def grade_dia(intervalos: pd.DataFrame, inicio: int = INICIO_EXPEDIENTE, fim: int = FIM_EXPEDIENTE,
+              passo: int = PASSO_GRADE) -> pd.DataFrame:
+    """Grade visual de um dia/profissional: Horário, Status, Cliente, Serviço."""
+    n_slots = (fim - inicio) // passo
+    grade = pd.DataFrame({
+        'Horário': [minutos_em_horario(inicio + i * passo) for i in range(n_slots)],
+        'Status': 'Livre',
+        'Cliente': '-',
+        'Serviço': '-',
+    })
+    ocup = ocupacao(intervalos, inicio=inicio, fim=fim, passo=passo)
+    if not ocup.empty:
+        linhas = intervalos.iloc[ocup['pos'].to_numpy()]
+        slots = ocup['slot'].to_numpy()
+        grade.loc[slots, 'Status'] = 'Ocupado'
+        for coluna in ('Cliente', 'Serviço'):
+            if coluna in linhas.columns:
+                grade.loc[slots, coluna] = linhas[coluna].astype(object).fillna('?').astype(str).to_numpy()
+    return grade
+
+
+# --- Busca de horários livres ---
+PASSO_BUSCA = 15  # granularidade dos horários de início sugeridos
+
+
+def _chave_dia(data) -> str:
+    return str(data)[:10]
+
+
+class IndiceAgenda:
+    """
+    Índice dos agendamentos em cache particionado por (dia, profissional).
+
+    A montagem é uma passada vetorizada (parse dos horários + groupby.indices);
+    cada partição só vira DataFrame/IndiceIntervalos quando é consultada.
+    Agendamentos cancelados não ocupam horário.
+    """
+
+    def __init__(self, agendamentos: pd.DataFrame):
+        self._intervalos = pd.DataFrame(columns=['inicio', 'fim'])
+        self._posicoes = {}   # (dia, id_atendente) -> posições em _intervalos
+        self._particoes = {}  # (dia, id_atendente) -> (frame, IndiceIntervalos)
+        self._lock = threading.Lock()
+        if agendamentos is None or agendamentos.empty or 'id_atendente' not in agendamentos.columns:
+            return
+
+        intervalos = self._preparar(agendamentos)
+        if intervalos.empty:
+            return
+        self._intervalos = intervalos.reset_index(drop=True)
+        grupos = self._intervalos.groupby(['dia', 'id_atendente'], sort=False, observed=True).indices
+        self._posicoes = {(dia, int(prof)): pos for (dia, prof), pos in grupos.items()}
+
+    @staticmethod
+    def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+        if 'status' in df.columns:
+            df = df[df['status'] != 'Cancelado']
+        intervalos = montar_intervalos(df)
+        if intervalos.empty:
+            return intervalos
+        return intervalos.assign(dia=intervalos['data_agendamento'].astype(str).str[:10])
+
+    def _particao(self, data, id_atendente):
+        chave = (_chave_dia(data), int(id_atendente))
+        with self._lock:
+            if chave not in self._particoes:
+                pos = self._posicoes.get(chave)
+                # _intervalos está ordenado por início, então a fatia também está
+                frame = self._intervalos.iloc[pos] if pos is not None else self._intervalos.iloc[0:0]
+                self._particoes[chave] = (frame, IndiceIntervalos.de_frame(frame))
+            return self._particoes[chave]
+
+    def intervalos_do_dia(self, data, id_atendente) -> pd.DataFrame:
+        """Agendamentos do dia/profissional já como intervalos (para grade_dia)."""
+        return self._particao(data, id_atendente)[0]
+
+    def indice(self, data, id_atendente) -> IndiceIntervalos:
+        return self._particao(data, id_atendente)[1]
+
+    def livres(self, data, id_atendente, duracao: int, inicio: int = INICIO_EXPEDIENTE,
+               fim: int = FIM_EXPEDIENTE, passo: int = PASSO_BUSCA) -> np.ndarray:
+        """Inícios (minutos) em que cabe um serviço de `duracao` sem conflito, testados em lote."""
+        candidatos = np.arange(inicio, fim - duracao + 1, passo, dtype=np.int64)
+        idx = self.indice(data, id_atendente)
+        if candidatos.size == 0 or idx.inicio.size == 0:
+            return candidatos
+        k = np.searchsorted(idx.inicio, candidatos + duracao, side='left')
+        ocupado = (k > 0) & (idx.fim_max[np.maximum(k - 1, 0)] > candidatos)
+        return candidatos[~ocupado]
+
+
+def proximos_horarios(indice: IndiceAgenda, atendentes: pd.DataFrame, duracao: int, data_inicio, data_fim,
+                      n: int = 5, id_atendente=None, agora=None) -> pd.DataFrame:
+    """
+    Os `n` primeiros horários livres entre `data_inicio` e `data_fim` (inclusive)
+    entre todos os profissionais ativos (ou só `id_atendente`).
+    `agora` (datetime) descarta horários que já passaram no dia de hoje.
+    """
+    colunas = ['Data', 'Horário', 'id_atendente', 'Profissional']
+    if atendentes is None or atendentes.empty:
+        return pd.DataFrame(columns=colunas)
+
+    profs = atendentes
+    if id_atendente is not None:
+        profs = profs[profs['id'] == id_atendente]
+    elif 'ativo' in profs.columns:
+        profs = profs[profs['ativo'].fillna(True).astype(bool)]
+    nomes = dict(zip(profs['id'].astype(int), profs['nome']))
+
+    achados = []
+    for dia in pd.date_range(data_inicio, data_fim, freq='D'):
+        inicio = INICIO_EXPEDIENTE
+        if agora is not None and dia.date() == agora.date():
+            inicio = max(inicio, -(-(agora.hour * 60 + agora.minute) // PASSO_BUSCA) * PASSO_BUSCA)
+
+        do_dia = [
+            (int(m), prof)
+            for prof in nomes
+            for m in indice.livres(dia.date(), prof, duracao, inicio=inicio)
+        ]
+        do_dia.sort()
+        for minuto, prof in do_dia[:n - len(achados)]:
+            achados.append((dia.date(), minutos_em_time(minuto), prof, nomes[prof]))
+        if len(achados) >= n:
+            break
+
+    return pd.DataFrame(achados, columns=colunas)
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Agregado:
+    """
+    Definição de uma consulta agregada do dashboard.
+
+    - metricas: {coluna_saida: (funcao, coluna)}, funcao 'sum' ou 'count'
+    - grupo: colunas do GROUP BY
+    - semana: coluna de data agrupada por semana; a saída ganha a coluna
+      'semana' com o domingo que fecha a semana (mesmo rótulo do resample('W'))
+    - filtros: filtros fixos [(coluna, operador, valor)]
+    - coluna_data: coluna comparada com o parâmetro opcional `desde`
+    """
+    tabela: str
+    metricas: dict
+    grupo: tuple = ()
+    semana: str = None
+    filtros: tuple = ()
+    coluna_data: str = None
+
+
+# No Supabase, cada agregado é a função SQL agg_<nome>(p_desde) de sql/agregados.sql
+AGREGADOS = {
+    'vendas_totais': Agregado(
+        tabela='transacoes',
+        metricas={'faturamento': ('sum', 'valor_total'), 'qtd_vendas': ('count', 'id')},
+        coluna_data='data_transacao',
+    ),
+    'vendas_semanais': Agregado(
+        tabela='transacoes',
+        metricas={'valor_total': ('sum', 'valor_total')},
+        semana='data_transacao',
+        coluna_data='data_transacao',
+    ),
+    'vendas_por_pagamento': Agregado(
+        tabela='transacoes',
+        metricas={'qtd': ('count', 'id')},
+        grupo=('pagamento',),
+        coluna_data='data_transacao',
+    ),
+    'agendamentos_por_servico': Agregado(
+        tabela='agendamentos',
+        metricas={'qtd': ('count', 'id')},
+        grupo=('id_servico',),
+        coluna_data='data_agendamento',
+    ),
+    'atendimentos_por_profissional': Agregado(
+        tabela='agendamentos',
+        metricas={'qtd': ('count', 'id')},
+        grupo=('id_atendente',),
+        filtros=(('status', 'eq', 'Concluído'),),
+        coluna_data='data_agendamento',
+    ),
+    'clientes_novos': Agregado(
+        tabela='clientes',
+        metricas={'qtd': ('count', 'id')},
+        coluna_data='created_at',
+    ),
+}
+
+_COMPARADORES = {
+    'eq': lambda s, v: s == v, 'neq': lambda s, v: s != v,
+    'gt': lambda s, v: s > v, 'gte': lambda s, v: s >= v,
+    'lt': lambda s, v: s < v, 'lte': lambda s, v: s <= v,
+    'in': lambda s, v: s.isin(list(v)),
+}
+
+
+def colunas_necessarias(definicao: Agregado) -> list:
+    cols = set(definicao.grupo) | {c for _, c in definicao.metricas.values()}
+    cols |= {c for c, _, _ in definicao.filtros}
+    if definicao.semana:
+        cols.add(definicao.semana)
+    if definicao.coluna_data:
+        cols.add(definicao.coluna_data)
+    return sorted(cols)
+
+
+def colunas_saida(definicao: Agregado) -> list:
+    return list(definicao.grupo) + (['semana'] if definicao.semana else []) + list(definicao.metricas)
+
+
+def agregar_frame(definicao: Agregado, df: pd.DataFrame, desde=None) -> pd.DataFrame:
+    """Calcula o agregado em pandas (fallback para backends sem agregação no servidor)."""
+    saida = colunas_saida(definicao)
+    if df is None or df.empty or any(c not in df.columns for c in colunas_necessarias(definicao)):
+        if definicao.grupo or definicao.semana:
+            return pd.DataFrame(columns=saida)
+        return pd.DataFrame([{m: 0 for m in definicao.metricas}])
+
+    mask = pd.Series(True, index=df.index)
+    for coluna, op, valor in definicao.filtros:
+        mask &= _COMPARADORES[op](df[coluna], valor)
+    if desde is not None and definicao.coluna_data:
+        datas = pd.to_datetime(df[definicao.coluna_data], errors='coerce', utc=True, format='ISO8601')
+        mask &= datas >= pd.Timestamp(desde, tz='UTC')
+    base = df[mask]
+
+    chaves = list(definicao.grupo)
+    if definicao.semana:
+        datas = pd.to_datetime(base[definicao.semana], errors='coerce', format='ISO8601')
+        base = base.assign(semana=datas.dt.to_period('W-SUN').dt.end_time.dt.normalize())
+        chaves.append('semana')
+
+    aggs = {nome: pd.NamedAgg(column=col, aggfunc='sum' if fn == 'sum' else 'count')
+            for nome, (fn, col) in definicao.metricas.items()}
+    if not chaves:
+        return pd.DataFrame([{nome: base[a.column].agg(a.aggfunc) for nome, a in aggs.items()}])
+    return base.groupby(chaves, observed=True, dropna=False).agg(**aggs).reset_index()
@@ -0,0 +1,278 @@
+"""
+Feed de alterações: mantém o cache compartilhado em dia sem recarregar tabelas.
+
+Eventos de linha (insert/update/delete) chegam de uma fonte e são aplicados
+em lotes nas tabelas em cache (SharedDataCache.aplicar_alteracoes), o que
+sobe a versão delas; as sessões percebem pela versão (components/tempo_real.py)
+e redesenham com os dados novos, sem baixar nada.
+
+Fontes:
+- AssinanteSupabase: Supabase Realtime (postgres_changes). As tabelas
+  precisam estar na publicação supabase_realtime (sql/realtime.sql).
+- AssinanteSQLite: triggers gravam cada alteração numa tabela de log do
+  arquivo SQLite e um leitor consulta o log a cada INTERVALO_S; serve para
+  o backend local e para vários processos usando o mesmo arquivo.
+"""
+import asyncio
+import queue
+import threading
+import time
+
+import streamlit as st
+
+from services.cache import SharedDataCache, get_shared_cache
+from services.database import DatabaseService, PAGE_SIZE, TODAS_TABELAS
+
+# Padrão de espera entre lotes de eventos (pode ser sobrescrito em st.secrets: FEED_INTERVALO_S)
+INTERVALO_S = 0.25
+
+# Tabelas de cadastro cujo nome vai achatado em agendamentos (ver DatabaseService._to_frame)
+JUNCOES_AGENDAMENTOS = {
+    'clientes': ('id_cliente', ['nome']),
+    'servicos': ('id_servico', ['nome', 'duracao_estimada']),
+    'atendentes': ('id_atendente', ['nome']),
+}
+
+# Dias de log de alterações mantidos no arquivo SQLite
+DIAS_LOG = 1
+
+
+class FeedAlteracoes:
+    """Junta os eventos recebidos (de qualquer thread) e aplica no cache a cada `intervalo`."""
+
+    def __init__(self, cache: SharedDataCache, intervalo: float = INTERVALO_S):
+        self.cache = cache
+        self.intervalo = intervalo
+        self.assinante = None  # fonte dos eventos (AssinanteSupabase / AssinanteSQLite)
+        self.eventos_aplicados = 0
+        self.ultimo_evento = None
+        self._eventos = queue.Queue()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._trabalhar, name="feed-alteracoes", daemon=True)
+        self._thread.start()
+
+    @property
+    def ativo(self) -> bool:
+        """A fonte está conectada (as gravações chegam ao cache pelos eventos)?"""
+        return self.assinante is not None and self.assinante.conectado
+
+    def receber(self, tabela: str, tipo: str, registro: dict = None, id_=None):
+        """`tipo`: insert, update ou delete. No delete basta o `id_`."""
+        self._eventos.put((tabela, tipo.lower(), registro, id_ if id_ is not None else (registro or {}).get('id')))
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def _trabalhar(self):
+        while not self._parar.wait(self.intervalo):
+            lote = []
+            while not self._eventos.empty():
+                lote.append(self._eventos.get_nowait())
+            if lote:
+                try:
+                    self.aplicar(lote)
+                except Exception as e:
+                    print(f"Feed de alterações: falha ao aplicar {len(lote)} eventos: {e}")
+
+    def aplicar(self, eventos: list):
+        """Agrupa por tabela (o último evento de cada id vale) e aplica no cache."""
+        por_tabela = {}
+        for tabela, tipo, registro, id_ in eventos:
+            if id_ is not None:
+                por_tabela.setdefault(tabela, {})[id_] = (tipo, registro)
+
+        for tabela, ultimos in por_tabela.items():
+            linhas = [r for tipo, r in ultimos.values() if tipo != 'delete' and r]
+            removidos = [i for i, (tipo, _) in ultimos.items() if tipo == 'delete']
+            if tabela == 'agendamentos':
+                linhas = self._juntar_cadastros(linhas)
+            elif tabela in JUNCOES_AGENDAMENTOS and self._mudou_juncao(tabela, linhas):
+                # Nome achatado em agendamentos mudou (como em DatabaseService.DEPENDENTES)
+                self.cache.invalidar('agendamentos', total=True)
+            self.cache.aplicar_alteracoes(tabela, linhas, removidos)
+
+        self.eventos_aplicados += len(eventos)
+        self.ultimo_evento = time.time()
+
+    def _mudou_juncao(self, tabela: str, linhas: list) -> bool:
+        """Alguma linha alterada mudou um campo que agendamentos copia (nome, duração)?"""
+        df = self.cache.tabela(tabela)
+        if df is None:
+            return False
+        campos = JUNCOES_AGENDAMENTOS[tabela][1]
+        atuais = df.set_index('id')
+        for linha in linhas:
+            if linha.get('id') not in atuais.index:
+                continue
+            registro = atuais.loc[linha['id']]
+            if any(c in linha and str(linha[c]) != str(registro[c]) for c in campos if c in registro.index):
+                return True
+        return False
+
+    def _juntar_cadastros(self, linhas: list) -> list:
+        """
+        Agendamentos chegam sem os joins (cliente, serviço, profissional): completa
+        com os cadastros em cache. O que não estiver em cache fica marcado para a
+        próxima delta reler do banco.
+        """
+        faltando = []
+        juntas = []
+        for linha in linhas:
+            if any(rel in linha for rel in JUNCOES_AGENDAMENTOS):
+                juntas.append(linha)  # já veio com os joins (leitor do SQLite)
+                continue
+            linha = dict(linha)
+            for rel, (coluna, campos) in JUNCOES_AGENDAMENTOS.items():
+                df = self.cache.tabela(rel)
+                achado = None if df is None or linha.get(coluna) is None else df[df['id'] == linha[coluna]]
+                if achado is None or achado.empty:
+                    linha[rel] = None
+                    if linha.get(coluna) is not None:
+                        faltando.append(linha['id'])
+                    continue
+                registro = achado.iloc[0]
+                linha[rel] = {c: registro[c] for c in campos if c in registro.index}
+            juntas.append(linha)
+        if faltando:
+            self.cache.invalidar('agendamentos', ids=faltando)
+        return juntas
+
+
+class AssinanteSQLite:
+    """Stand-in local do Realtime: triggers no arquivo SQLite + leitura periódica do log."""
+
+    def __init__(self, backend, feed: FeedAlteracoes, tabelas: list = None, intervalo: float = INTERVALO_S):
+        self.backend = backend
+        self.feed = feed
+        self.tabelas = tabelas or TODAS_TABELAS
+        self.intervalo = intervalo
+        self.conectado = True  # arquivo local: sempre disponível
+        con = backend.conexao()
+        con.executescript(self._esquema(self.tabelas))
+        with con:
+            con.execute("DELETE FROM alteracoes WHERE criado_em < datetime('now', ?)", (f"-{DIAS_LOG} days",))
+        # Começa do fim: o que veio antes já está nas cargas do cache
+        self._ultimo = con.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._trabalhar, name="feed-sqlite", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _esquema(tabelas: list) -> str:
+        sql = """
+            CREATE TABLE IF NOT EXISTS alteracoes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+            );
+        """
+        for t in tabelas:
+            for tipo, evento, linha in (('insert', 'INSERT', 'NEW'), ('update', 'UPDATE', 'NEW'), ('delete', 'DELETE', 'OLD')):
+                sql += (f"CREATE TRIGGER IF NOT EXISTS alteracoes_{t}_{tipo} AFTER {evento} ON {t} BEGIN "
+                        f"INSERT INTO alteracoes (tabela, tipo, id) VALUES ('{t}', '{tipo}', {linha}.id); END;\n")
+        return sql
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def _trabalhar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.ler()
+            except Exception as e:
+                print(f"Feed SQLite: erro ao ler alterações: {e}")
+
+    def ler(self):
+        """Repassa ao feed as alterações registradas desde a última leitura."""
+        linhas = self.backend.conexao().execute(
+            "SELECT seq, tabela, tipo, id FROM alteracoes WHERE seq > ? ORDER BY seq", (self._ultimo,)
+        ).fetchall()
+        if not linhas:
+            return
+        ultimos = {}
+        for seq, tabela, tipo, id_ in linhas:
+            ultimos[(tabela, id_)] = tipo
+        for tabela in {t for t, _ in ultimos}:
+            ids = [i for (t, i), tipo in ultimos.items() if t == tabela and tipo != 'delete']
+            # Relê as linhas (com os joins) do arquivo local: não passa pela rede
+            for i in range(0, len(ids), PAGE_SIZE):
+                for registro in self.backend.select(tabela, DatabaseService._colunas(tabela),
+                                                    [('id', 'in', ids[i:i + PAGE_SIZE])]):
+                    self.feed.receber(tabela, 'update', registro)
+            for (t, id_), tipo in ultimos.items():
+                if t == tabela and tipo == 'delete':
+                    self.feed.receber(tabela, 'delete', id_=id_)
+        self._ultimo = linhas[-1][0]
+
+
+class AssinanteSupabase:
+    """Supabase Realtime numa thread própria (o cliente de realtime é assíncrono)."""
+
+    def __init__(self, url: str, key: str, feed: FeedAlteracoes, tabelas: list = None, espera_max: float = 60.0):
+        self.url = url
+        self.key = key
+        self.feed = feed
+        self.tabelas = tabelas or TODAS_TABELAS
+        self.espera_max = espera_max
+        self.conectado = False
+        self._thread = threading.Thread(target=self._trabalhar, name="feed-supabase", daemon=True)
+        self._thread.start()
+
+    def _ao_receber(self, payload: dict):
+        # O formato mudou entre versões do realtime-py: aceita os dois
+        dados = payload.get('data', payload)
+        tipo = dados.get('type') or dados.get('eventType') or ''
+        registro = dados.get('record') or dados.get('new') or None
+        antigo = dados.get('old_record') or dados.get('old') or {}
+        self.feed.receber(dados.get('table'), tipo, registro, antigo.get('id'))
+
+    async def _escutar(self):
+        from supabase import acreate_client
+        cliente = await acreate_client(self.url, self.key)
+        canal = cliente.channel('fluxo-alteracoes')
+        for tabela in self.tabelas:
+            canal.on_postgres_changes('*', schema='public', table=tabela, callback=self._ao_receber)
+        await canal.subscribe()
+        self.conectado = True
+        try:
+            await cliente.realtime.listen()
+        finally:
+            self.conectado = False
+
+    def _trabalhar(self):
+        espera = 1.0
+        while True:
+            try:
+                asyncio.run(self._escutar())
+                espera = 1.0
+            except Exception as e:
+                print(f"Feed Supabase: conexão perdida ({e}); reconectando em {espera:.0f}s")
+            # Enquanto desconectado, eventos se perdem: força uma delta ao voltar
+            get_shared_cache().invalidar_tudo()
+            time.sleep(espera)
+            espera = min(self.espera_max, espera * 2)
+
+
+@st.cache_resource
+def get_feed():
+    """
+    Feed único do processo, com a fonte do backend configurado (DB_BACKEND).
+    None quando desligado em FEED_ALTERACOES ou sem conexão.
+    """
+    if not st.secrets.get("FEED_ALTERACOES", True):
+        return None
+    intervalo = float(st.secrets.get("FEED_INTERVALO_S", INTERVALO_S))
+    feed = FeedAlteracoes(get_shared_cache(), intervalo)
+
+    if st.secrets.get("DB_BACKEND", "supabase") == "sqlite":
+        backend = DatabaseService._init_connection()
+        if backend is None:
+            return None
+        feed.assinante = AssinanteSQLite(backend, feed, intervalo=intervalo)
+    else:
+        feed.assinante = AssinanteSupabase(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], feed)
+    return feed
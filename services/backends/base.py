@@ -0,0 +1,101 @@
+from abc import ABC, abstractmethod
+
+# Operadores de filtro aceitos por todos os backends: (coluna, operador, valor)
+OPERADORES = ('eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'in')
+
+# Coluna de chave estrangeira usada para cada tabela embutida em um select,
+# ex.: "*, clientes(nome)" em agendamentos -> agendamentos.id_cliente = clientes.id
+CHAVES_ESTRANGEIRAS = {
+    'clientes': 'id_cliente',
+    'servicos': 'id_servico',
+    'atendentes': 'id_atendente',
+    'produtos': 'id_produto',
+    'transacoes': 'id_transacao',
+}
+
+
+class EstoqueInsuficiente(Exception):
+    """Venda recusada porque algum produto não tem estoque suficiente."""
+
+    def __init__(self, id_produto=None):
+        self.id_produto = id_produto
+        super().__init__(f"Estoque insuficiente para o produto {id_produto}")
+
+
+def validar_filtros(filtros):
+    for coluna, op, _ in filtros or []:
+        if op not in OPERADORES:
+            raise ValueError(f"Operador de filtro inválido para '{coluna}': {op}")
+
+
+class StorageBackend(ABC):
+    """
+    Interface de armazenamento usada pelo DatabaseService.
+
+    - `colunas` segue a sintaxe do PostgREST, inclusive joins embutidos:
+      "horario, servicos(nome, duracao_estimada), clientes(nome)".
+    - `filtros` é uma lista de tuplas (coluna, operador, valor), ver OPERADORES.
+    - `ordem` é uma lista de tuplas (coluna, desc).
+    - `inicio`/`fim` delimitam a faixa de linhas (inclusive), como no .range().
+    Todas as operações devolvem a lista de linhas (dicts) afetadas/lidas.
+    """
+
+    nome = 'base'
+
+    @abstractmethod
+    def select(self, tabela: str, colunas: str = "*", filtros: list = None,
+               ordem: list = None, inicio: int = None, fim: int = None) -> list:
+        ...
+
+    @abstractmethod
+    def insert(self, tabela: str, dados) -> list:
+        """`dados` pode ser um dict ou uma lista de dicts (inserção em lote)."""
+        ...
+
+    @abstractmethod
+    def update(self, tabela: str, dados: dict, filtros: list) -> list:
+        ...
+
+    @abstractmethod
+    def delete(self, tabela: str, filtros: list) -> list:
+        ...
+
+    def upsert(self, tabela: str, dados: list) -> list:
+        """
+        Grava vários registros numa chamada: os que trazem 'id' atualizam o
+        registro existente (só as colunas enviadas), os sem 'id' são inseridos.
+        Todos os dicts do lote devem ter as mesmas chaves. Esta versão genérica
+        faz uma chamada por linha; os backends concretos fazem uma só.
+        """
+        linhas = []
+        for reg in dados:
+            if reg.get('id') is None:
+                linhas += self.insert(tabela, {k: v for k, v in reg.items() if k != 'id'})
+            else:
+                linhas += self.update(tabela, {k: v for k, v in reg.items() if k != 'id'}, [('id', 'eq', reg['id'])])
+        return linhas
+
+    def aggregate(self, nome: str, definicao, desde=None) -> list:
+        """
+        Executa no servidor o agregado `nome` (ver services/aggregates.AGREGADOS).
+        Backends sem suporte levantam NotImplementedError e o DatabaseService
+        calcula em pandas.
+        """
+        raise NotImplementedError
+
+    def rpc(self, funcao: str, params: dict = None) -> list:
+        """
+        Chama uma operação de servidor pelo nome (função SQL no Supabase,
+        método `_rpc_<funcao>` nos backends locais).
+        """
+        metodo = getattr(self, f"_rpc_{funcao}", None)
+        if metodo is None:
+            raise NotImplementedError(f"RPC '{funcao}' não suportada pelo backend {self.nome}")
+        return metodo(**(params or {}))
+
+    def transitorio(self, erro: Exception) -> bool:
+        """
+        O erro é passageiro (queda de conexão, timeout, servidor sobrecarregado)
+        e vale tentar a leitura de novo? Cada backend reconhece os seus.
+        """
+        return isinstance(erro, (ConnectionError, TimeoutError))
@@ -0,0 +1,71 @@
+import json
+import time
+
+from services.backends.base import StorageBackend
+from services.metrics import METRICAS
+
+# Linhas serializadas para estimar o tamanho do payload (o resto é extrapolado)
+AMOSTRA_BYTES = 20
+
+
+def _estimar_bytes(linhas: list) -> int:
+    """Tamanho aproximado do JSON das linhas, sem serializar a página inteira."""
+    if not linhas:
+        return 0
+    amostra = linhas[:AMOSTRA_BYTES]
+    return len(json.dumps(amostra, default=str)) * len(linhas) // len(amostra)
+
+
+class BackendInstrumentado(StorageBackend):
+    """
+    Envolve outro backend medindo cada chamada em services/metrics.METRICAS:
+    duração, linhas e bytes por operação e tabela ('select:transacoes',
+    'rpc:registrar_venda'...). Atributos próprios do backend interno
+    (ex.: `client` do Supabase) continuam acessíveis.
+    """
+
+    def __init__(self, interno: StorageBackend, metricas=METRICAS):
+        self.interno = interno
+        self.metricas = metricas
+        self.nome = interno.nome
+
+    def __getattr__(self, atributo):
+        return getattr(self.interno, atributo)
+
+    def transitorio(self, erro):
+        return self.interno.transitorio(erro)
+
+    def _chamar(self, nome: str, funcao, *args, detalhe=None):
+        inicio = time.perf_counter()
+        try:
+            linhas = funcao(*args)
+        except NotImplementedError:
+            raise  # backend sem suporte: não é falha de banco
+        except Exception:
+            self.metricas.registrar('db', nome, time.perf_counter() - inicio, erro=True, detalhe=detalhe)
+            raise
+        self.metricas.registrar('db', nome, time.perf_counter() - inicio, linhas=len(linhas or []),
+                                bytes_=_estimar_bytes(linhas), detalhe=detalhe)
+        return linhas
+
+    def select(self, tabela, colunas="*", filtros=None, ordem=None, inicio=None, fim=None):
+        return self._chamar(f"select:{tabela}", self.interno.select, tabela, colunas, filtros, ordem, inicio, fim,
+                            detalhe={'filtros': filtros, 'faixa': (inicio, fim)} if filtros or inicio else None)
+
+    def insert(self, tabela, dados):
+        return self._chamar(f"insert:{tabela}", self.interno.insert, tabela, dados)
+
+    def update(self, tabela, dados, filtros):
+        return self._chamar(f"update:{tabela}", self.interno.update, tabela, dados, filtros, detalhe=filtros)
+
+    def delete(self, tabela, filtros):
+        return self._chamar(f"delete:{tabela}", self.interno.delete, tabela, filtros, detalhe=filtros)
+
+    def upsert(self, tabela, dados):
+        return self._chamar(f"upsert:{tabela}", self.interno.upsert, tabela, dados)
+
+    def aggregate(self, nome, definicao, desde=None):
+        return self._chamar(f"agg:{nome}", self.interno.aggregate, nome, definicao, desde, detalhe=desde)
+
+    def rpc(self, funcao, params=None):
+        return self._chamar(f"rpc:{funcao}", self.interno.rpc, funcao, params)
@@ -0,0 +1,106 @@
+import random
+import threading
+import time
+
+from services.backends.base import StorageBackend
+
+# Padrões (podem ser sobrescritos em st.secrets: DB_TENTATIVAS, DB_ESPERA_BASE_S, DB_ESPERA_MAX_S)
+TENTATIVAS = 3
+ESPERA_BASE_S = 0.2
+ESPERA_MAX_S = 2.0
+
+
+class _Voo:
+    """Uma leitura em andamento que outras threads podem aguardar."""
+    __slots__ = ('pronto', 'resultado', 'erro')
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class BackendResiliente(StorageBackend):
+    """
+    Envolve outro backend com:
+    - coalescência (single-flight): leituras idênticas simultâneas, vindas de
+      sessões diferentes, viram uma só requisição; quem chega depois espera a
+      que já está em andamento e recebe as mesmas linhas (somente leitura);
+    - novas tentativas nas leituras (select/aggregate) quando o erro é
+      transitório (`transitorio` do backend interno), com espera exponencial
+      sorteada ("full jitter") para as sessões não voltarem todas juntas.
+    Escritas e RPCs não são repetidas: não são idempotentes.
+    """
+
+    def __init__(self, interno: StorageBackend, tentativas: int = TENTATIVAS,
+                 espera_base: float = ESPERA_BASE_S, espera_max: float = ESPERA_MAX_S):
+        self.interno = interno
+        self.nome = interno.nome
+        self.tentativas = max(1, tentativas)
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self._voos = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, atributo):
+        return getattr(self.interno, atributo)
+
+    def transitorio(self, erro: Exception) -> bool:
+        return self.interno.transitorio(erro)
+
+    def _com_tentativas(self, funcao, *args):
+        for tentativa in range(self.tentativas):
+            try:
+                return funcao(*args)
+            except Exception as e:
+                if tentativa + 1 >= self.tentativas or not self.transitorio(e):
+                    raise
+                espera = random.uniform(0, min(self.espera_max, self.espera_base * 2 ** tentativa))
+                print(f"Erro transitório no banco ({e}); nova tentativa em {espera:.2f}s")
+                time.sleep(espera)
+
+    def _coalescer(self, chave, funcao, *args):
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+
+        if not lider:
+            voo.pronto.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado
+
+        try:
+            voo.resultado = self._com_tentativas(funcao, *args)
+            return voo.resultado
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._voos[chave]
+            voo.pronto.set()
+
+    def select(self, tabela, colunas="*", filtros=None, ordem=None, inicio=None, fim=None):
+        chave = ('select', tabela, colunas, repr(filtros), repr(ordem), inicio, fim)
+        return self._coalescer(chave, self.interno.select, tabela, colunas, filtros, ordem, inicio, fim)
+
+    def aggregate(self, nome, definicao, desde=None):
+        return self._coalescer(('agg', nome, repr(desde)), self.interno.aggregate, nome, definicao, desde)
+
+    def insert(self, tabela, dados):
+        return self.interno.insert(tabela, dados)
+
+    def update(self, tabela, dados, filtros):
+        return self.interno.update(tabela, dados, filtros)
+
+    def delete(self, tabela, filtros):
+        return self.interno.delete(tabela, filtros)
+
+    def upsert(self, tabela, dados):
+        return self.interno.upsert(tabela, dados)
+
+    def rpc(self, funcao, params=None):
+        return self.interno.rpc(funcao, params)
@@ -0,0 +1,385 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from services.backends.base import CHAVES_ESTRANGEIRAS, EstoqueInsuficiente, StorageBackend, validar_filtros
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    nome TEXT NOT NULL,
+    cpf TEXT,
+    telefone TEXT
+);
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    nome TEXT NOT NULL,
+    tipo TEXT,
+    valor_original REAL,
+    estoque INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS servicos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    nome TEXT NOT NULL,
+    valor REAL,
+    duracao_estimada INTEGER DEFAULT 30
+);
+CREATE TABLE IF NOT EXISTS atendentes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    nome TEXT NOT NULL,
+    ativo INTEGER DEFAULT 1,
+    observacao TEXT,
+    valor REAL
+);
+CREATE TABLE IF NOT EXISTS transacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    data_transacao TEXT,
+    pagamento TEXT,
+    origem TEXT,
+    valor_total REAL,
+    id_cliente INTEGER REFERENCES clientes(id)
+);
+CREATE TABLE IF NOT EXISTS itens_transacao (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    id_transacao INTEGER REFERENCES transacoes(id),
+    id_produto INTEGER REFERENCES produtos(id),
+    quantidade INTEGER,
+    valor_unitario REAL
+);
+CREATE TABLE IF NOT EXISTS compras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    id_produto INTEGER REFERENCES produtos(id),
+    quantidade INTEGER,
+    valor_total REAL,
+    fornecedor TEXT,
+    data_compra TEXT
+);
+CREATE TABLE IF NOT EXISTS agendamentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    id_cliente INTEGER REFERENCES clientes(id),
+    id_servico INTEGER REFERENCES servicos(id),
+    id_atendente INTEGER REFERENCES atendentes(id),
+    data_agendamento TEXT,
+    horario TEXT,
+    status TEXT DEFAULT 'Agendado'
+);
+CREATE TABLE IF NOT EXISTS vendas_diarias (
+    data TEXT NOT NULL,
+    pagamento TEXT NOT NULL,
+    qtd INTEGER NOT NULL DEFAULT 0,
+    valor_total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (data, pagamento)
+);
+CREATE TABLE IF NOT EXISTS operacoes_aplicadas (
+    chave TEXT PRIMARY KEY,
+    resultado TEXT NOT NULL,
+    aplicado_em TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_agendamentos_dia ON agendamentos (data_agendamento, id_atendente);
+CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes (data_transacao);
+"""
+
+_IDENTIFICADOR = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_OPERADORES_SQL = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+
+def _ident(nome: str) -> str:
+    """Valida e cita um identificador SQL (tabela/coluna)."""
+    if not _IDENTIFICADOR.match(nome):
+        raise ValueError(f"Identificador inválido: {nome!r}")
+    return f'"{nome}"'
+
+
+def _separar_colunas(colunas: str) -> list:
+    """Divide "a, b, rel(x, y)" nas vírgulas de primeiro nível."""
+    partes, nivel, atual = [], 0, ''
+    for ch in colunas:
+        if ch == ',' and nivel == 0:
+            partes.append(atual.strip())
+            atual = ''
+            continue
+        nivel += (ch == '(') - (ch == ')')
+        atual += ch
+    if atual.strip():
+        partes.append(atual.strip())
+    return partes
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Backend local em arquivo SQLite, com o mesmo esquema das tabelas do Supabase.
+    Útil no PC da loja quando a internet está lenta e para testes/benchmarks sem rede.
+    Cada thread usa sua própria conexão (o arquivo fica em modo WAL).
+    """
+
+    nome = 'sqlite'
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.conexao().executescript(ESQUEMA)
+
+    def conexao(self) -> sqlite3.Connection:
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+        return con
+
+    def transitorio(self, erro):
+        # Outro processo segurando o arquivo além do timeout da conexão
+        return (isinstance(erro, sqlite3.OperationalError) and 'locked' in str(erro)) or super().transitorio(erro)
+
+    # --- Montagem de SQL ---
+    @staticmethod
+    def _where(filtros, alias='t'):
+        validar_filtros(filtros)
+        clausulas, params = [], []
+        for coluna, op, valor in filtros or []:
+            col = f"{alias}.{_ident(coluna)}" if alias else _ident(coluna)
+            if op == 'in':
+                valores = list(valor)
+                if not valores:
+                    clausulas.append("0")
+                    continue
+                clausulas.append(f"{col} IN ({', '.join('?' * len(valores))})")
+                params.extend(valores)
+            else:
+                clausulas.append(f"{col} {_OPERADORES_SQL[op]} ?")
+                params.append(valor)
+        sql = f" WHERE {' AND '.join(clausulas)}" if clausulas else ""
+        return sql, params
+
+    def select(self, tabela, colunas="*", filtros=None, ordem=None, inicio=None, fim=None):
+        campos, joins, embutidas = [], [], []
+        for parte in _separar_colunas(colunas):
+            if parte == '*':
+                campos.append("t.*")
+            elif '(' in parte:
+                rel, internas = parte[:-1].split('(', 1)
+                rel = rel.strip()
+                fk = CHAVES_ESTRANGEIRAS[rel]
+                joins.append(f"LEFT JOIN {_ident(rel)} AS {_ident('j_' + rel)} "
+                             f"ON {_ident('j_' + rel)}.id = t.{_ident(fk)}")
+                cols_rel = [c.strip() for c in internas.split(',') if c.strip()]
+                for c in cols_rel:
+                    campos.append(f"{_ident('j_' + rel)}.{_ident(c)} AS {_ident(rel + '__' + c)}")
+                # id do relacionado para saber se o join achou alguém
+                campos.append(f"{_ident('j_' + rel)}.id AS {_ident(rel + '__id')}")
+                embutidas.append((rel, cols_rel))
+            else:
+                campos.append(f"t.{_ident(parte)}")
+
+        where, params = self._where(filtros)
+        sql = f"SELECT {', '.join(campos)} FROM {_ident(tabela)} AS t {' '.join(joins)}{where}"
+        if ordem:
+            sql += " ORDER BY " + ", ".join(f"t.{_ident(c)} {'DESC' if desc else 'ASC'}" for c, desc in ordem)
+        if inicio is not None and fim is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [fim - inicio + 1, inicio]
+
+        linhas = []
+        for row in self.conexao().execute(sql, params):
+            r = dict(row)
+            for rel, cols_rel in embutidas:
+                achou = r.pop(f"{rel}__id") is not None
+                aninhado = {c: r.pop(f"{rel}__{c}") for c in cols_rel}
+                r[rel] = aninhado if achou else None
+            linhas.append(r)
+        return linhas
+
+    def insert(self, tabela, dados):
+        registros = dados if isinstance(dados, list) else [dados]
+        inseridos = []
+        con = self.conexao()
+        with con:
+            for reg in registros:
+                cols = list(reg.keys())
+                sql = (f"INSERT INTO {_ident(tabela)} ({', '.join(_ident(c) for c in cols)}) "
+                       f"VALUES ({', '.join('?' * len(cols))}) RETURNING *")
+                inseridos.extend(dict(r) for r in con.execute(sql, [reg[c] for c in cols]).fetchall())
+        return inseridos
+
+    def update(self, tabela, dados, filtros):
+        cols = list(dados.keys())
+        where, params = self._where(filtros, alias=None)
+        sql = (f"UPDATE {_ident(tabela)} SET {', '.join(f'{_ident(c)} = ?' for c in cols)}"
+               f"{where} RETURNING *")
+        con = self.conexao()
+        with con:
+            return [dict(r) for r in con.execute(sql, [dados[c] for c in cols] + params).fetchall()]
+
+    def delete(self, tabela, filtros):
+        where, params = self._where(filtros, alias=None)
+        con = self.conexao()
+        with con:
+            return [dict(r) for r in con.execute(f"DELETE FROM {_ident(tabela)}{where} RETURNING *", params).fetchall()]
+
+    def upsert(self, tabela, dados):
+        if not dados:
+            return []
+        cols = list(dados[0].keys())
+        atualizar = [c for c in cols if c != 'id']
+        sql = (f"INSERT INTO {_ident(tabela)} ({', '.join(_ident(c) for c in cols)}) "
+               f"VALUES ({', '.join('?' * len(cols))}) "
+               f"ON CONFLICT (id) DO UPDATE SET {', '.join(f'{_ident(c)} = excluded.{_ident(c)}' for c in atualizar)} "
+               f"RETURNING *")
+        con = self.conexao()
+        with con:
+            return [dict(con.execute(sql, [reg.get(c) for c in cols]).fetchone()) for reg in dados]
+
+    def aggregate(self, nome, definicao, desde=None):
+        campos, grupo = [], []
+        for col in definicao.grupo:
+            campos.append(f"t.{_ident(col)}")
+            grupo.append(f"t.{_ident(col)}")
+        if definicao.semana:
+            # 'weekday 0' = domingo que fecha a semana, igual ao resample('W') do pandas
+            campos.append(f"date(t.{_ident(definicao.semana)}, 'weekday 0') AS semana")
+            grupo.append("semana")
+        for saida, (fn, col) in definicao.metricas.items():
+            expr = f"COALESCE(SUM(t.{_ident(col)}), 0)" if fn == 'sum' else f"COUNT(t.{_ident(col)})"
+            campos.append(f"{expr} AS {_ident(saida)}")
+
+        filtros = list(definicao.filtros)
+        if desde is not None and definicao.coluna_data:
+            filtros.append((definicao.coluna_data, 'gte', str(desde)))
+        where, params = self._where(filtros)
+
+        sql = f"SELECT {', '.join(campos)} FROM {_ident(definicao.tabela)} AS t{where}"
+        if grupo:
+            sql += f" GROUP BY {', '.join(grupo)} ORDER BY {', '.join(grupo)}"
+        return [dict(r) for r in self.conexao().execute(sql, params)]
+
+    # --- RPCs (equivalentes locais das funções de sql/) ---
+    _SQL_SOMAR_VENDA_DIARIA = """
+        INSERT INTO vendas_diarias (data, pagamento, qtd, valor_total) VALUES (?, ?, 1, ?)
+        ON CONFLICT (data, pagamento) DO UPDATE SET
+            qtd = qtd + 1,
+            valor_total = valor_total + excluded.valor_total
+    """
+
+    def _rpc_registrar_venda_diaria(self, p_data, p_pagamento, p_valor):
+        con = self.conexao()
+        with con:
+            con.execute(self._SQL_SOMAR_VENDA_DIARIA, (str(p_data), p_pagamento, float(p_valor or 0)))
+        return []
+
+    def _rpc_reconstruir_vendas_diarias(self):
+        con = self.conexao()
+        with con:
+            con.execute("DELETE FROM vendas_diarias")
+            con.execute("""
+                INSERT INTO vendas_diarias (data, pagamento, qtd, valor_total)
+                SELECT date(data_transacao), COALESCE(pagamento, ''), COUNT(*), COALESCE(SUM(valor_total), 0)
+                FROM transacoes
+                WHERE data_transacao IS NOT NULL
+                GROUP BY 1, 2
+            """)
+        return []
+
+    def _rpc_registrar_venda(self, p_transacao, p_itens):
+        """
+        Venda atômica: baixa o estoque com UPDATE condicional (só se houver saldo),
+        grava a transação, os itens e o resumo diário em uma única transação SQL.
+        BEGIN IMMEDIATE trava a escrita, então dois caixas não vendem o mesmo saldo.
+        """
+        con = self.conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for item in sorted(p_itens, key=lambda i: i['id_produto']):
+                cur = con.execute(
+                    "UPDATE produtos SET estoque = estoque - ? WHERE id = ? AND estoque >= ?",
+                    (item['quantidade'], item['id_produto'], item['quantidade']),
+                )
+                if cur.rowcount == 0:
+                    raise EstoqueInsuficiente(item['id_produto'])
+
+            cols = list(p_transacao.keys())
+            transacao = dict(con.execute(
+                f"INSERT INTO transacoes ({', '.join(_ident(c) for c in cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))}) RETURNING *",
+                [p_transacao[c] for c in cols],
+            ).fetchone())
+
+            con.executemany(
+                "INSERT INTO itens_transacao (id_transacao, id_produto, quantidade, valor_unitario) VALUES (?, ?, ?, ?)",
+                [(transacao['id'], i['id_produto'], i['quantidade'], i.get('valor_unitario')) for i in p_itens],
+            )
+            con.execute(self._SQL_SOMAR_VENDA_DIARIA, (
+                str(transacao['data_transacao'])[:10], transacao.get('pagamento') or '',
+                float(transacao.get('valor_total') or 0),
+            ))
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        return [transacao]
+
+    def _rpc_registrar_compra(self, p_compra):
+        """Entrada de estoque: soma ao saldo e grava a compra na mesma transação."""
+        con = self.conexao()
+        with con:
+            cur = con.execute("UPDATE produtos SET estoque = COALESCE(estoque, 0) + ? WHERE id = ?",
+                              (p_compra['quantidade'], p_compra['id_produto']))
+            if cur.rowcount == 0:
+                raise ValueError(f"Produto {p_compra['id_produto']} não encontrado")
+            cols = list(p_compra.keys())
+            compra = dict(con.execute(
+                f"INSERT INTO compras ({', '.join(_ident(c) for c in cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))}) RETURNING *",
+                [p_compra[c] for c in cols],
+            ).fetchone())
+        return [compra]
+
+    def _rpc_aplicar_operacoes(self, p_operacoes):
+        """
+        Equivalente local de sql/fila_escrita.sql. Aqui a chave é registrada logo
+        depois da gravação (e não na mesma transação): sem rede no meio, não há
+        resposta perdida a repetir.
+        """
+        con = self.conexao()
+        saida = []
+        for op in p_operacoes:
+            guardado = con.execute("SELECT resultado FROM operacoes_aplicadas WHERE chave = ?", (op['chave'],)).fetchone()
+            if guardado:
+                saida.append(json.loads(guardado['resultado']))
+                continue
+            filtro = [('id', 'eq', op.get('id'))]
+            try:
+                if op['tipo'] == 'insert':
+                    linhas = self.insert(op['tabela'], op['dados'])
+                elif op['tipo'] == 'update':
+                    linhas = self.update(op['tabela'], op['dados'], filtro)
+                elif op['tipo'] == 'delete':
+                    linhas = self.delete(op['tabela'], filtro)
+                else:
+                    linhas = self.rpc(op['tipo'], op['dados'])
+            except Exception as e:
+                if self.transitorio(e):
+                    raise  # o lote todo volta para a fila e é reenviado
+                saida.append({'chave': op['chave'], 'ok': False, 'erro': str(e), 'codigo': type(e).__name__})
+                break
+            resultado = {'chave': op['chave'], 'ok': True, 'linhas': linhas}
+            with con:
+                con.execute("INSERT INTO operacoes_aplicadas (chave, resultado) VALUES (?, ?)",
+                            (op['chave'], json.dumps(resultado, default=str)))
+            saida.append(resultado)
+        return saida
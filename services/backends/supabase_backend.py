@@ -0,0 +1,96 @@
+from supabase import ClientOptions, create_client
+
+import re
+
+import httpx
+
+from services.backends.base import EstoqueInsuficiente, StorageBackend, validar_filtros
+
+# Padrões (podem ser sobrescritos em st.secrets: DB_TIMEOUT_S, DB_POOL, DB_KEEPALIVE_S)
+TIMEOUT_S = 10.0
+POOL = 20          # conexões mantidas abertas (>= DB_MAX_CONCORRENCIA das sessões somadas)
+KEEPALIVE_S = 60.0
+
+# Respostas do servidor que valem nova tentativa: sobrecarga/timeout do
+# gateway e falhas de serialização/deadlock do Postgres
+CODIGOS_TRANSITORIOS = {'408', '429', '500', '502', '503', '504', '40001', '40P01'}
+
+
+def _cliente_http(timeout: float, pool: int, keepalive: float) -> httpx.Client:
+    """Cliente HTTP com keep-alive: as requisições reaproveitam as conexões TLS abertas."""
+    return httpx.Client(
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+        limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool, keepalive_expiry=keepalive),
+    )
+
+
+def criar_cliente(url: str, key: str, timeout: float = TIMEOUT_S, pool: int = POOL, keepalive: float = KEEPALIVE_S):
+    """create_client com timeout por chamada e o pool HTTP ajustado."""
+    try:
+        opcoes = ClientOptions(postgrest_client_timeout=timeout, httpx_client=_cliente_http(timeout, pool, keepalive))
+    except TypeError:
+        # supabase-py sem `httpx_client`: fica só o timeout, com o pool padrão
+        opcoes = ClientOptions(postgrest_client_timeout=timeout)
+    return create_client(url, key, options=opcoes)
+
+
+class SupabaseBackend(StorageBackend):
+    """Backend remoto: traduz a interface para o query builder do supabase-py."""
+
+    nome = 'supabase'
+
+    def __init__(self, url: str = None, key: str = None, client=None, timeout: float = TIMEOUT_S,
+                 pool: int = POOL, keepalive: float = KEEPALIVE_S):
+        # `client` permite injetar outro cliente compatível (ex.: o falso de benchmarks/)
+        self.client = client or criar_cliente(url, key, timeout, pool, keepalive)
+
+    def transitorio(self, erro):
+        if isinstance(erro, httpx.TransportError):  # conexão caiu, timeout, protocolo
+            return True
+        return str(getattr(erro, 'code', '')) in CODIGOS_TRANSITORIOS or super().transitorio(erro)
+
+    @staticmethod
+    def _aplicar_filtros(consulta, filtros):
+        validar_filtros(filtros)
+        for coluna, op, valor in filtros or []:
+            metodo = 'in_' if op == 'in' else op
+            consulta = getattr(consulta, metodo)(coluna, valor)
+        return consulta
+
+    def select(self, tabela, colunas="*", filtros=None, ordem=None, inicio=None, fim=None):
+        consulta = self._aplicar_filtros(self.client.table(tabela).select(colunas), filtros)
+        for coluna, desc in ordem or []:
+            consulta = consulta.order(coluna, desc=desc)
+        if inicio is not None and fim is not None:
+            consulta = consulta.range(inicio, fim)
+        return consulta.execute().data or []
+
+    def insert(self, tabela, dados):
+        return self.client.table(tabela).insert(dados).execute().data or []
+
+    def update(self, tabela, dados, filtros):
+        consulta = self._aplicar_filtros(self.client.table(tabela).update(dados), filtros)
+        return consulta.execute().data or []
+
+    def delete(self, tabela, filtros):
+        consulta = self._aplicar_filtros(self.client.table(tabela).delete(), filtros)
+        return consulta.execute().data or []
+
+    def upsert(self, tabela, dados):
+        # Linhas sem 'id' ganham o default do banco (PostgREST usa as chaves do lote)
+        return self.client.table(tabela).upsert(dados, on_conflict='id').execute().data or []
+
+    def aggregate(self, nome, definicao, desde=None):
+        # Funções SQL criadas por sql/agregados.sql
+        params = {'p_desde': str(desde) if desde is not None else None}
+        return self.client.rpc(f"agg_{nome}", params).execute().data or []
+
+    def rpc(self, funcao, params=None):
+        try:
+            return self.client.rpc(funcao, params or {}).execute().data or []
+        except Exception as e:
+            # registrar_venda (sql/registrar_venda.sql) sinaliza falta de estoque assim
+            achado = re.search(r'ESTOQUE_INSUFICIENTE:(\d+)', str(e))
+            if achado:
+                raise EstoqueInsuficiente(int(achado.group(1))) from e
+            raise
@@ -0,0 +1,402 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import pandas as pd
+import streamlit as st
+
+from services import schema, snapshot
+from services.database import DatabaseService, TODAS_TABELAS
+
+# Padrões (podem ser sobrescritos em st.secrets)
+CACHE_TTL_SEGUNDOS = 300
+CACHE_MAX_MB = 512
+
+# Quantos resultados derivados (agregados, índices, consultas) ficam guardados
+MAX_DERIVADOS = 256
+
+# Depois de uma carga que falhou, quantos segundos esperar antes de tentar a
+# tabela de novo (enquanto isso as sessões recebem a última cópia boa)
+ESPERA_FALHA_SEGUNDOS = 15
+
+
+@dataclass
+class EntradaCache:
+    df: pd.DataFrame
+    versao: int
+    marca: dict
+    carregado_em: float
+    tamanho_bytes: int
+    valida: bool = True
+    ids_alterados: set = field(default_factory=set)
+
+
+@dataclass
+class AlteracoesNaCarga:
+    """O que mudou numa tabela enquanto ela era lida do banco (a leitura pode ser anterior)."""
+    mudou: bool = False
+    total: bool = False
+    ids: set = field(default_factory=set)
+
+
+class SharedDataCache:
+    """
+    Cache de tabelas compartilhado por todas as sessões do processo.
+
+    Os DataFrames guardados aqui são somente leitura: as sessões recebem a mesma
+    referência, sem cópia. Cada tabela tem um número de versão que sobe a cada
+    recarga, para que as views saibam quando dados derivados ficaram velhos.
+    Escritas via DatabaseService invalidam a tabela; a próxima leitura faz a
+    sincronização incremental (delta) em vez de baixar tudo de novo.
+    Com `disco` (services/snapshot.py), as tabelas também são guardadas em
+    disco e, depois de um reinício, servidas de lá enquanto a delta roda.
+    """
+
+    def __init__(self, ttl_segundos: float = CACHE_TTL_SEGUNDOS, max_bytes: int = CACHE_MAX_MB * 1024 * 1024,
+                 disco: snapshot.SnapshotDisco = None):
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self.disco = disco
+        self._entradas = OrderedDict()  # ordem = uso (LRU no início)
+        self._versoes = {}              # sobrevive à evicção para a versão nunca voltar
+        self._derivados = {}            # chave -> (versões das tabelas de origem, valor, calculado_em)
+        self._falhas = {}               # tabela -> momento da última carga que falhou
+        self._em_carga = {}             # tabela -> AlteracoesNaCarga, enquanto é lida do banco
+        self._lock = threading.RLock()
+        self._lock_carga = threading.Lock()
+
+    # --- Consulta ---
+    def versao(self, tabela: str) -> int:
+        with self._lock:
+            return self._versoes.get(tabela, 0)
+
+    def versoes(self) -> dict:
+        with self._lock:
+            return dict(self._versoes)
+
+    def uso_memoria(self) -> dict:
+        """Bytes ocupados por tabela carregada."""
+        with self._lock:
+            return {t: e.tamanho_bytes for t, e in self._entradas.items()}
+
+    def relatorio_memoria(self):
+        """
+        Linhas, colunas e MB de cada tabela em cache (services/schema.relatorio_memoria).
+        Medir com deep=True percorre todas as células: o relatório só é refeito
+        quando alguma tabela muda de versão (ou entra/sai do cache).
+        """
+        with self._lock:
+            dados = {t: e.df for t, e in self._entradas.items()}
+        tabelas = sorted(dados)
+        return self.derivado(('memoria', tuple(tabelas)), tabelas, lambda: schema.relatorio_memoria(dados))
+
+    def _expirada(self, entrada: EntradaCache) -> bool:
+        return not entrada.valida or (time.time() - entrada.carregado_em) > self.ttl_segundos
+
+    def atualizada(self, tabela: str) -> bool:
+        """A cópia local da tabela está carregada, válida e dentro do TTL?"""
+        with self._lock:
+            entrada = self._entradas.get(tabela)
+            return entrada is not None and not self._expirada(entrada)
+
+    def falhas(self) -> dict:
+        """Tabelas cuja última carga falhou (e que estão sendo servidas desatualizadas): {tabela: momento}."""
+        with self._lock:
+            return dict(self._falhas)
+
+    def _pendente(self, tabela: str) -> bool:
+        if tabela in self._entradas and not self._expirada(self._entradas[tabela]):
+            return False
+        return time.time() - self._falhas.get(tabela, 0) > ESPERA_FALHA_SEGUNDOS
+
+    def get_tables(self, db: DatabaseService, tabelas: list = None) -> dict:
+        """
+        Devolve as tabelas pedidas, recarregando só as ausentes, inválidas ou expiradas.
+        Se a recarga falha, a última cópia boa continua sendo servida.
+        """
+        tabelas = tabelas or TODAS_TABELAS
+
+        with self._lock:
+            pendentes = [t for t in tabelas if self._pendente(t)]
+
+        if pendentes:
+            # Uma sessão carrega por vez; as outras esperam e reaproveitam o resultado
+            with self._lock_carga:
+                with self._lock:
+                    pendentes = [t for t in pendentes if self._pendente(t)]
+                if pendentes:
+                    self._carregar(db, pendentes)
+
+        with self._lock:
+            resultado = {}
+            for t in tabelas:
+                if t in self._entradas:
+                    self._entradas.move_to_end(t)
+                    resultado[t] = self._entradas[t].df
+            return resultado
+
+    def derivado(self, chave, tabelas: list, calcular):
+        """
+        Memoiza um resultado derivado das `tabelas` (agregado, frame tipado...).
+        O valor é recalculado quando a versão de alguma tabela de origem muda ou,
+        como as tabelas, depois de ttl_segundos: agregados e o resumo diário são
+        lidos do banco, e sem o feed nada sobe a versão quando outro PC grava.
+        """
+        with self._lock:
+            versoes = tuple(self._versoes.get(t, 0) for t in tabelas)
+            guardado = self._derivados.get(chave)
+            if (guardado is not None and guardado[0] == versoes
+                    and time.time() - guardado[2] <= self.ttl_segundos):
+                return guardado[1]
+
+        valor = calcular()
+        with self._lock:
+            self._derivados.pop(chave, None)
+            self._derivados[chave] = (versoes, valor, time.time())
+            while len(self._derivados) > MAX_DERIVADOS:
+                self._derivados.pop(next(iter(self._derivados)))
+        return valor
+
+    # --- Carga ---
+    def _carregar(self, db: DatabaseService, tabelas: list):
+        # Fora da memória mas com snapshot em disco: serve já e confere com o banco em segundo plano
+        restauradas = self._restaurar([t for t in tabelas if t not in self._entradas])
+        if restauradas:
+            threading.Thread(target=self._reconciliar, args=(db, restauradas),
+                             name="cache-reconciliar", daemon=True).start()
+            tabelas = [t for t in tabelas if t not in restauradas]
+            if not tabelas:
+                return
+
+        with self._lock:
+            atuais = {t: self._entradas[t] for t in tabelas if t in self._entradas}
+            for t in tabelas:
+                self._em_carga[t] = AlteracoesNaCarga()
+
+        completas = [t for t in tabelas if t not in atuais]
+        incrementais = [t for t in tabelas if t in atuais]
+
+        novos = {}
+        try:
+            if completas:
+                novos.update(db.fetch_all_tables(tabelas=completas))
+            if incrementais:
+                novos.update(db.fetch_delta(
+                    {t: atuais[t].df for t in incrementais},
+                    {t: atuais[t].marca for t in incrementais},
+                    alterados={t: set(atuais[t].ids_alterados) for t in incrementais},
+                    tabelas=incrementais,
+                ))
+        finally:
+            with self._lock:
+                na_carga = {t: self._em_carga.pop(t) for t in tabelas}
+
+        for tabela, df in novos.items():
+            self._guardar(tabela, df, alteracoes=na_carga[tabela])
+        with self._lock:
+            for tabela in tabelas:
+                if tabela in novos:
+                    self._falhas.pop(tabela, None)
+                else:
+                    self._falhas[tabela] = time.time()
+        self._evictar(protegidas=set(tabelas))
+
+    def _guardar(self, tabela: str, df: pd.DataFrame, marca: dict = None, gravar_disco: bool = True,
+                 alteracoes: AlteracoesNaCarga = None):
+        """
+        Guarda a cópia lida. Se houve gravações durante a leitura (`alteracoes`),
+        ela já nasce inválida, com os ids a reler; invalidação total zera a
+        marca, e a próxima leitura recarrega a tabela inteira.
+        """
+        mudou = alteracoes is not None and alteracoes.mudou
+        with self._lock:
+            versao = self._versoes.get(tabela, 0) + 1
+            self._versoes[tabela] = versao
+            entrada = self._entradas[tabela] = EntradaCache(
+                df=df,
+                versao=versao,
+                marca={} if mudou and alteracoes.total else
+                      DatabaseService.marca_dagua(df) if marca is None else marca,
+                carregado_em=time.time(),
+                tamanho_bytes=int(df.memory_usage(deep=True).sum()),
+                valida=not mudou,
+                ids_alterados=set(alteracoes.ids) if mudou else set(),
+            )
+            self._entradas.move_to_end(tabela)
+        if self.disco and gravar_disco and not mudou:
+            self.disco.agendar(tabela, df, entrada.marca)
+
+    def _restaurar(self, tabelas: list) -> list:
+        """Põe em memória as `tabelas` que têm snapshot válido em disco; devolve quais."""
+        if not self.disco:
+            return []
+        restauradas = []
+        for tabela in tabelas:
+            lido = self.disco.carregar(tabela)
+            if lido is not None:
+                df, marca = lido
+                self._guardar(tabela, df, marca, gravar_disco=False)
+                restauradas.append(tabela)
+        return restauradas
+
+    def _reconciliar(self, db: DatabaseService, tabelas: list):
+        """Traz do banco o que mudou desde o snapshot (delta pela marca d'água)."""
+        with self._lock_carga:
+            with self._lock:
+                tabelas = [t for t in tabelas if t in self._entradas]
+            if tabelas:
+                self._carregar(db, tabelas)
+
+    def _evictar(self, protegidas: set = frozenset()):
+        """Remove as tabelas menos usadas até caber no teto de memória."""
+        with self._lock:
+            total = sum(e.tamanho_bytes for e in self._entradas.values())
+            for tabela in list(self._entradas):
+                if total <= self.max_bytes:
+                    break
+                if tabela in protegidas:
+                    continue
+                total -= self._entradas.pop(tabela).tamanho_bytes
+
+    # --- Alterações de linha (services/alteracoes.py) ---
+    def tabela(self, tabela: str):
+        """DataFrame em cache da tabela (ou None), sem carregar nem mexer na ordem LRU."""
+        with self._lock:
+            entrada = self._entradas.get(tabela)
+            return entrada.df if entrada is not None else None
+
+    def aplicar_alteracoes(self, tabela: str, linhas: list = (), removidos=()) -> bool:
+        """
+        Aplica na cópia em cache, sem ir ao banco, alterações de linha vindas do
+        feed: `linhas` (inseridas/alteradas, no formato da API) substituem as de
+        mesmo id e os ids em `removidos` saem. A versão sobe como numa recarga.
+        A marca d'água e o momento da carga não mudam: a próxima delta ainda
+        confere tudo desde a última leitura, cobrindo eventos perdidos.
+        Devolve False se a tabela não está em cache (a próxima leitura a carrega);
+        a versão sobe mesmo assim, porque há derivados de tabelas que nunca
+        ficam em cache (agregados de transacoes e compras, lidos do banco).
+        """
+        with self._lock:
+            entrada = self._entradas.get(tabela)
+            if entrada is None:
+                self.nova_versao(tabela)
+                if tabela in self._em_carga:
+                    self._em_carga[tabela].mudou = True
+                    self._em_carga[tabela].ids.update([l.get('id') for l in linhas] + list(removidos))
+                return False
+        if 'id' not in entrada.df.columns:
+            self.invalidar(tabela)
+            return False
+
+        novos = schema.aplicar(tabela, DatabaseService._to_frame(tabela, list(linhas))) if linhas else None
+        fora = set(removidos) | (set(novos['id'].tolist()) if novos is not None else set())
+        df = entrada.df[~entrada.df['id'].isin(fora)]
+        if novos is not None:
+            # Colunas todas nulas ficam de fora do concat (o schema.aplicar as recompõe)
+            df = novos if df.empty else pd.concat([df, novos.dropna(axis=1, how='all')], ignore_index=True)
+        df = schema.aplicar(tabela, DatabaseService._ordenar(tabela, df))
+
+        with self._lock:
+            if self._entradas.get(tabela) is not entrada:
+                # Recarregada enquanto o evento era aplicado: a delta relê essas linhas
+                self.invalidar(tabela, ids=list(fora))
+                return False
+            if tabela in self._em_carga:
+                # A leitura em andamento pode ser anterior a este evento
+                self._em_carga[tabela].mudou = True
+                self._em_carga[tabela].ids.update(fora)
+            versao = self._versoes.get(tabela, 0) + 1
+            self._versoes[tabela] = versao
+            entrada.df = df
+            entrada.versao = versao
+            entrada.tamanho_bytes = int(df.memory_usage(deep=True).sum())
+        if self.disco:
+            self.disco.agendar(tabela, df, entrada.marca)
+        return True
+
+    # --- Invalidação ---
+    def nova_versao(self, tabela: str):
+        """Sobe a versão sem mexer na cópia em cache (os derivados da tabela são recalculados)."""
+        with self._lock:
+            self._versoes[tabela] = self._versoes.get(tabela, 0) + 1
+
+    def invalidar(self, tabela: str, ids: list = None, total: bool = False):
+        """
+        Marca a tabela como desatualizada. Com `total=True` a próxima leitura
+        recarrega tudo; senão faz delta, relendo também os `ids` alterados.
+        """
+        if self.disco and (ids or total):
+            # A delta pela marca não acharia essas linhas depois de um reinício
+            self.disco.descartar(tabela)
+        with self._lock:
+            # A versão avança já na invalidação, para os derivados (agregados
+            # lidos direto do banco) não servirem valores velhos
+            self._versoes[tabela] = self._versoes.get(tabela, 0) + 1
+            if tabela in self._em_carga:
+                # A leitura em andamento pode ser anterior a esta gravação
+                na_carga = self._em_carga[tabela]
+                na_carga.mudou = True
+                na_carga.total = na_carga.total or total
+                na_carga.ids.update(ids or ())
+            entrada = self._entradas.get(tabela)
+            if entrada is None:
+                return
+            if total:
+                del self._entradas[tabela]
+                return
+            entrada.valida = False
+            if ids:
+                entrada.ids_alterados.update(ids)
+
+    def invalidar_tudo(self, total: bool = False):
+        with self._lock:
+            for tabela in list(self._entradas):
+                self.invalidar(tabela, total=total)
+
+
+def _disco():
+    """Snapshots em disco (SNAPSHOT_CACHE, ligado por padrão), ou None."""
+    if not st.secrets.get("SNAPSHOT_CACHE", True):
+        return None
+    # Snapshot de um banco não serve para outro
+    if st.secrets.get("DB_BACKEND", "supabase") == "sqlite":
+        origem = os.path.abspath(st.secrets.get("SQLITE_PATH", "dados/farmacia.db"))
+    else:
+        origem = st.secrets.get("SUPABASE_URL", "")
+    try:
+        return snapshot.SnapshotDisco(
+            st.secrets.get("SNAPSHOT_PASTA", snapshot.PASTA), origem,
+            intervalo=float(st.secrets.get("SNAPSHOT_INTERVALO_S", snapshot.INTERVALO_S)),
+        )
+    except ImportError:
+        print("pyarrow não instalado: cache sem snapshots em disco")
+        return None
+
+
+@st.cache_resource
+def get_shared_cache() -> SharedDataCache:
+    """Instância única do cache por processo do servidor."""
+    return SharedDataCache(
+        ttl_segundos=float(st.secrets.get("CACHE_TTL_SEGUNDOS", CACHE_TTL_SEGUNDOS)),
+        max_bytes=int(float(st.secrets.get("CACHE_MAX_MB", CACHE_MAX_MB)) * 1024 * 1024),
+        disco=_disco(),
+    )
+
+
+def tabela_atual(db: DatabaseService, tabela: str, df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    A cópia da tabela no cache compartilhado, que é a que corresponde à versão
+    usada na memoização; `df` (o da sessão, que pode estar atrás) só quando
+    ela não está em cache.
+    """
+    atual = db.cache.tabela(tabela) if db.cache else None
+    return df if atual is None else atual
+
+
+def memoizar(db: DatabaseService, chave, tabelas: list, calcular):
+    """`SharedDataCache.derivado` quando o serviço tem cache; senão só calcula."""
+    if not db.cache:
+        return calcular()
+    return db.cache.derivado(chave, tabelas, calcular)
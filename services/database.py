@@ -1,60 +1,408 @@
 import streamlit as st
 import pandas as pd
-from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from services.backends.base import EstoqueInsuficiente, StorageBackend
+from services.backends.instrumentado import BackendInstrumentado
+from services.backends.resiliente import BackendResiliente, TENTATIVAS, ESPERA_BASE_S, ESPERA_MAX_S
+from services.aggregates import AGREGADOS, agregar_frame, colunas_saida
+from services import schema
+
+TABELAS_SIMPLES = ['clientes', 'produtos', 'servicos', 'atendentes', 'transacoes', 'compras']
+
+# Tabelas de histórico que crescem sem parar: sincronizadas por delta (marca d'água).
+# As de cadastro são pequenas e continuam sendo recarregadas por inteiro.
+TABELAS_INCREMENTAIS = ['transacoes', 'compras', 'agendamentos']
+
+SELECT_AGENDAMENTOS = "*, clientes(nome), servicos(nome, duracao_estimada), atendentes(nome)"
+
+# Quantas consultas podem ir ao banco ao mesmo tempo na carga das tabelas
+MAX_CONCORRENCIA = 7
+
+# Linhas por página nas leituras com .range(). Não deve passar do "max-rows"
+# do PostgREST (1000 no Supabase), senão a paginação para antes do fim.
+PAGE_SIZE = 1000
+
+TODAS_TABELAS = TABELAS_SIMPLES + ['agendamentos']
+
+# Tabelas cujo nome aparece achatado (join) em outras: alterar um cadastro
+# exige recarregar por inteiro quem depende dele.
+DEPENDENTES = {
+    'clientes': ['agendamentos'],
+    'servicos': ['agendamentos'],
+    'atendentes': ['agendamentos'],
+}
 
 class DatabaseService:
-    def __init__(self):
-        self.client = self._init_connection()
+    def __init__(self, cache=None, max_concorrencia: int = None, page_size: int = None, on_progress=None,
+                 backend: StorageBackend = None, fila=None, feed=None):
+        # Backend configurado: o mesmo para todas as sessões (a coalescência de
+        # leituras só junta sessões diferentes se elas dividem o envoltório)
+        self.backend = self._envolver(backend) if backend else self._backend_compartilhado()
+        self.cache = cache
+        self.max_concorrencia = int(max_concorrencia or st.secrets.get("DB_MAX_CONCORRENCIA", MAX_CONCORRENCIA))
+        self.page_size = int(page_size or st.secrets.get("DB_PAGE_SIZE", PAGE_SIZE))
+        # Callback opcional on_progress(tabela, linhas_lidas), chamado a cada página
+        # (roda nas threads de carga: não deve chamar widgets do Streamlit)
+        self.on_progress = on_progress
+        # Fila de escrita local (services/fila_escrita.py): com ela, as gravações
+        # voltam na hora e são enviadas ao banco em segundo plano
+        self.fila = fila
+        # Feed de alterações (services/alteracoes.py): conectado, ele mesmo leva
+        # as gravações ao cache e não é preciso invalidar e reler
+        self.feed = feed
 
     @staticmethod
     @st.cache_resource
-    def _init_connection() -> Client:
+    def _init_connection() -> StorageBackend:
+        """Cria o backend escolhido em DB_BACKEND ('supabase' por padrão ou 'sqlite')."""
         try:
-            url = st.secrets["SUPABASE_URL"]
-            key = st.secrets["SUPABASE_KEY"]
-            return create_client(url, key)
+            tipo = st.secrets.get("DB_BACKEND", "supabase")
+            if tipo == "sqlite":
+                from services.backends.sqlite_backend import SQLiteBackend
+                return SQLiteBackend(st.secrets.get("SQLITE_PATH", "dados/farmacia.db"))
+
+            from services.backends import supabase_backend as sb
+            return sb.SupabaseBackend(
+                st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"],
+                timeout=float(st.secrets.get("DB_TIMEOUT_S", sb.TIMEOUT_S)),
+                pool=int(st.secrets.get("DB_POOL", sb.POOL)),
+                keepalive=float(st.secrets.get("DB_KEEPALIVE_S", sb.KEEPALIVE_S)),
+            )
         except Exception as e:
             st.error(f"⚠️ Erro crítico de conexão: {e}")
             return None
 
-    def fetch_all_tables(self):
-        """Busca dados de todas as tabelas essenciais."""
-        if not self.client: return {}
-        
-        dados = {}
-        tabelas_simples = ['clientes', 'produtos', 'servicos', 'atendentes', 'transacoes', 'compras']
-        
-        # Tabelas Simples
-        for tabela in tabelas_simples:
+    @staticmethod
+    def _envolver(backend: StorageBackend) -> StorageBackend:
+        """
+        Toda chamada ao banco passa pelas métricas (services/metrics.py); por fora,
+        leituras idênticas simultâneas são coalescidas e as transitórias repetidas.
+        """
+        return BackendResiliente(
+            BackendInstrumentado(backend),
+            tentativas=int(st.secrets.get("DB_TENTATIVAS", TENTATIVAS)),
+            espera_base=float(st.secrets.get("DB_ESPERA_BASE_S", ESPERA_BASE_S)),
+            espera_max=float(st.secrets.get("DB_ESPERA_MAX_S", ESPERA_MAX_S)),
+        )
+
+    @staticmethod
+    @st.cache_resource
+    def _backend_compartilhado() -> StorageBackend:
+        """Backend de DB_BACKEND já envolvido, único por processo (None sem conexão)."""
+        backend = DatabaseService._init_connection()
+        return DatabaseService._envolver(backend) if backend else None
+
+    @staticmethod
+    def _colunas(tabela: str) -> str:
+        """Colunas (+ joins) da carga de cada tabela."""
+        return SELECT_AGENDAMENTOS if tabela == 'agendamentos' else "*"
+
+    @staticmethod
+    def _to_frame(tabela: str, rows: list) -> pd.DataFrame:
+        """Converte as linhas da API em DataFrame (achatando os joins dos agendamentos)."""
+        if tabela != 'agendamentos':
+            return pd.DataFrame(rows)
+
+        dados_flat = []
+        for row in rows:
+            r = {k: v for k, v in row.items() if k not in ('clientes', 'servicos', 'atendentes')}
+            r['Cliente'] = row['clientes']['nome'] if row.get('clientes') else 'Desconhecido'
+            r['Serviço'] = row['servicos']['nome'] if row.get('servicos') else 'N/A'
+            r['duracao'] = row['servicos'].get('duracao_estimada') if row.get('servicos') else None
+            r['Profissional'] = row['atendentes']['nome'] if row.get('atendentes') else 'N/A'
+            dados_flat.append(r)
+        return pd.DataFrame(dados_flat)
+
+    @staticmethod
+    def _ordenar(tabela: str, df: pd.DataFrame) -> pd.DataFrame:
+        coluna = 'data_agendamento' if tabela == 'agendamentos' else 'id'
+        if df.empty or coluna not in df.columns:
+            return df
+        return df.sort_values(coluna, ascending=False, kind='stable').reset_index(drop=True)
+
+    @staticmethod
+    def marca_dagua(df: pd.DataFrame) -> dict:
+        """Marca d'água de sincronização: maior id e maior updated_at (se existir)."""
+        if df is None or df.empty or 'id' not in df.columns:
+            return {}
+        marca = {'id': int(df['id'].max())}
+        if 'updated_at' in df.columns and df['updated_at'].notna().any():
+            ultimo = df['updated_at'].dropna().max()
+            marca['updated_at'] = ultimo.isoformat() if isinstance(ultimo, pd.Timestamp) else str(ultimo)
+        return marca
+
+    @staticmethod
+    def _colunas_ordem(tabela: str) -> list:
+        # O id no fim desempata, deixando a ordem estável entre as páginas
+        # (vendas_diarias não tem id: a chave é dia + forma de pagamento)
+        if tabela == 'vendas_diarias':
+            return ['data', 'pagamento']
+        return ['data_agendamento', 'id'] if tabela == 'agendamentos' else ['id']
+
+    def _paginar(self, tabela: str, colunas: str, filtros: list, ordem: list, page_size: int = None):
+        """Gerador de páginas (listas de linhas) lidas por faixa (.range())."""
+        page_size = page_size or self.page_size
+        ordem = [(c, True) for c in ordem]
+        inicio = 0
+        while True:
+            linhas = self.backend.select(tabela, colunas, filtros, ordem, inicio, inicio + page_size - 1)
+            if linhas:
+                yield linhas
+            if len(linhas) < page_size:
+                break
+            inicio += len(linhas)
+
+    def iter_pages(self, tabela: str, filtros: list = None, page_size: int = None, on_progress=None,
+                   colunas: str = None):
+        """
+        Lê a tabela página por página, devolvendo um DataFrame por página.
+        `filtros` segue o formato do backend: [(coluna, operador, valor), ...].
+        `colunas` troca o select padrão da carga; aí as linhas vêm como estão, sem achatar joins.
+        """
+        on_progress = on_progress or self.on_progress
+        lidas = 0
+
+        for linhas in self._paginar(tabela, colunas or self._colunas(tabela), filtros,
+                                    self._colunas_ordem(tabela), page_size):
+            lidas += len(linhas)
+            if on_progress:
+                on_progress(tabela, lidas)
+            yield pd.DataFrame(linhas) if colunas else self._to_frame(tabela, linhas)
+
+    def _ler_paginado(self, tabela: str, filtros: list = None) -> pd.DataFrame:
+        """Concatena as páginas de `iter_pages` em um único DataFrame (tipos ainda crus)."""
+        paginas = list(self.iter_pages(tabela, filtros))
+        if not paginas:
+            return pd.DataFrame()
+        return pd.concat(paginas, ignore_index=True)
+
+    def _fetch_table(self, tabela: str) -> pd.DataFrame:
+        """Carga completa de uma tabela, já nos tipos compactos de services/schema.py."""
+        return schema.aplicar(tabela, self._ler_paginado(tabela))
+
+    def _carregar_em_paralelo(self, tarefas: dict, max_concorrencia: int = None) -> dict:
+        """
+        Executa as cargas {tabela: função} em um pool de threads.
+        Cada função trata os próprios erros, então uma tabela com falha
+        não derruba a carga das outras.
+        """
+        workers = max(1, min(max_concorrencia or self.max_concorrencia, len(tarefas)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-load") as pool:
+            futuros = {tabela: pool.submit(fn) for tabela, fn in tarefas.items()}
+        return {tabela: f.result() for tabela, f in futuros.items()}
+
+    def fetch_all_tables(self, tabelas: list = None, max_concorrencia: int = None):
+        """
+        Busca dados de todas as tabelas essenciais (ou só de `tabelas`), em paralelo e paginado.
+        Tabelas que falharam ficam de fora do resultado (e não vazias), para quem
+        chama manter o que já tinha.
+        """
+        if not self.backend: return {}
+
+        def carregar(tabela):
             try:
-                res = self.client.table(tabela).select("*").order('id', desc=True).execute()
-                dados[tabela] = pd.DataFrame(res.data)
+                return self._fetch_table(tabela)
             except Exception as e:
                 print(f"Erro ao buscar {tabela}: {e}")
-                dados[tabela] = pd.DataFrame() 
+                return None
 
-        try:
-            res_ag = self.client.table('agendamentos').select("*, clientes(nome), servicos(nome), atendentes(nome)").order('data_agendamento', desc=True).execute()
-            dados_flat = []
-            for row in res_ag.data:
-                r = row.copy()
-                r['Cliente'] = row['clientes']['nome'] if row.get('clientes') else 'Desconhecido'
-                r['Serviço'] = row['servicos']['nome'] if row.get('servicos') else 'N/A'
-                r['Profissional'] = row['atendentes']['nome'] if row.get('atendentes') else 'N/A'
-                dados_flat.append(r)
-            dados['agendamentos'] = pd.DataFrame(dados_flat)
-        except Exception as e:
-            print(f"Erro ao buscar agendamentos: {e}")
-            dados['agendamentos'] = pd.DataFrame()
+        tabelas = tabelas or TODAS_TABELAS
+        dados = self._carregar_em_paralelo(
+            {t: (lambda t=t: carregar(t)) for t in tabelas}, max_concorrencia
+        )
+        return {k: v for k, v in dados.items() if v is not None}
+
+    def _fetch_table_delta(self, tabela: str, df_atual: pd.DataFrame, marca: dict, alterados=None) -> pd.DataFrame:
+        """Traz só o que mudou desde a marca d'água e mescla no DataFrame em cache."""
+        partes = []
+
+        # 1. Linhas novas
+        partes.append(self._ler_paginado(tabela, [('id', 'gt', marca['id'])]))
+
+        # 2. Linhas alteradas (por updated_at, quando a tabela tiver a coluna)
+        if marca.get('updated_at'):
+            partes.append(self._ler_paginado(tabela, [('updated_at', 'gt', marca['updated_at'])]))
+
+        # 3. Linhas alteradas pelo app (tabelas sem updated_at)
+        if alterados:
+            ids = sorted(alterados)
+            for i in range(0, len(ids), self.page_size):
+                lote = ids[i:i + self.page_size]
+                partes.append(self._ler_paginado(tabela, [('id', 'in', lote)]))
+
+        # 4. Exclusões: compara só a lista de ids, que é leve
+        ids_servidor = set()
+        for linhas in self._paginar(tabela, 'id', None, ['id']):
+            ids_servidor.update(r['id'] for r in linhas)
+
+        df = pd.concat([df_atual] + [p for p in partes if not p.empty], ignore_index=True)
+        df = df.drop_duplicates(subset='id', keep='last')
+        df = df[df['id'].isin(ids_servidor)]
+        return schema.aplicar(tabela, self._ordenar(tabela, df))
+
+    def fetch_delta(self, dados_atuais: dict, marcas: dict, alterados: dict = None,
+                    tabelas: list = None, max_concorrencia: int = None) -> dict:
+        """
+        Sincronização incremental. Tabelas de histórico (TABELAS_INCREMENTAIS) com
+        marca d'água recebem só as linhas novas/alteradas e têm as exclusões aplicadas;
+        as demais (ou sem cache ainda) são recarregadas por inteiro.
+        `alterados` ({tabela: ids}) lista linhas editadas pelo app que devem ser relidas.
+        Tabelas que falharam ficam de fora do resultado, como em fetch_all_tables.
+        """
+        alterados = alterados or {}
+        if not self.backend: return {}
+
+        def sincronizar(tabela):
+            df_atual = dados_atuais.get(tabela)
+            marca = marcas.get(tabela)
+            try:
+                if tabela in TABELAS_INCREMENTAIS and marca and df_atual is not None and 'id' in df_atual.columns:
+                    return self._fetch_table_delta(tabela, df_atual, marca, alterados.get(tabela))
+                return self._fetch_table(tabela)
+            except Exception as e:
+                print(f"Erro ao sincronizar {tabela}: {e}")
+                return None
 
-        return dados
+        tabelas = tabelas or TODAS_TABELAS
+        dados = self._carregar_em_paralelo(
+            {t: (lambda t=t: sincronizar(t)) for t in tabelas}, max_concorrencia
+        )
+        return {k: v for k, v in dados.items() if v is not None}
 
-    def insert(self, table: str, data: dict):
-        return self.client.table(table).insert(data).execute()
+    def _invalidar(self, table: str, record_id: int = None, cadastro_alterado: bool = False, ids: list = None):
+        """Avisa o cache compartilhado que a tabela mudou (`record_id` ou `ids` alterados)."""
+        if not self.cache:
+            return
+        if self.feed is not None and self.feed.ativo:
+            # As linhas chegam ao cache pelo feed; a versão sobe já, para os derivados
+            # lidos do banco (agregados, resumo diário) não ficarem velhos até lá
+            self.cache.nova_versao(table)
+            return
+        self.cache.invalidar(table, ids=[record_id] if record_id is not None else ids)
+        if cadastro_alterado:
+            for dependente in DEPENDENTES.get(table, []):
+                self.cache.invalidar(dependente, total=True)
+
+    def select(self, table: str, columns: str = "*", filters: list = None, order: list = None,
+               limit: int = None) -> list:
+        """Consulta pontual (sem cache), ex.: select('produtos', 'estoque', [('id', 'eq', 3)])."""
+        if limit:
+            return self.backend.select(table, columns, filters, order, 0, limit - 1)
+        return self.backend.select(table, columns, filters, order)
+
+    def agregar(self, nome: str, desde=None) -> pd.DataFrame:
+        """
+        Resultado agrupado de services/aggregates.AGREGADOS calculado no backend
+        (RPC no Supabase, GROUP BY no SQLite), trafegando só o resumo.
+        Se o backend não suportar, calcula em pandas sobre a tabela em cache.
+        Memoizado pela versão da tabela (e pelo TTL) quando há cache compartilhado.
+        """
+        definicao = AGREGADOS[nome]
+
+        def calcular():
+            try:
+                return pd.DataFrame(self.backend.aggregate(nome, definicao, desde), columns=colunas_saida(definicao))
+            except Exception as e:
+                if not isinstance(e, NotImplementedError):
+                    print(f"Agregado {nome} indisponível no servidor, calculando localmente: {e}")
+                if self.cache:
+                    df = self.cache.get_tables(self, [definicao.tabela]).get(definicao.tabela)
+                else:
+                    df = self._ler_paginado(definicao.tabela)
+                return agregar_frame(definicao, df, desde)
+
+        if not self.cache:
+            return calcular()
+        return self.cache.derivado(('agregado', nome, str(desde)), [definicao.tabela], calcular)
+
+    def rpc(self, function: str, params: dict = None) -> list:
+        """Operação de servidor (função SQL no Supabase / equivalente local)."""
+        return self.backend.rpc(function, params)
+
+    def registrar_venda(self, transacao: dict, itens: list) -> dict:
+        """
+        Fecha uma venda em uma única ida ao servidor: valida e baixa o estoque,
+        grava a transação, os itens e o resumo diário de forma atômica.
+        Levanta EstoqueInsuficiente (nada é gravado) se algum item não tiver saldo.
+        Com a fila de escrita, a venda volta na hora e a recusa por estoque
+        aparece depois, no indicador da fila.
+        `itens`: [{'id_produto', 'quantidade', 'valor_unitario'}, ...]
+        """
+        rows = self._gravar('registrar_venda', 'transacoes', {'p_transacao': transacao, 'p_itens': itens})
+        return rows[0] if rows else None
+
+    def registrar_compra(self, compra: dict) -> dict:
+        """
+        Entrada de estoque atômica: grava a compra e soma a quantidade ao saldo
+        do produto no servidor, sem ler o saldo antes.
+        `compra`: {'id_produto', 'quantidade', 'valor_total', 'fornecedor', 'data_compra'}
+        """
+        rows = self._gravar('registrar_compra', 'compras', {'p_compra': compra})
+        return rows[0] if rows else None
+
+    def insert(self, table: str, data):
+        """Insere um registro (dict) ou vários (lista). Devolve as linhas criadas."""
+        return self._gravar('insert', table, data)
 
     def update(self, table: str, data: dict, record_id: int):
-        return self.client.table(table).update(data).eq('id', record_id).execute()
+        return self._gravar('update', table, data, record_id)
 
     def delete(self, table: str, record_id: int):
-        return self.client.table(table).delete().eq('id', record_id).execute()
\ No newline at end of file
+        return self._gravar('delete', table, None, record_id)
+
+    def upsert(self, table: str, data: list) -> list:
+        """
+        Gravação em lote (importação de planilha): registros com 'id' atualizam,
+        sem 'id' são inseridos, numa chamada só. Vai direto ao banco, sem a fila
+        de escrita: a importação é feita com conexão e devolve os ids definitivos.
+        """
+        rows = self.backend.upsert(table, data)
+        atualizados = [r['id'] for r in data if r.get('id') is not None]
+        self._invalidar(table, cadastro_alterado=bool(atualizados), ids=atualizados)
+        return rows
+
+    def _gravar(self, tipo: str, table: str, data, record_id: int = None) -> list:
+        """
+        Executa a gravação no banco e invalida o cache ou, com a fila de escrita,
+        só a registra no disco local (o envio e a invalidação ficam com a fila).
+        `tipo`: insert, update, delete ou o nome da RPC (registrar_venda...).
+        """
+        if self.fila:
+            return self.fila.enfileirar(tipo, table, data, record_id)
+        filtro = [('id', 'eq', record_id)]
+        if tipo == 'insert':
+            rows = self.backend.insert(table, data)
+        elif tipo == 'update':
+            rows = self.backend.update(table, data, filtro)
+        elif tipo == 'delete':
+            rows = self.backend.delete(table, filtro)
+        else:
+            rows = self.backend.rpc(tipo, data)
+        self._invalidar_gravacao(tipo, table, data, record_id)
+        return rows
+
+    def aplicar_operacoes(self, operacoes: list) -> list:
+        """
+        Envia um lote da fila de escrita numa ida só ao servidor, com chaves de
+        idempotência (sql/fila_escrita.sql), e invalida o cache do que foi aplicado.
+        Devolve um resultado por operação, na ordem, até a primeira recusada.
+        """
+        resultados = self.backend.rpc('aplicar_operacoes', {'p_operacoes': operacoes})
+        for op, resultado in zip(operacoes, resultados):
+            if resultado.get('ok'):
+                self._invalidar_gravacao(op['tipo'], op['tabela'], op['dados'], op.get('id'))
+        return resultados
+
+    def _invalidar_gravacao(self, tipo: str, table: str, data, record_id: int = None):
+        if tipo == 'update':
+            self._invalidar(table, record_id, cadastro_alterado=True)
+        elif tipo == 'registrar_venda':
+            self._invalidar('transacoes')
+            for item in data['p_itens']:
+                self._invalidar('produtos', item['id_produto'])
+        elif tipo == 'registrar_compra':
+            self._invalidar('compras')
+            self._invalidar('produtos', data['p_compra']['id_produto'])
+        else:
+            self._invalidar(table)
@@ -0,0 +1,73 @@
+"""
+Frames derivados e já tipados, compartilhados entre as telas.
+
+A conversão de tipos (datas, horários em minutos, nome do cliente...) é feita
+uma vez por versão das tabelas de origem (ou depois do TTL) e memoizada no
+cache do processo (SharedDataCache.derivado). O cálculo usa a cópia do cache compartilhado, a
+da versão que vai na chave, e não o frame da sessão que pediu (que pode estar
+atrás); o frame da sessão só é usado sem cache. Os frames nunca são alterados:
+cada função devolve uma cópia própria, que deve ser tratada como somente leitura.
+"""
+import pandas as pd
+
+from services import agenda, rollup
+from services.cache import memoizar, tabela_atual
+from services.lookups import lookup
+
+CONSUMIDOR_FINAL = "Consumidor Final"
+
+
+def agendamentos(db, df_ag: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agendamentos com 'data' (datetime64, dia) e 'inicio' (minutos desde 00:00),
+    ordenados por data e horário. Mantém as colunas originais.
+    """
+    def calcular():
+        df = tabela_atual(db, 'agendamentos', df_ag)
+        if df is None or df.empty or 'data_agendamento' not in df.columns:
+            return pd.DataFrame(columns=list(getattr(df, 'columns', [])) + ['data', 'inicio'])
+        out = df.assign(
+            data=pd.to_datetime(df['data_agendamento'], errors='coerce').dt.normalize(),
+            inicio=agenda.horario_em_minutos(df['horario']).astype('Int32'),
+        )
+        return out.sort_values(['data', 'inicio'], kind='stable')
+    return memoizar(db, ('agendamentos_tipados',), ['agendamentos'], calcular)
+
+
+def agendamentos_do_dia(db, df_ag: pd.DataFrame, dia) -> pd.DataFrame:
+    """Fatia de `agendamentos` de um dia (já ordenada por horário)."""
+    dia = pd.Timestamp(dia).normalize()
+
+    def calcular():
+        tipados = agendamentos(db, df_ag)
+        if tipados.empty:
+            return tipados
+        return tipados[tipados['data'] == dia]
+    return memoizar(db, ('agendamentos_do_dia', dia), ['agendamentos'], calcular)
+
+
+def transacoes_recentes(db, df_cli: pd.DataFrame, limite: int) -> pd.DataFrame:
+    """
+    As `limite` transações mais recentes, com 'data_transacao' em datetime64 e
+    a coluna 'Cliente' (nome ou Consumidor Final), da mais nova para a mais velha.
+    """
+    def calcular():
+        df = pd.DataFrame(db.select('transacoes', order=[('id', True)], limit=limite))
+        if df.empty:
+            return df
+        df = df.assign(
+            data_transacao=pd.to_datetime(df['data_transacao'], errors='coerce', format='ISO8601'),
+            Cliente=lookup(db, 'clientes', df_cli).mapear(df['id_cliente'], padrao=CONSUMIDOR_FINAL),
+        )
+        return df.sort_values('data_transacao', ascending=False)
+    return memoizar(db, ('transacoes_recentes', limite), ['transacoes', 'clientes'], calcular)
+
+
+def vendas_por_periodo(db, freq: str = 'W') -> pd.DataFrame:
+    """Faturamento por período ('W', 'MS'...) pronto para gráfico: colunas 'periodo' e 'valor_total'."""
+    def calcular():
+        serie = rollup.resumo_periodo(db, freq)
+        if serie.empty:
+            return pd.DataFrame(columns=['periodo', 'valor_total'])
+        return serie['faturamento'].rename('valor_total').rename_axis('periodo').reset_index()
+    return memoizar(db, ('vendas_por_periodo', freq), ['transacoes'], calcular)
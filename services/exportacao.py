@@ -0,0 +1,192 @@
+"""
+Exportação de tabelas para CSV ou Parquet, em streaming.
+
+As linhas são lidas do banco página por página (DatabaseService.iter_pages)
+e cada página é escrita no arquivo antes de ler a próxima: o histórico
+inteiro nunca fica na memória. Os nomes de Cliente/Produto/Serviço/
+Profissional entram pelos índices dos cadastros em cache (services/lookups.py),
+sem join no banco.
+
+Pela tela: botão no dashboard. Para rotinas noturnas:
+
+    python -m services.exportacao transacoes --de 2025-01-01 --ate 2025-01-31
+    python -m services.exportacao compras --formato parquet --saida compras.parquet
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+
+from services import schema
+from services.database import DatabaseService, TODAS_TABELAS
+from services.lookups import lookup
+
+FORMATOS = ['csv', 'parquet']
+
+# Coluna usada no período (--de/--ate) de cada tabela de histórico
+COLUNA_DATA = {
+    'transacoes': 'data_transacao',
+    'compras': 'data_compra',
+    'agendamentos': 'data_agendamento',
+}
+
+# Nomes trazidos dos cadastros: {tabela: {coluna de id: (cadastro, coluna do nome)}}
+NOMES = {
+    'transacoes': {'id_cliente': ('clientes', 'Cliente')},
+    'compras': {'id_produto': ('produtos', 'Produto')},
+    'agendamentos': {
+        'id_cliente': ('clientes', 'Cliente'),
+        'id_servico': ('servicos', 'Serviço'),
+        'id_atendente': ('atendentes', 'Profissional'),
+    },
+}
+
+# CSV no formato que o Excel em português abre direto
+CSV_OPCOES = {'sep': ';', 'decimal': ',', 'index': False}
+CSV_CODIFICACAO = 'utf-8-sig'
+
+
+def filtros_periodo(tabela: str, inicio: date = None, fim: date = None) -> list:
+    """Filtros do backend para o período [inicio, fim] (dias inteiros)."""
+    if inicio is None and fim is None:
+        return []
+    if tabela not in COLUNA_DATA:
+        raise ValueError(f"A tabela {tabela} não tem data para filtrar o período.")
+    coluna = COLUNA_DATA[tabela]
+    filtros = []
+    if inicio is not None:
+        filtros.append((coluna, 'gte', inicio.isoformat()))
+    if fim is not None:
+        # data_transacao tem hora: "até o dia" é "antes do dia seguinte"
+        filtros.append((coluna, 'lt', (fim + timedelta(days=1)).isoformat()))
+    return filtros
+
+
+def _indices(db: DatabaseService, tabela: str) -> dict:
+    """{cadastro: Lookup} dos cadastros que `tabela` referencia (do cache, quando houver)."""
+    cadastros = sorted({c for c, _ in NOMES.get(tabela, {}).values()})
+    if not cadastros:
+        return {}
+    dfs = db.cache.get_tables(db, cadastros) if db.cache else db.fetch_all_tables(cadastros)
+    return {c: lookup(db, c, dfs.get(c)) for c in cadastros}
+
+
+def _preparar(tabela: str, df: pd.DataFrame, indices: dict) -> pd.DataFrame:
+    """Tipos do registro e nomes dos cadastros, com tipos estáveis entre as páginas."""
+    tipos = schema.SCHEMAS.get(tabela, {})
+    colunas = {}
+    for col in df.columns:
+        tipo = tipos.get(col)
+        if tipo in ('id', 'inteiro'):
+            colunas[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif tipo and tipo not in ('categoria', 'texto'):
+            colunas[col] = schema.converter(df[col], tipo)
+    df = df.assign(**colunas)
+    for coluna_id, (cadastro, nome) in NOMES.get(tabela, {}).items():
+        if coluna_id in df.columns:
+            df[nome] = indices[cadastro].mapear(df[coluna_id]).astype(object)
+    return df
+
+
+class _EscritorCSV:
+    """Grava páginas num CSV (cabeçalho só na primeira)."""
+
+    def __init__(self, destino: str):
+        self._arquivo = open(destino, 'w', encoding=CSV_CODIFICACAO, newline='')
+        self._cabecalho = True
+
+    def escrever(self, df: pd.DataFrame):
+        df.to_csv(self._arquivo, header=self._cabecalho, **CSV_OPCOES)
+        self._cabecalho = False
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class _EscritorParquet:
+    """Grava páginas num Parquet (um row group por página) com o esquema fixado pela primeira."""
+
+    def __init__(self, destino: str):
+        import pyarrow as pa  # dependência só da exportação em Parquet
+        import pyarrow.parquet as pq
+        self._pa, self._pq = pa, pq
+        self.destino = destino
+        self._escritor = None
+        self._esquema = None
+
+    def escrever(self, df: pd.DataFrame):
+        pa = self._pa
+        if self._escritor is None:
+            esquema = pa.Schema.from_pandas(df, preserve_index=False)
+            # Coluna toda vazia na primeira página: texto (o tipo nulo não aceita valores depois)
+            self._esquema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                       for f in esquema]).remove_metadata()
+            self._escritor = self._pq.ParquetWriter(self.destino, self._esquema)
+        df = df.reindex(columns=self._esquema.names)
+        self._escritor.write_table(pa.Table.from_pandas(df, schema=self._esquema, preserve_index=False))
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+
+
+def exportar(db: DatabaseService, tabela: str, destino: str, formato: str = 'csv',
+             inicio: date = None, fim: date = None, on_progress=None) -> int:
+    """
+    Exporta `tabela` (opcionalmente só o período [inicio, fim]) para o arquivo
+    `destino`. Devolve quantas linhas foram escritas.
+    on_progress(tabela, linhas_lidas) é chamado a cada página.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    filtros = filtros_periodo(tabela, inicio, fim)
+    indices = _indices(db, tabela)
+
+    escritor = _EscritorParquet(destino) if formato == 'parquet' else _EscritorCSV(destino)
+    linhas = 0
+    try:
+        for pagina in db.iter_pages(tabela, filtros, on_progress=on_progress, colunas="*"):
+            escritor.escrever(_preparar(tabela, pagina, indices))
+            linhas += len(pagina)
+        if linhas == 0:
+            # Período sem linhas: arquivo só com as colunas
+            escritor.escrever(_preparar(tabela, schema.vazio(tabela), indices))
+    finally:
+        escritor.fechar()
+    return linhas
+
+
+def nome_arquivo(tabela: str, formato: str, inicio: date = None, fim: date = None) -> str:
+    periodo = ''.join(f"_{d.isoformat()}" if d else '_' for d in (inicio, fim)) if inicio or fim else ''
+    return f"{tabela}{periodo}.{formato}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Exporta uma tabela do Fluxo de Caixa para CSV ou Parquet.")
+    parser.add_argument('tabela', choices=TODAS_TABELAS)
+    parser.add_argument('--de', type=date.fromisoformat, help="primeiro dia (AAAA-MM-DD)")
+    parser.add_argument('--ate', type=date.fromisoformat, help="último dia (AAAA-MM-DD)")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv')
+    parser.add_argument('--saida', help="arquivo de destino (padrão: <tabela>_<de>_<ate>.<formato>)")
+    args = parser.parse_args(argv)
+
+    if (args.de or args.ate) and args.tabela not in COLUNA_DATA:
+        parser.error(f"a tabela {args.tabela} não tem data para filtrar o período")
+
+    # Conexão e configurações vêm do mesmo .streamlit/secrets.toml do app
+    db = DatabaseService()
+    if db.backend is None:
+        print("Sem conexão com o banco.", file=sys.stderr)
+        return 1
+
+    saida = args.saida or nome_arquivo(args.tabela, args.formato, args.de, args.ate)
+    linhas = exportar(db, args.tabela, saida, args.formato, args.de, args.ate,
+                      on_progress=lambda t, n: print(f"\r{t}: {n} linhas lidas", end='', file=sys.stderr))
+    print(f"\n{linhas} linhas exportadas para {os.path.abspath(saida)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+Fila de escrita local (write-behind).
+
+Com a fila ligada, as gravações do DatabaseService (insert, update, delete,
+registrar_venda, registrar_compra) só fazem um commit num arquivo SQLite em
+modo WAL, no próprio PC, e voltam na hora: a venda não espera a rede nem
+falha com o banco fora. Uma thread de fundo envia as operações ao banco em
+lotes, na ordem em que entraram, pela função aplicar_operacoes
+(sql/fila_escrita.sql). Cada operação leva uma chave de idempotência, então
+reenviar um lote depois de um timeout não grava duas vezes.
+
+O caixa confere o estoque localmente (saldo em cache menos as reservas da
+fila, ver reservas_de_estoque); a palavra final é do registrar_venda no
+servidor, na hora do envio.
+
+Registros inseridos recebem um id provisório negativo (-seq da operação).
+Quando o servidor devolve o id definitivo, as operações seguintes que citam o
+provisório (ex.: venda para um cliente recém-cadastrado) são reescritas antes
+do envio. Operações recusadas pelo servidor (ex.: estoque insuficiente) ficam
+separadas para conferência no indicador da barra lateral.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+from services.alteracoes import get_feed
+from services.backends.base import CHAVES_ESTRANGEIRAS
+from services.cache import get_shared_cache
+from services.database import DatabaseService
+
+# Padrões (podem ser sobrescritos em st.secrets)
+CAMINHO = "dados/fila_escrita.db"
+LOTE = 50            # operações por ida ao servidor
+INTERVALO_S = 1.0    # folga entre verificações com a fila vazia
+ESPERA_MAX_S = 60.0  # teto da espera entre tentativas com o banco fora
+DIAS_HISTORICO = 7   # operações já enviadas guardadas para conferência
+
+# Colunas cujos valores podem ser ids provisórios
+COLUNAS_ID = {'id', *CHAVES_ESTRANGEIRAS.values()}
+
+# Nas RPCs, o parâmetro que é o registro gravado (devolvido com id provisório)
+REGISTRO_RPC = {'registrar_venda': 'p_transacao', 'registrar_compra': 'p_compra'}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS operacoes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT NOT NULL UNIQUE,
+    tipo TEXT NOT NULL,
+    tabela TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    id_registro INTEGER,
+    situacao TEXT NOT NULL DEFAULT 'pendente',  -- pendente | enviada | recusada
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    erro TEXT,
+    criada_em REAL NOT NULL,
+    enviada_em REAL
+);
+CREATE INDEX IF NOT EXISTS idx_operacoes_situacao ON operacoes (situacao, seq);
+CREATE TABLE IF NOT EXISTS ids (
+    id_provisorio INTEGER PRIMARY KEY,
+    id_servidor INTEGER NOT NULL
+);
+"""
+
+
+class ErroServidor(Exception):
+    """Operação recusada pelo servidor (resultado com ok = false)."""
+
+    def __init__(self, resultado: dict):
+        self.code = resultado.get('codigo')
+        super().__init__(resultado.get('erro') or 'erro desconhecido')
+
+
+def _para_json(valor):
+    # Escalares do numpy/pandas e datas que escapam dos formulários
+    return valor.item() if hasattr(valor, 'item') else str(valor)
+
+
+def _ids_provisorios(valor, coluna=None) -> set:
+    """Ids provisórios (negativos) citados nas colunas de id de `valor`."""
+    if isinstance(valor, dict):
+        return {p for k, v in valor.items() for p in _ids_provisorios(v, k)}
+    if isinstance(valor, list):
+        return {p for v in valor for p in _ids_provisorios(v, coluna)}
+    if coluna in COLUNAS_ID and type(valor) is int and valor < 0:
+        return {valor}
+    return set()
+
+
+def _trocar_ids(valor, mapa: dict, coluna=None):
+    """Cópia de `valor` com os ids provisórios trocados pelos do servidor."""
+    if isinstance(valor, dict):
+        return {k: _trocar_ids(v, mapa, k) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_trocar_ids(v, mapa, coluna) for v in valor]
+    if coluna in COLUNAS_ID and type(valor) is int:
+        return mapa.get(valor, valor)
+    return valor
+
+
+class FilaEscrita:
+    def __init__(self, caminho: str, db: DatabaseService, lote: int = LOTE,
+                 intervalo: float = INTERVALO_S, espera_max: float = ESPERA_MAX_S):
+        self.caminho = caminho
+        self.db = db  # serviço sem fila: é quem envia e invalida o cache
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self.ultimo_erro = None
+        self._local = threading.local()
+        self._lock_envio = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        con = self.conexao()
+        con.executescript(ESQUEMA)
+        with con:
+            con.execute("DELETE FROM operacoes WHERE situacao = 'enviada' AND enviada_em < ?",
+                        (time.time() - DIAS_HISTORICO * 86400,))
+
+    def conexao(self) -> sqlite3.Connection:
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            # Cada commit vai para o disco: a venda sobrevive a uma queda de energia
+            con.execute("PRAGMA synchronous=FULL")
+            self._local.con = con
+        return con
+
+    # --- Entrada (chamada pelas sessões) ---
+    def enfileirar(self, tipo: str, tabela: str, dados, id_registro: int = None) -> list:
+        """
+        Grava a operação no arquivo e acorda a thread de envio. Devolve as
+        linhas como o servidor devolveria, com id provisório no registro criado.
+        """
+        con = self.conexao()
+        with con:
+            seq = con.execute(
+                "INSERT INTO operacoes (chave, tipo, tabela, dados, id_registro, criada_em) VALUES (?, ?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex, tipo, tabela, json.dumps(dados, default=_para_json), id_registro, time.time()),
+            ).lastrowid
+        self._acordar.set()
+
+        if tipo == 'insert':
+            return [{**dados, 'id': -seq}] if isinstance(dados, dict) else [dict(d) for d in dados]
+        if tipo in ('update', 'delete'):
+            return [{**(dados or {}), 'id': id_registro}]
+        return [{**dados[REGISTRO_RPC[tipo]], 'id': -seq}] if tipo in REGISTRO_RPC else []
+
+    # --- Consulta (indicador e conferência de estoque) ---
+    def situacao(self) -> dict:
+        """Pendentes, recusadas, há quantos segundos a mais antiga espera e o último erro de envio."""
+        con = self.conexao()
+        pendentes, mais_antiga = con.execute(
+            "SELECT COUNT(*), MIN(criada_em) FROM operacoes WHERE situacao = 'pendente'").fetchone()
+        recusadas = con.execute("SELECT COUNT(*) FROM operacoes WHERE situacao = 'recusada'").fetchone()[0]
+        return {
+            'pendentes': pendentes,
+            'recusadas': recusadas,
+            'espera_s': time.time() - mais_antiga if mais_antiga else 0.0,
+            'ultimo_erro': self.ultimo_erro,
+        }
+
+    def recusadas(self) -> list:
+        con = self.conexao()
+        colunas = ('seq', 'tipo', 'tabela', 'dados', 'erro', 'criada_em')
+        linhas = con.execute(f"SELECT {', '.join(colunas)} FROM operacoes "
+                             "WHERE situacao = 'recusada' ORDER BY seq").fetchall()
+        return [dict(zip(colunas, linha)) for linha in linhas]
+
+    def reenviar(self, seq: int):
+        """Volta uma operação recusada para a fila (ex.: depois de corrigir o estoque)."""
+        con = self.conexao()
+        with con:
+            con.execute("UPDATE operacoes SET situacao = 'pendente' WHERE seq = ? AND situacao = 'recusada'", (seq,))
+        self._acordar.set()
+
+    def descartar(self, seq: int):
+        con = self.conexao()
+        with con:
+            con.execute("DELETE FROM operacoes WHERE seq = ? AND situacao = 'recusada'", (seq,))
+
+    def reservas_de_estoque(self) -> dict:
+        """{id_produto: unidades} que as vendas e compras ainda na fila vão tirar (ou pôr, se negativo) do estoque."""
+        reservas = {}
+        con = self.conexao()
+        for tipo, dados in con.execute("SELECT tipo, dados FROM operacoes WHERE situacao = 'pendente' "
+                                       "AND tipo IN ('registrar_venda', 'registrar_compra')"):
+            dados = json.loads(dados)
+            if tipo == 'registrar_venda':
+                for item in dados['p_itens']:
+                    reservas[item['id_produto']] = reservas.get(item['id_produto'], 0) + item['quantidade']
+            else:
+                compra = dados['p_compra']
+                reservas[compra['id_produto']] = reservas.get(compra['id_produto'], 0) - compra['quantidade']
+        return reservas
+
+    # --- Envio ---
+    def descarregar(self) -> int:
+        """
+        Envia as pendentes em lotes, na ordem de entrada, e devolve quantas
+        foram aplicadas. Erros transitórios (rede, banco fora) sobem e deixam
+        as operações pendentes para a próxima tentativa.
+        """
+        aplicadas = 0
+        with self._lock_envio:
+            while True:
+                lote = self._proximo_lote()
+                if not lote:
+                    return aplicadas
+                resultados = self.db.aplicar_operacoes([op for _, op in lote])
+                if not resultados:
+                    raise RuntimeError("O servidor não devolveu resultado para o lote")
+                aplicadas += self._registrar(lote, resultados)
+
+    def _proximo_lote(self) -> list:
+        """Até `lote` pendentes, com os ids provisórios já trocados: [(seq, operação), ...]."""
+        con = self.conexao()
+        linhas = con.execute("SELECT seq, chave, tipo, tabela, dados, id_registro FROM operacoes "
+                             "WHERE situacao = 'pendente' ORDER BY seq LIMIT ?", (self.lote,)).fetchall()
+        mapa = dict(con.execute("SELECT id_provisorio, id_servidor FROM ids"))
+
+        lote, no_lote = [], set()
+        for seq, chave, tipo, tabela, dados, id_registro in linhas:
+            dados = json.loads(dados)
+            faltando = _ids_provisorios({'dados': dados, 'id': id_registro}) - mapa.keys()
+            if faltando:
+                # Depende de um registro criado neste mesmo lote: vai no próximo
+                if any(-p in no_lote for p in faltando):
+                    break
+                self._recusar(seq, f"Depende da operação #{-max(faltando)}, que não foi gravada")
+                continue
+            lote.append((seq, {
+                'chave': chave, 'tipo': tipo, 'tabela': tabela,
+                'dados': _trocar_ids(dados, mapa), 'id': mapa.get(id_registro, id_registro),
+            }))
+            no_lote.add(seq)
+
+        if not lote and linhas:
+            return self._proximo_lote()  # todas recusadas por dependência: segue para as seguintes
+        return lote
+
+    def _recusar(self, seq: int, erro: str):
+        con = self.conexao()
+        with con:
+            con.execute("UPDATE operacoes SET situacao = 'recusada', tentativas = tentativas + 1, erro = ? "
+                        "WHERE seq = ?", (erro, seq))
+        print(f"Fila de escrita: operação #{seq} recusada: {erro}")
+
+    def _registrar(self, lote: list, resultados: list) -> int:
+        """Marca o que o servidor aplicou, guarda os ids definitivos e separa as recusadas."""
+        por_chave = {r.get('chave'): r for r in resultados}
+        aplicadas, transitorio = 0, None
+        con = self.conexao()
+        with con:
+            for seq, op in lote:
+                resultado = por_chave.get(op['chave'])
+                if resultado is None:
+                    break  # o servidor parou numa recusa anterior
+                if resultado.get('ok'):
+                    con.execute("UPDATE operacoes SET situacao = 'enviada', enviada_em = ?, erro = NULL "
+                                "WHERE seq = ?", (time.time(), seq))
+                    linhas = resultado.get('linhas') or []
+                    cria_registro = op['tipo'] in REGISTRO_RPC or (op['tipo'] == 'insert' and isinstance(op['dados'], dict))
+                    if cria_registro and linhas and linhas[0].get('id') is not None:
+                        con.execute("INSERT OR REPLACE INTO ids (id_provisorio, id_servidor) VALUES (?, ?)",
+                                    (-seq, linhas[0]['id']))
+                    aplicadas += 1
+                    continue
+
+                erro = ErroServidor(resultado)
+                if self.db.backend.transitorio(erro):
+                    con.execute("UPDATE operacoes SET tentativas = tentativas + 1, erro = ? WHERE seq = ?",
+                                (str(erro), seq))
+                    transitorio = erro
+                else:
+                    con.execute("UPDATE operacoes SET situacao = 'recusada', tentativas = tentativas + 1, erro = ? "
+                                "WHERE seq = ?", (str(erro), seq))
+                    print(f"Fila de escrita: operação #{seq} ({op['tipo']} em {op['tabela']}) recusada: {erro}")
+                break
+        if transitorio is not None:
+            raise transitorio
+        return aplicadas
+
+    # --- Thread de envio ---
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._trabalhar, name="fila-escrita", daemon=True)
+            self._thread.start()
+
+    def parar(self, descarregar: bool = True):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join()
+        if descarregar:
+            self.descarregar()
+
+    def _trabalhar(self):
+        espera, falhando = self.intervalo, False
+        while not self._parar.is_set():
+            if falhando:
+                # Banco fora: novas gravações não antecipam a próxima tentativa
+                self._parar.wait(espera)
+            else:
+                self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            if self._parar.is_set():
+                return
+            try:
+                self.descarregar()
+                self.ultimo_erro, falhando, espera = None, False, self.intervalo
+            except Exception as e:
+                self.ultimo_erro = str(e)
+                falhando = True
+                # Espera crescente e sorteada, para vários caixas não voltarem juntos
+                espera = random.uniform(espera, min(self.espera_max, espera * 3))
+                print(f"Fila de escrita: envio falhou ({e}); nova tentativa em {espera:.0f}s")
+
+
+@st.cache_resource
+def get_fila_escrita():
+    """
+    Fila única do processo, já com a thread de envio rodando. None quando
+    desligada (FILA_ESCRITA; por padrão só vale para o backend remoto).
+    """
+    ligada = st.secrets.get("FILA_ESCRITA", st.secrets.get("DB_BACKEND", "supabase") == "supabase")
+    if not ligada:
+        return None
+    db = DatabaseService(cache=get_shared_cache(), feed=get_feed())
+    if not db.backend:
+        return None
+    fila = FilaEscrita(
+        st.secrets.get("FILA_ESCRITA_PATH", CAMINHO), db,
+        lote=int(st.secrets.get("FILA_ESCRITA_LOTE", LOTE)),
+        espera_max=float(st.secrets.get("FILA_ESCRITA_ESPERA_MAX_S", ESPERA_MAX_S)),
+    )
+    fila.iniciar()
+    return fila
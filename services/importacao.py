@@ -0,0 +1,212 @@
+"""
+Importação em lote de cadastros a partir de planilhas (CSV ou XLSX).
+
+    df = ler_planilha(arquivo)
+    plano = preparar(df, fields, df_atual, chaves=['cpf', 'nome'])
+    plano.erros                 # linha, campo, erro (linha como no Excel: cabeçalho = 1)
+    gravar(db, 'clientes', plano, on_progress=...)
+
+As validações usam os mesmos `fields` do formulário do components/crud.py,
+mas rodam sobre a coluna inteira de uma vez. Cada linha válida vira inserção
+ou atualização conforme a chave (ex.: CPF, ou nome quando não há CPF) já
+exista no cadastro; a gravação vai em lotes de LOTE linhas por chamada.
+"""
+import io
+import json
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from services.lookups import Lookup
+
+# Linhas por chamada ao banco
+LOTE = 500
+
+# Campos numéricos gravados como inteiro (mesma regra do formulário)
+CAMPOS_INTEIROS = ['estoque', 'quantidade', 'duracao_estimada']
+
+# Gravados só com os números (o formulário pede "apenas números"); também é assim que são comparados
+_SO_DIGITOS = ('cpf', 'telefone')
+
+_VERDADEIROS = {'1', 'true', 'sim', 's', 'x', 'yes', 'y', 'verdadeiro'}
+
+
+@dataclass
+class PlanoImportacao:
+    novos: pd.DataFrame
+    atualizar: pd.DataFrame  # com a coluna 'id' do registro existente
+    erros: pd.DataFrame      # linha, campo, erro
+    ignoradas: int = 0       # repetidas na própria planilha (vale a última)
+    colunas: list = field(default_factory=list)
+
+
+def ler_planilha(arquivo, nome: str = None) -> pd.DataFrame:
+    """Lê CSV (separador detectado) ou XLSX como texto, para não perder zeros à esquerda do CPF."""
+    nome = (nome or getattr(arquivo, 'name', '')).lower()
+    if nome.endswith(('.xlsx', '.xlsm', '.xls')):
+        return pd.read_excel(arquivo, dtype=str)  # requer openpyxl
+    dados = arquivo.read() if hasattr(arquivo, 'read') else open(arquivo, 'rb').read()
+    for codificacao in ('utf-8-sig', 'latin-1'):
+        try:
+            texto = dados.decode(codificacao)
+            break
+        except UnicodeDecodeError:
+            continue
+    return pd.read_csv(io.StringIO(texto), sep=None, engine='python', dtype=str)
+
+
+def _chave(coluna: str, valores: pd.Series) -> pd.Series:
+    valores = valores.astype('string')
+    if coluna in _SO_DIGITOS:
+        valores = valores.str.replace(r'\D', '', regex=True)
+    else:
+        valores = valores.str.strip().str.casefold()
+    return valores.mask(valores == '')
+
+
+def _renomear(df: pd.DataFrame, fields: list) -> pd.DataFrame:
+    """Aceita no cabeçalho o nome do campo ou o rótulo do formulário (sem diferença de caixa)."""
+    apelidos = {}
+    for f in fields:
+        apelidos[f['name'].casefold()] = f['name']
+        apelidos[f['label'].strip().casefold()] = f['name']
+    df = df.rename(columns=lambda c: apelidos.get(str(c).strip().casefold(), c))
+    return df[[f['name'] for f in fields if f['name'] in df.columns]]
+
+
+def _converter(df: pd.DataFrame, fields: list, erros: list) -> pd.DataFrame:
+    """Converte os tipos coluna a coluna; valores que não convertem viram erro da linha."""
+    saida = pd.DataFrame(index=df.index)
+    for f in fields:
+        nome = f['name']
+        if nome not in df.columns:
+            continue
+        texto = df[nome].astype('string').str.strip()
+        texto = texto.mask(texto == '')
+        if f['type'] == 'number':
+            numeros = pd.to_numeric(texto.str.replace(',', '.', regex=False), errors='coerce')
+            invalidos = texto.notna() & numeros.isna()
+            if 'min' in f:
+                invalidos |= numeros < f['min']
+            erros.append(pd.DataFrame({'idx': df.index[invalidos], 'campo': f['label'],
+                                       'erro': 'Número inválido ou abaixo do mínimo'}))
+            if nome in CAMPOS_INTEIROS:
+                numeros = numeros.round().astype('Int64')
+            saida[nome] = numeros
+        elif f['type'] == 'checkbox':
+            saida[nome] = texto.str.casefold().isin(_VERDADEIROS).where(texto.notna())
+        elif nome in _SO_DIGITOS:
+            digitos = texto.str.replace(r'\D', '', regex=True)
+            saida[nome] = digitos.mask(digitos == '')
+        else:
+            saida[nome] = texto
+    return saida
+
+
+def validar(df: pd.DataFrame, fields: list) -> tuple:
+    """(DataFrame convertido, erros) — obrigatórios, tipos e os `validator` dos campos, vetorizados."""
+    erros = []
+    df = _converter(_renomear(df, fields), fields, erros)
+    for f in fields:
+        nome = f['name']
+        if f.get('required'):
+            vazios = df[nome].isna() if nome in df.columns else pd.Series(True, index=df.index)
+            erros.append(pd.DataFrame({'idx': df.index[vazios], 'campo': f['label'], 'erro': 'Obrigatório'}))
+        if 'validator' in f and nome in df.columns:
+            preenchidos = df[nome].dropna()
+            validos, msg = f['validator'](preenchidos)
+            if msg:
+                erros.append(pd.DataFrame({'idx': preenchidos.index[~validos.to_numpy(dtype=bool)],
+                                           'campo': f['label'], 'erro': msg}))
+
+    erros = pd.concat(erros, ignore_index=True) if erros else pd.DataFrame(columns=['idx', 'campo', 'erro'])
+    erros['idx'] = erros['idx'].astype(int)
+    return df, erros
+
+
+def preparar(df_planilha: pd.DataFrame, fields: list, df_atual: pd.DataFrame, chaves: list) -> PlanoImportacao:
+    """
+    Valida a planilha e separa as linhas válidas em novas e atualizações,
+    procurando cada uma no cadastro pelas `chaves`, em ordem (a primeira
+    preenchida na linha decide).
+    """
+    df, erros = validar(df_planilha.reset_index(drop=True), fields)
+    df = df.drop(index=erros['idx'].unique())
+
+    # Chave de cada linha: a primeira das `chaves` preenchida
+    chave_linha = pd.Series(pd.NA, index=df.index, dtype='string')
+    coluna_chave = pd.Series(pd.NA, index=df.index, dtype='string')
+    for coluna in chaves:
+        if coluna not in df.columns:
+            continue
+        valores = _chave(coluna, df[coluna])
+        usar = chave_linha.isna() & valores.notna()
+        chave_linha[usar] = valores[usar]
+        coluna_chave[usar] = coluna
+
+    # Repetidas na planilha: vale a última
+    repetidas = chave_linha.notna() & (coluna_chave + ':' + chave_linha).duplicated(keep='last')
+    df = df[~repetidas]
+    chave_linha, coluna_chave = chave_linha[~repetidas], coluna_chave[~repetidas]
+
+    # Procura no cadastro atual
+    ids = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    if df_atual is not None and not df_atual.empty:
+        for coluna in chaves:
+            usar = coluna_chave == coluna
+            if not usar.any() or coluna not in df_atual.columns:
+                continue
+            if coluna == 'nome':
+                ids[usar] = Lookup(df_atual).ids_por_nome(df.loc[usar, 'nome'])
+            else:
+                existentes = pd.Series(df_atual['id'].to_numpy(), index=_chave(coluna, df_atual[coluna]).to_numpy())
+                existentes = existentes[existentes.index.notna() & ~existentes.index.duplicated(keep='first')]
+                ids[usar] = chave_linha[usar].map(existentes).astype('Int64')
+
+    atualizar = df[ids.notna()].assign(id=ids[ids.notna()])
+    if not atualizar.empty:
+        # Célula vazia na planilha não apaga o valor que já está no cadastro
+        atuais = df_atual.set_index('id')[[c for c in atualizar.columns if c in df_atual.columns and c != 'id']]
+        atuais = atuais.astype(object).reindex(atualizar['id'].to_numpy())
+        atuais.index = atualizar.index
+        atualizar = atualizar.astype(object).fillna(atuais)
+
+    erros = erros.assign(linha=erros['idx'] + 2).sort_values('linha')[['linha', 'campo', 'erro']]
+    return PlanoImportacao(novos=df[ids.isna()], atualizar=atualizar, erros=erros.reset_index(drop=True),
+                           ignoradas=int(repetidas.sum()), colunas=list(df.columns))
+
+
+def _registros(df: pd.DataFrame) -> list:
+    """
+    Linhas como dicts de tipos nativos, prontos para a API. Células vazias
+    ficam de fora do registro (e não vão como null): a coluna fica com o
+    default do banco na inserção e com o valor atual na atualização.
+    """
+    linhas = json.loads(df.to_json(orient='records', date_format='iso'))
+    return [{k: v for k, v in linha.items() if v is not None} for linha in linhas]
+
+
+def _por_colunas(registros: list) -> list:
+    """Agrupa os registros pelas colunas preenchidas (o upsert pede as mesmas chaves no lote)."""
+    grupos = {}
+    for registro in registros:
+        grupos.setdefault(tuple(registro), []).append(registro)
+    return list(grupos.values())
+
+
+def gravar(db, tabela: str, plano: PlanoImportacao, lote: int = LOTE, on_progress=None) -> dict:
+    """
+    Grava o plano em lotes de `lote` linhas (uma chamada por lote e por
+    conjunto de colunas preenchidas). on_progress(gravadas, total) é chamado a cada lote.
+    """
+    total = len(plano.novos) + len(plano.atualizar)
+    gravadas = 0
+    for df in (plano.novos, plano.atualizar):
+        for inicio in range(0, len(df), lote):
+            pedaco = df.iloc[inicio:inicio + lote]
+            for registros in _por_colunas(_registros(pedaco)):
+                db.upsert(tabela, registros)
+            gravadas += len(pedaco)
+            if on_progress:
+                on_progress(gravadas, total)
+    return {'inseridos': len(plano.novos), 'atualizados': len(plano.atualizar)}
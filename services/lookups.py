@@ -0,0 +1,98 @@
+"""
+Índice id -> nome/preço/estoque/duração dos cadastros, compartilhado pelas telas.
+
+Cada tabela ganha um `Lookup` montado uma vez por versão (memoizado no cache
+do processo), no lugar dos `dict(zip(...))`/`set_index(...).to_dict()` que
+cada tela refazia a cada interação.
+
+    produtos = lookup(db, 'produtos', st.session_state['produtos'])
+    produtos.nomes                     # {id: nome}, pronto para selectbox
+    produtos.get(3, 'estoque')         # um valor
+    produtos.mapear(df['id_produto'])  # nomes de uma coluna inteira (vetorizado)
+    produtos.id_por_nome('Chá Verde')  # busca reversa
+"""
+import pandas as pd
+
+from services.cache import memoizar, tabela_atual
+
+# Colunas guardadas no índice de cada tabela, além do nome
+CAMPOS = {
+    'clientes': ['cpf', 'telefone'],
+    'produtos': ['tipo', 'valor_original', 'estoque'],
+    'servicos': ['valor', 'duracao_estimada'],
+    'atendentes': ['ativo', 'valor'],
+}
+
+
+def _chave_nome(nomes: pd.Series) -> pd.Series:
+    """Normaliza nomes para a busca reversa (sem diferença de caixa/espaços)."""
+    return nomes.astype(str).str.strip().str.casefold()
+
+
+class Lookup:
+    """Índice somente leitura de uma tabela de cadastro, por id."""
+
+    def __init__(self, df: pd.DataFrame, campos: list = None):
+        colunas = ['nome'] + [c for c in (campos or []) if df is not None and c in df.columns]
+        if df is None or df.empty or 'id' not in df.columns or 'nome' not in df.columns:
+            self._tabela = pd.DataFrame(columns=colunas, index=pd.Index([], dtype='int64', name='id'))
+        else:
+            tabela = df.dropna(subset=['id']).drop_duplicates(subset='id', keep='last')
+            self._tabela = tabela.set_index(tabela['id'].astype('int64'))[colunas]
+        self._mapas = {}
+        # ids como int do Python: servem de chave em dict e vão direto no JSON do banco
+        self.ids = [int(i) for i in self._tabela.index]
+        self.nomes = self.mapa('nome')
+        self._por_nome = pd.Series(self.ids, index=_chave_nome(self._tabela['nome']).to_numpy())
+        self._por_nome = self._por_nome[~self._por_nome.index.duplicated(keep='first')]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id_):
+        return id_ is not None and int(id_) in self.nomes
+
+    def mapa(self, coluna: str) -> dict:
+        """{id: valor} de uma coluna (montado uma vez por índice)."""
+        if coluna not in self._mapas:
+            serie = self._tabela[coluna] if coluna in self._tabela.columns else pd.Series(dtype=object)
+            self._mapas[coluna] = dict(zip(self.ids, serie.tolist()))
+        return self._mapas[coluna]
+
+    def nome(self, id_, padrao: str = '?') -> str:
+        return self.nomes.get(int(id_), padrao) if pd.notna(id_) else padrao
+
+    def get(self, id_, coluna: str, padrao=None):
+        if id_ is None or pd.isna(id_):
+            return padrao
+        valor = self.mapa(coluna).get(int(id_), padrao)
+        return padrao if valor is None or valor is pd.NA else valor
+
+    def linha(self, id_) -> pd.Series:
+        """Registro completo do índice (nome + CAMPOS) de um id."""
+        return self._tabela.loc[int(id_)]
+
+    def mapear(self, ids: pd.Series, coluna: str = 'nome', padrao=None) -> pd.Series:
+        """Troca uma coluna de ids pelo valor de `coluna` (join vetorizado)."""
+        valores = self._tabela[coluna] if coluna in self._tabela.columns else pd.Series(dtype=object)
+        out = pd.to_numeric(ids, errors='coerce').map(valores)
+        return out.fillna(padrao) if padrao is not None else out
+
+    def id_por_nome(self, nome: str):
+        """Id do registro com esse nome (ignorando caixa e espaços nas pontas), ou None."""
+        chave = str(nome).strip().casefold()
+        return int(self._por_nome[chave]) if chave in self._por_nome.index else None
+
+    def ids_por_nome(self, nomes: pd.Series) -> pd.Series:
+        """Busca reversa vetorizada: nomes -> ids (NA quando não existe)."""
+        return _chave_nome(nomes).map(self._por_nome).astype('Int64')
+
+
+def lookup(db, tabela: str, df: pd.DataFrame) -> Lookup:
+    """
+    Índice de `tabela`, remontado só quando ela muda. É montado da cópia do
+    cache compartilhado (a da versão na chave); `df`, o frame da sessão, só
+    é usado quando não há cache.
+    """
+    return memoizar(db, ('lookup', tabela), [tabela],
+                    lambda: Lookup(tabela_atual(db, tabela, df), CAMPOS.get(tabela)))
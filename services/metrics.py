@@ -0,0 +1,140 @@
+"""
+Métricas de desempenho do processo: chamadas ao banco e renderização das telas.
+
+Cada medição entra numa série (tipo, nome), ex.: ('db', 'select:transacoes')
+ou ('tela', 'dashboard'), que guarda as últimas JANELA durações (para p50/p95
+móveis) e os totais de chamadas, linhas, bytes e erros. Chamadas mais lentas
+que LIMITE_LENTO são impressas no log com a tabela e os filtros.
+
+    with METRICAS.cronometrar('tela', 'vendas'):
+        ...
+    METRICAS.resumo()      # DataFrame para o painel
+    METRICAS.prometheus()  # texto no formato de exposição do Prometheus
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Quantas medições recentes de cada série entram nos percentis
+JANELA = 500
+
+# Segundos a partir dos quais a chamada é registrada como lenta
+LIMITE_LENTO = {'db': 1.0, 'tela': 3.0}
+
+# Quantas chamadas lentas recentes ficam guardadas para o painel
+MAX_LENTAS = 50
+
+
+class _Serie:
+    __slots__ = ('duracoes', 'chamadas', 'segundos', 'linhas', 'bytes', 'erros')
+
+    def __init__(self):
+        self.duracoes = deque(maxlen=JANELA)
+        self.chamadas = 0
+        self.segundos = 0.0
+        self.linhas = 0
+        self.bytes = 0
+        self.erros = 0
+
+
+class Metricas:
+    def __init__(self):
+        self._series = {}
+        self._lentas = deque(maxlen=MAX_LENTAS)
+        self._lock = threading.Lock()
+
+    def registrar(self, tipo: str, nome: str, segundos: float, linhas: int = 0, bytes_: int = 0,
+                  erro: bool = False, detalhe=None):
+        with self._lock:
+            serie = self._series.get((tipo, nome))
+            if serie is None:
+                serie = self._series[(tipo, nome)] = _Serie()
+            serie.duracoes.append(segundos)
+            serie.chamadas += 1
+            serie.segundos += segundos
+            serie.linhas += linhas
+            serie.bytes += bytes_
+            serie.erros += int(erro)
+
+        limite = LIMITE_LENTO.get(tipo)
+        if limite is not None and segundos >= limite:
+            self._lentas.append({'quando': time.strftime('%H:%M:%S'), 'tipo': tipo, 'nome': nome,
+                                 'segundos': round(segundos, 3), 'detalhe': str(detalhe or '')})
+            print(f"[lento] {tipo} {nome} {segundos:.2f}s {detalhe or ''}")
+
+    @contextmanager
+    def cronometrar(self, tipo: str, nome: str, detalhe=None):
+        """Mede o bloco; exceções contam como erro e seguem adiante."""
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            yield
+        except Exception:
+            erro = True
+            raise
+        finally:
+            self.registrar(tipo, nome, time.perf_counter() - inicio, erro=erro, detalhe=detalhe)
+
+    def lentas(self) -> list:
+        return list(self._lentas)
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
+            self._lentas.clear()
+
+    def _copia(self) -> list:
+        with self._lock:
+            return [(tipo, nome, np.fromiter(s.duracoes, float), s.chamadas, s.segundos, s.linhas, s.bytes, s.erros)
+                    for (tipo, nome), s in sorted(self._series.items())]
+
+    def resumo(self) -> pd.DataFrame:
+        """Uma linha por série: chamadas, p50/p95/máx (ms) da janela, linhas, KB e erros."""
+        linhas = [{
+            'tipo': tipo, 'nome': nome, 'chamadas': chamadas,
+            'p50_ms': np.percentile(dur, 50) * 1000 if dur.size else 0.0,
+            'p95_ms': np.percentile(dur, 95) * 1000 if dur.size else 0.0,
+            'max_ms': dur.max() * 1000 if dur.size else 0.0,
+            'linhas': n_linhas, 'kb': n_bytes / 1024, 'erros': erros,
+        } for tipo, nome, dur, chamadas, _, n_linhas, n_bytes, erros in self._copia()]
+        colunas = ['tipo', 'nome', 'chamadas', 'p50_ms', 'p95_ms', 'max_ms', 'linhas', 'kb', 'erros']
+        return pd.DataFrame(linhas, columns=colunas)
+
+    def prometheus(self) -> str:
+        """Exportação em texto no formato de exposição do Prometheus (summary + contadores)."""
+        saida = [
+            '# HELP fluxo_duracao_segundos Duração das chamadas (percentis da janela recente).',
+            '# TYPE fluxo_duracao_segundos summary',
+        ]
+        contadores = {'linhas': [], 'bytes': [], 'erros': []}
+        for tipo, nome, dur, chamadas, segundos, n_linhas, n_bytes, erros in self._copia():
+            rotulo = f'tipo="{tipo}",nome="{nome}"'
+            for q in (0.5, 0.95):
+                valor = np.percentile(dur, q * 100) if dur.size else 0.0
+                saida.append(f'fluxo_duracao_segundos{{{rotulo},quantile="{q}"}} {valor:.6f}')
+            saida.append(f'fluxo_duracao_segundos_sum{{{rotulo}}} {segundos:.6f}')
+            saida.append(f'fluxo_duracao_segundos_count{{{rotulo}}} {chamadas}')
+            contadores['linhas'].append(f'fluxo_linhas_total{{{rotulo}}} {n_linhas}')
+            contadores['bytes'].append(f'fluxo_bytes_total{{{rotulo}}} {n_bytes}')
+            contadores['erros'].append(f'fluxo_erros_total{{{rotulo}}} {erros}')
+        ajuda = {'linhas': 'Linhas lidas/gravadas.', 'bytes': 'Bytes (estimados) trafegados.',
+                 'erros': 'Chamadas que terminaram em erro.'}
+        for nome, linhas in contadores.items():
+            saida += [f'# HELP fluxo_{nome}_total {ajuda[nome]}', f'# TYPE fluxo_{nome}_total counter'] + linhas
+        return '\n'.join(saida) + '\n'
+
+    def exportar_arquivo(self, caminho: str):
+        """Grava prometheus() de forma atômica (para o textfile collector do node_exporter)."""
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(temporario, caminho)
+
+
+# Instância única do processo (compartilhada por todas as sessões)
+METRICAS = Metricas()
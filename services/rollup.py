@@ -0,0 +1,98 @@
+"""
+Resumo diário de vendas (tabela vendas_diarias).
+
+Cada venda soma na linha de (dia, forma de pagamento), então as telas de
+caixa do dia e de evolução semanal/mensal leem O(dias) linhas em vez de
+varrer todas as transações.
+
+Uso pela linha de comando (recalcula tudo a partir de transacoes):
+    python -m services.rollup reconstruir
+"""
+import sys
+
+import pandas as pd
+
+PAGAMENTO_DOACAO = 'Doação'
+
+
+def registrar_venda(db, data, pagamento: str, valor: float):
+    """
+    Soma uma venda ao resumo do dia. O fechamento de venda (registrar_venda)
+    já faz isso no servidor; use só para transações gravadas por outro caminho.
+    """
+    db.rpc('registrar_venda_diaria', {
+        'p_data': str(data),
+        'p_pagamento': pagamento,
+        'p_valor': float(valor or 0),
+    })
+
+
+def reconstruir(db):
+    """Apaga e recalcula o resumo inteiro a partir de transacoes."""
+    db.rpc('reconstruir_vendas_diarias')
+    if db.cache:
+        db.cache.invalidar('transacoes')
+
+
+COLUNAS = ['data', 'pagamento', 'qtd', 'valor_total']
+
+
+def _ler(db, inicio=None, fim=None) -> pd.DataFrame:
+    """Linhas do resumo no período, lidas por páginas (o PostgREST corta em 1000 linhas)."""
+    filtros = []
+    if inicio is not None:
+        filtros.append(('data', 'gte', str(inicio)))
+    if fim is not None:
+        filtros.append(('data', 'lte', str(fim)))
+    paginas = list(db.iter_pages('vendas_diarias', filtros, colunas=', '.join(COLUNAS)))
+    if not paginas:
+        return pd.DataFrame(columns=COLUNAS)
+    return pd.concat(paginas, ignore_index=True)[COLUNAS]
+
+
+def resumo_diario(db, inicio=None, fim=None) -> pd.DataFrame:
+    """
+    Uma linha por dia: faturamento, qtd (vendas), doacoes (qtd) e o valor
+    por forma de pagamento (uma coluna por forma). Índice = data.
+    Memoizado pela versão de transacoes, que muda a cada venda deste servidor,
+    e refeito depois do TTL do cache (vendas de outros PCs).
+    """
+    def calcular():
+        df = _ler(db, inicio, fim)
+        if df.empty:
+            return pd.DataFrame(columns=['faturamento', 'qtd', 'doacoes'], index=pd.DatetimeIndex([], name='data'))
+
+        df['data'] = pd.to_datetime(df['data'])
+        por_dia = df.groupby('data').agg(faturamento=('valor_total', 'sum'), qtd=('qtd', 'sum'))
+        doacoes = df[df['pagamento'] == PAGAMENTO_DOACAO].groupby('data')['qtd'].sum()
+        por_dia['doacoes'] = doacoes.reindex(por_dia.index, fill_value=0)
+        por_pagamento = df.pivot_table(index='data', columns='pagamento', values='valor_total',
+                                       aggfunc='sum', fill_value=0)
+        return por_dia.join(por_pagamento)
+
+    if not db.cache:
+        return calcular()
+    return db.cache.derivado(('vendas_diarias', str(inicio), str(fim)), ['transacoes'], calcular)
+
+
+def resumo_periodo(db, freq: str = 'W', inicio=None, fim=None) -> pd.DataFrame:
+    """Agrupa o resumo diário por semana ('W'), mês ('MS') etc."""
+    diario = resumo_diario(db, inicio, fim)
+    if diario.empty:
+        return diario
+    return diario.resample(freq).sum()
+
+
+def caixa_do_dia(db, dia) -> float:
+    diario = resumo_diario(db, dia, dia)
+    return float(diario['faturamento'].sum()) if not diario.empty else 0.0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ['reconstruir']:
+        print("Uso: python -m services.rollup reconstruir")
+        sys.exit(1)
+
+    from services.database import DatabaseService
+    reconstruir(DatabaseService())
+    print("Resumo diário reconstruído.")
@@ -0,0 +1,150 @@
+"""
+Registro de esquemas: o tipo compacto de cada coluna das tabelas em cache.
+
+Aplicado na carga (DatabaseService), no lugar dos tipos padrão object/float64:
+- 'id'        inteiro no menor tipo possível (Int nullable se tiver nulos)
+- 'inteiro'   Int32 nullable (estoque, quantidades, minutos)
+- 'dinheiro'  float64 arredondado em 2 casas
+- 'categoria' poucos valores repetidos (pagamento, status, nomes nos joins...)
+- 'datahora'  datetime64 (sem fuso, como gravado pelo app)
+- 'instante'  datetime64 em UTC (carimbos do banco: created_at/updated_at)
+- 'data'      datetime64 só com o dia
+- 'booleano'  boolean nullable
+- 'texto'     fica como está (object)
+Colunas fora do registro só têm os inteiros reduzidos.
+"""
+import numpy as np
+import pandas as pd
+
+SCHEMAS = {
+    'transacoes': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'data_transacao': 'datahora', 'pagamento': 'categoria', 'origem': 'categoria',
+        'valor_total': 'dinheiro', 'id_cliente': 'id',
+    },
+    'clientes': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'nome': 'texto', 'cpf': 'texto', 'telefone': 'texto',
+    },
+    'produtos': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'nome': 'texto', 'tipo': 'categoria', 'valor_original': 'dinheiro', 'estoque': 'inteiro',
+    },
+    'servicos': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'nome': 'texto', 'valor': 'dinheiro', 'duracao_estimada': 'inteiro',
+    },
+    'atendentes': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'nome': 'texto', 'ativo': 'booleano', 'observacao': 'texto', 'valor': 'dinheiro',
+    },
+    'agendamentos': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'data_agendamento': 'data', 'horario': 'texto', 'status': 'categoria',
+        'id_cliente': 'id', 'id_servico': 'id', 'id_atendente': 'id',
+        'Cliente': 'categoria', 'Serviço': 'categoria', 'Profissional': 'categoria', 'duracao': 'inteiro',
+    },
+    'compras': {
+        'id': 'id', 'created_at': 'instante', 'updated_at': 'instante',
+        'id_produto': 'id', 'quantidade': 'inteiro', 'valor_total': 'dinheiro',
+        'fornecedor': 'categoria', 'data_compra': 'data',
+    },
+}
+
+# Colunas de cada tabela que as telas esperam mesmo quando ela ainda está vazia
+COLUNAS_PADRAO = {
+    'transacoes': ['id', 'created_at', 'data_transacao', 'pagamento', 'origem', 'valor_total', 'id_cliente'],
+    'clientes': ['id', 'nome', 'cpf', 'telefone'],
+    'produtos': ['id', 'nome', 'tipo', 'valor_original', 'estoque'],
+    'servicos': ['id', 'nome', 'valor', 'duracao_estimada'],
+    'atendentes': ['id', 'nome', 'ativo', 'observacao', 'valor'],
+    'agendamentos': ['id', 'data_agendamento', 'horario', 'status', 'Cliente', 'Serviço', 'Profissional'],
+    'compras': ['id', 'created_at', 'id_produto', 'quantidade', 'valor_total', 'fornecedor', 'data_compra'],
+}
+
+# dtype de cada tipo numa tabela vazia
+_DTYPE_VAZIO = {
+    'id': 'Int64', 'inteiro': 'Int32', 'dinheiro': 'float64', 'categoria': 'category',
+    'datahora': 'datetime64[ns]', 'instante': 'datetime64[ns, UTC]', 'data': 'datetime64[ns]',
+    'booleano': 'boolean', 'texto': 'object',
+}
+
+
+def _datahora(serie: pd.Series, utc: bool = False) -> pd.Series:
+    try:
+        return pd.to_datetime(serie, errors='coerce', format='ISO8601', utc=utc)
+    except (ValueError, TypeError):
+        # fusos misturados na mesma coluna: normaliza tudo para UTC
+        return pd.to_datetime(serie, errors='coerce', format='ISO8601', utc=True)
+
+
+def _id(serie: pd.Series) -> pd.Series:
+    numeros = pd.to_numeric(serie, errors='coerce')
+    if not numeros.isna().any():
+        return pd.to_numeric(numeros.astype('int64'), downcast='integer')
+    # com nulos (ex.: venda sem cliente) vai para o menor Int nullable que couber
+    maximo = numeros.abs().max()
+    for dtype in ('Int16', 'Int32'):
+        if pd.isna(maximo) or maximo <= np.iinfo(dtype.lower()).max:
+            return numeros.astype(dtype)
+    return numeros.astype('Int64')
+
+
+def converter(serie: pd.Series, tipo: str) -> pd.Series:
+    """Converte uma coluna para o tipo do registro."""
+    if tipo == 'id':
+        return _id(serie)
+    if tipo == 'inteiro':
+        return pd.to_numeric(serie, errors='coerce').round().astype('Int32')
+    if tipo == 'dinheiro':
+        return pd.to_numeric(serie, errors='coerce').astype('float64').round(2)
+    if tipo == 'categoria':
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+    if tipo == 'datahora':
+        return _datahora(serie)
+    if tipo == 'instante':
+        return _datahora(serie, utc=True)
+    if tipo == 'data':
+        return _datahora(serie).dt.normalize()
+    if tipo == 'booleano':
+        return serie.astype('boolean')
+    return serie
+
+
+def aplicar(tabela: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Devolve `df` com os tipos compactos da tabela (colunas fora do registro: só inteiros reduzidos)."""
+    if df is None or df.empty:
+        return vazio(tabela) if df is None or not len(df.columns) else df
+    tipos = SCHEMAS.get(tabela, {})
+    convertidas = {}
+    for col in df.columns:
+        serie = df[col]
+        tipo = tipos.get(col)
+        try:
+            if tipo:
+                convertidas[col] = converter(serie, tipo)
+            elif pd.api.types.is_integer_dtype(serie):
+                convertidas[col] = pd.to_numeric(serie, downcast='integer')
+        except (TypeError, ValueError) as e:
+            print(f"Coluna {tabela}.{col} mantida como {serie.dtype}: {e}")
+    return df.assign(**convertidas) if convertidas else df
+
+
+def vazio(tabela: str) -> pd.DataFrame:
+    """DataFrame vazio com as colunas padrão da tabela já nos tipos do registro."""
+    tipos = SCHEMAS.get(tabela, {})
+    return pd.DataFrame({
+        col: pd.Series(dtype=_DTYPE_VAZIO[tipos.get(col, 'texto')])
+        for col in COLUNAS_PADRAO.get(tabela, list(tipos))
+    })
+
+
+def relatorio_memoria(dados: dict) -> pd.DataFrame:
+    """Linhas, colunas e memória (MB, contando strings) de cada tabela, da maior para a menor."""
+    linhas = [{
+        'tabela': tabela,
+        'linhas': len(df),
+        'colunas': len(df.columns),
+        'MB': df.memory_usage(deep=True).sum() / 2**20,
+    } for tabela, df in dados.items() if isinstance(df, pd.DataFrame)]
+    return pd.DataFrame(linhas, columns=['tabela', 'linhas', 'colunas', 'MB']).sort_values('MB', ascending=False)
@@ -0,0 +1,147 @@
+"""
+Cópia em disco das tabelas do cache (partida rápida).
+
+Cada tabela carregada vai para um arquivo Arrow (formato IPC, sem compressão)
+em PASTA, com um manifesto JSON ao lado: marca d'água de sincronização,
+checksum do arquivo, versão do esquema e de qual banco veio. Ao subir o
+servidor, o SharedDataCache lê a tabela do disco (mapeando o arquivo na
+memória, sem passar por buffers do Python) e serve na hora; a conferência com
+o banco é só a delta desde a marca, feita em segundo plano.
+
+Um snapshot é descartado (e a tabela carregada do banco como antes) quando:
+- o checksum não bate (arquivo truncado ou corrompido);
+- a versão do esquema mudou (services/schema.py, select da carga ou FORMATO);
+- veio de outro banco (SUPABASE_URL / SQLITE_PATH diferente).
+
+As gravações vão para uma thread e são agrupadas: cada tabela é escrita no
+máximo uma vez a cada INTERVALO_S, sempre com a cópia mais recente.
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from services import schema
+from services.database import DatabaseService
+
+# Padrões (podem ser sobrescritos em st.secrets: SNAPSHOT_PASTA, SNAPSHOT_INTERVALO_S)
+PASTA = "dados/snapshots"
+INTERVALO_S = 30.0
+
+# Sobe quando o formato dos arquivos muda (invalida todos os snapshots)
+FORMATO = 1
+
+
+def versao_esquema(tabela: str) -> str:
+    """Impressão digital do que define as colunas da tabela em cache."""
+    definicao = json.dumps([FORMATO, schema.SCHEMAS.get(tabela), schema.COLUNAS_PADRAO.get(tabela),
+                            DatabaseService._colunas(tabela)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(definicao.encode('utf-8')).hexdigest()[:16]
+
+
+class SnapshotDisco:
+    """Lê e grava os snapshots de uma pasta. `origem` identifica o banco de onde os dados vieram."""
+
+    def __init__(self, pasta: str = PASTA, origem: str = '', intervalo: float = INTERVALO_S):
+        import pyarrow  # dependência opcional: sem ela o cache só não usa o disco
+        self.pasta = pasta
+        self.origem = origem
+        self.intervalo = intervalo
+        os.makedirs(pasta, exist_ok=True)
+        self._pendentes = {}  # tabela -> (df, marca) ainda não gravados
+        self._descartes = {}  # tabela -> quantas vezes foi descartada
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._trabalhar, name="snapshot-disco", daemon=True)
+        self._thread.start()
+        atexit.register(self.parar)
+
+    def _caminhos(self, tabela: str) -> tuple:
+        base = os.path.join(self.pasta, tabela)
+        return base + '.arrow', base + '.json'
+
+    # --- Leitura ---
+    def carregar(self, tabela: str):
+        """(df, marca) do snapshot da tabela, ou None se não houver um válido."""
+        import pyarrow as pa
+        arquivo, manifesto = self._caminhos(tabela)
+        if not os.path.exists(arquivo) or not os.path.exists(manifesto):
+            return None
+        try:
+            with open(manifesto, encoding='utf-8') as f:
+                info = json.load(f)
+            if info.get('versao_esquema') != versao_esquema(tabela) or info.get('origem') != self.origem:
+                print(f"Snapshot de {tabela} ignorado: esquema ou banco mudou")
+                return None
+            with pa.memory_map(arquivo) as origem:
+                dados = origem.read_buffer()
+                if hashlib.sha256(dados).hexdigest() != info.get('sha256'):
+                    print(f"Snapshot de {tabela} ignorado: checksum não confere")
+                    return None
+                df = pa.ipc.open_file(dados).read_all().to_pandas()
+            return df, info.get('marca') or {}
+        except Exception as e:
+            print(f"Snapshot de {tabela} ignorado: {e}")
+            return None
+
+    # --- Gravação ---
+    def agendar(self, tabela: str, df: pd.DataFrame, marca: dict):
+        """Marca a tabela para gravação (a cópia mais recente vence)."""
+        with self._lock:
+            self._pendentes[tabela] = (df, marca)
+
+    def descartar(self, tabela: str):
+        """Apaga o snapshot (ex.: linhas alteradas que a delta pela marca não acharia)."""
+        with self._lock:
+            self._pendentes.pop(tabela, None)
+            self._descartes[tabela] = self._descartes.get(tabela, 0) + 1
+            for caminho in self._caminhos(tabela)[::-1]:  # manifesto primeiro
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+    def descarregar(self):
+        """Grava agora tudo o que está pendente."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            descartes = dict(self._descartes)
+        for tabela, (df, marca) in pendentes.items():
+            try:
+                self._gravar(tabela, df, marca, descartes.get(tabela, 0))
+            except Exception as e:
+                print(f"Snapshot de {tabela} não gravado: {e}")
+
+    def _gravar(self, tabela: str, df: pd.DataFrame, marca: dict, descartes: int):
+        import pyarrow as pa
+        arquivo, manifesto = self._caminhos(tabela)
+        dados = pa.Table.from_pandas(df, preserve_index=False)
+        # Arquivo temporário + rename: quem ler nunca pega um arquivo pela metade
+        with pa.OSFile(arquivo + '.tmp', 'wb') as destino:
+            with pa.ipc.new_file(destino, dados.schema) as escritor:
+                escritor.write_table(dados)
+        with pa.memory_map(arquivo + '.tmp') as origem:
+            sha256 = hashlib.sha256(origem.read_buffer()).hexdigest()
+        info = {
+            'tabela': tabela, 'versao_esquema': versao_esquema(tabela), 'origem': self.origem,
+            'marca': marca, 'linhas': len(df), 'sha256': sha256, 'gravado_em': time.time(),
+        }
+        with open(manifesto + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        with self._lock:
+            if self._descartes.get(tabela, 0) != descartes:
+                return  # descartada enquanto era gravada: a cópia já não vale
+            os.replace(arquivo + '.tmp', arquivo)
+            os.replace(manifesto + '.tmp', manifesto)
+
+    def parar(self):
+        if not self._parar.is_set():
+            self._parar.set()
+            self._thread.join()
+            self.descarregar()
+
+    def _trabalhar(self):
+        while not self._parar.wait(self.intervalo):
+            self.descarregar()
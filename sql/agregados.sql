@@ -0,0 +1,62 @@
+-- Agregados do dashboard calculados no Supabase (chamados via RPC agg_<nome>).
+-- Rodar no SQL Editor do projeto. Cada função corresponde a uma entrada de
+-- services/aggregates.AGREGADOS; p_desde (opcional) limita pela coluna de data.
+
+create or replace function agg_vendas_totais(p_desde timestamptz default null)
+returns table (faturamento numeric, qtd_vendas bigint)
+language sql stable as $$
+    select coalesce(sum(valor_total), 0), count(id)
+    from transacoes
+    where p_desde is null or data_transacao >= p_desde;
+$$;
+
+-- 'semana' = domingo que fecha a semana (mesmo rótulo do resample('W') do pandas)
+create or replace function agg_vendas_semanais(p_desde timestamptz default null)
+returns table (semana date, valor_total numeric)
+language sql stable as $$
+    select (date_trunc('week', data_transacao) + interval '6 days')::date as semana,
+           coalesce(sum(valor_total), 0)
+    from transacoes
+    where p_desde is null or data_transacao >= p_desde
+    group by 1
+    order by 1;
+$$;
+
+create or replace function agg_vendas_por_pagamento(p_desde timestamptz default null)
+returns table (pagamento text, qtd bigint)
+language sql stable as $$
+    select pagamento, count(id)
+    from transacoes
+    where p_desde is null or data_transacao >= p_desde
+    group by 1
+    order by 1;
+$$;
+
+create or replace function agg_agendamentos_por_servico(p_desde timestamptz default null)
+returns table (id_servico bigint, qtd bigint)
+language sql stable as $$
+    select id_servico, count(id)
+    from agendamentos
+    where p_desde is null or data_agendamento >= p_desde::date
+    group by 1
+    order by 1;
+$$;
+
+create or replace function agg_atendimentos_por_profissional(p_desde timestamptz default null)
+returns table (id_atendente bigint, qtd bigint)
+language sql stable as $$
+    select id_atendente, count(id)
+    from agendamentos
+    where status = 'Concluído'
+      and (p_desde is null or data_agendamento >= p_desde::date)
+    group by 1
+    order by 1;
+$$;
+
+create or replace function agg_clientes_novos(p_desde timestamptz default null)
+returns table (qtd bigint)
+language sql stable as $$
+    select count(id)
+    from clientes
+    where p_desde is null or created_at >= p_desde;
+$$;
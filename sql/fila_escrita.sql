@@ -0,0 +1,91 @@
+-- Aplicação idempotente das gravações da fila local (services/fila_escrita.py).
+-- Cada operação traz uma chave única gerada no caixa. A chave e o resultado
+-- ficam em operacoes_aplicadas na mesma transação da gravação, então reenviar
+-- um lote (resposta perdida, timeout) devolve o resultado guardado sem gravar
+-- de novo. As operações rodam na ordem, cada uma em um bloco próprio; o lote
+-- para na primeira recusada (ex.: estoque insuficiente), mantendo as que já
+-- foram aplicadas. Requer sql/registrar_venda.sql e sql/registrar_compra.sql.
+--
+-- p_operacoes: [{"chave", "tipo", "tabela", "dados", "id"}, ...]
+--              tipo: insert | update | delete | registrar_venda | registrar_compra
+--              dados do insert: um registro (objeto) ou vários (array), como em DatabaseService.insert
+-- retorno:     [{"chave", "ok", "linhas", "erro", "codigo"}, ...] (até a recusada)
+
+create table if not exists operacoes_aplicadas (
+    chave text primary key,
+    resultado jsonb not null,
+    aplicado_em timestamptz not null default now()
+);
+
+create or replace function aplicar_operacoes(p_operacoes jsonb)
+returns jsonb
+language plpgsql as $$
+declare
+    v_op jsonb;
+    v_tabela text;
+    v_colunas text;
+    v_dados jsonb;
+    v_linhas jsonb;
+    v_resultado jsonb;
+    v_saida jsonb := '[]'::jsonb;
+begin
+    for v_op in select o from jsonb_array_elements(p_operacoes) as o loop
+        select resultado into v_resultado from operacoes_aplicadas where chave = v_op->>'chave';
+        if found then
+            v_saida := v_saida || jsonb_build_array(v_resultado);
+            continue;
+        end if;
+
+        v_tabela := v_op->>'tabela';
+        begin
+            if v_tabela not in ('clientes', 'produtos', 'servicos', 'atendentes',
+                                'transacoes', 'compras', 'agendamentos') then
+                raise exception 'Tabela não permitida: %', v_tabela;
+            end if;
+
+            if v_op->>'tipo' = 'insert' then
+                -- Sempre como lista de registros; as colunas são a união das chaves
+                v_dados := case when jsonb_typeof(v_op->'dados') = 'array'
+                                then v_op->'dados' else jsonb_build_array(v_op->'dados') end;
+                select string_agg(distinct quote_ident(k), ', ') into v_colunas
+                from jsonb_array_elements(v_dados) as e, jsonb_object_keys(e) as k;
+                execute format(
+                    'with r as (insert into %1$I (%2$s) select %2$s from jsonb_populate_recordset(null::%1$I, $1) returning *) '
+                    'select coalesce(jsonb_agg(to_jsonb(r)), ''[]'') from r', v_tabela, v_colunas)
+                into v_linhas using v_dados;
+            elsif v_op->>'tipo' = 'update' then
+                select string_agg(quote_ident(k), ', ') into v_colunas
+                from jsonb_object_keys(v_op->'dados') as k;
+                execute format(
+                    'with r as (update %1$I set (%2$s) = (select %2$s from jsonb_populate_record(null::%1$I, $1)) '
+                    'where id = $2 returning *) '
+                    'select coalesce(jsonb_agg(to_jsonb(r)), ''[]'') from r', v_tabela, v_colunas)
+                into v_linhas using v_op->'dados', (v_op->>'id')::bigint;
+            elsif v_op->>'tipo' = 'delete' then
+                execute format(
+                    'with r as (delete from %I where id = $1 returning *) '
+                    'select coalesce(jsonb_agg(to_jsonb(r)), ''[]'') from r', v_tabela)
+                into v_linhas using (v_op->>'id')::bigint;
+            elsif v_op->>'tipo' = 'registrar_venda' then
+                select coalesce(jsonb_agg(to_jsonb(r)), '[]') into v_linhas
+                from registrar_venda(v_op->'dados'->'p_transacao', v_op->'dados'->'p_itens') as r;
+            elsif v_op->>'tipo' = 'registrar_compra' then
+                select coalesce(jsonb_agg(to_jsonb(r)), '[]') into v_linhas
+                from registrar_compra(v_op->'dados'->'p_compra') as r;
+            else
+                raise exception 'Operação desconhecida: %', v_op->>'tipo';
+            end if;
+
+            v_resultado := jsonb_build_object('chave', v_op->>'chave', 'ok', true, 'linhas', v_linhas);
+            insert into operacoes_aplicadas (chave, resultado) values (v_op->>'chave', v_resultado);
+        exception when others then
+            -- Só esta operação é desfeita; a recusa não fica guardada (pode ser reenviada)
+            v_saida := v_saida || jsonb_build_array(jsonb_build_object(
+                'chave', v_op->>'chave', 'ok', false, 'erro', sqlerrm, 'codigo', sqlstate));
+            exit;
+        end;
+        v_saida := v_saida || jsonb_build_array(v_resultado);
+    end loop;
+    return v_saida;
+end;
+$$;
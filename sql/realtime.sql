@@ -0,0 +1,6 @@
+-- Publica as alterações de linha das tabelas do app no Supabase Realtime
+-- (lidas por services/alteracoes.py). Os deletes trazem só a chave primária,
+-- que é o que o feed usa.
+
+alter publication supabase_realtime add table
+    clientes, produtos, servicos, atendentes, transacoes, compras, agendamentos;
@@ -0,0 +1,33 @@
+-- Entrada de estoque atômica (ver DatabaseService.registrar_compra).
+-- Soma a quantidade ao estoque do produto e grava a compra na mesma
+-- transação, sem ler o saldo antes: duas entradas simultâneas (ou uma
+-- entrada e uma venda) não se sobrescrevem.
+--
+-- p_compra: {"id_produto", "quantidade", "valor_total", "fornecedor", "data_compra"}
+
+create or replace function registrar_compra(p_compra jsonb)
+returns setof compras
+language plpgsql as $$
+declare
+    v_compra compras;
+begin
+    update produtos
+       set estoque = coalesce(estoque, 0) + (p_compra->>'quantidade')::int
+     where id = (p_compra->>'id_produto')::bigint;
+    if not found then
+        raise exception 'Produto % não encontrado', p_compra->>'id_produto';
+    end if;
+
+    insert into compras (id_produto, quantidade, valor_total, fornecedor, data_compra)
+    values (
+        (p_compra->>'id_produto')::bigint,
+        (p_compra->>'quantidade')::int,
+        (p_compra->>'valor_total')::numeric,
+        p_compra->>'fornecedor',
+        (p_compra->>'data_compra')::date
+    )
+    returning * into v_compra;
+
+    return next v_compra;
+end;
+$$;
@@ -0,0 +1,53 @@
+-- Venda atômica em uma única chamada (ver DatabaseService.registrar_venda).
+-- Baixa o estoque com UPDATE condicional, grava a transação, os itens e o
+-- resumo diário dentro da mesma transação: se faltar estoque em qualquer
+-- item, nada é gravado. Requer sql/vendas_diarias.sql.
+--
+-- p_transacao: {"valor_total", "pagamento", "origem", "data_transacao", "id_cliente"}
+-- p_itens:     [{"id_produto", "quantidade", "valor_unitario"}, ...]
+
+create or replace function registrar_venda(p_transacao jsonb, p_itens jsonb)
+returns setof transacoes
+language plpgsql as $$
+declare
+    v_item jsonb;
+    v_trans transacoes;
+begin
+    -- Ordem fixa por produto evita deadlock entre caixas vendendo os mesmos itens
+    for v_item in
+        select i from jsonb_array_elements(p_itens) as i
+        order by (i->>'id_produto')::bigint
+    loop
+        update produtos
+           set estoque = estoque - (v_item->>'quantidade')::int
+         where id = (v_item->>'id_produto')::bigint
+           and estoque >= (v_item->>'quantidade')::int;
+        if not found then
+            raise exception 'ESTOQUE_INSUFICIENTE:%', v_item->>'id_produto';
+        end if;
+    end loop;
+
+    insert into transacoes (valor_total, pagamento, origem, data_transacao, id_cliente)
+    values (
+        (p_transacao->>'valor_total')::numeric,
+        p_transacao->>'pagamento',
+        p_transacao->>'origem',
+        (p_transacao->>'data_transacao')::timestamp,
+        (p_transacao->>'id_cliente')::bigint
+    )
+    returning * into v_trans;
+
+    insert into itens_transacao (id_transacao, id_produto, quantidade, valor_unitario)
+    select v_trans.id,
+           (i->>'id_produto')::bigint,
+           (i->>'quantidade')::int,
+           (i->>'valor_unitario')::numeric
+    from jsonb_array_elements(p_itens) as i;
+
+    perform registrar_venda_diaria(
+        v_trans.data_transacao::date, coalesce(v_trans.pagamento, ''), v_trans.valor_total
+    );
+
+    return next v_trans;
+end;
+$$;
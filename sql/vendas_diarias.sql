@@ -0,0 +1,35 @@
+-- Resumo diário de vendas, mantido a cada venda (ver services/rollup.py).
+-- Uma linha por (dia, forma de pagamento); doações ficam em pagamento = 'Doação'.
+
+create table if not exists vendas_diarias (
+    data date not null,
+    pagamento text not null,
+    qtd bigint not null default 0,
+    valor_total numeric not null default 0,
+    primary key (data, pagamento)
+);
+
+-- Soma uma venda ao dia (atômico: o upsert trava só a linha do dia/pagamento)
+create or replace function registrar_venda_diaria(p_data date, p_pagamento text, p_valor numeric)
+returns void
+language sql as $$
+    insert into vendas_diarias (data, pagamento, qtd, valor_total)
+    values (p_data, p_pagamento, 1, coalesce(p_valor, 0))
+    on conflict (data, pagamento) do update set
+        qtd = vendas_diarias.qtd + 1,
+        valor_total = vendas_diarias.valor_total + excluded.valor_total;
+$$;
+
+-- Recalcula tudo a partir de transacoes (depois de correções manuais no histórico)
+create or replace function reconstruir_vendas_diarias()
+returns void
+language plpgsql as $$
+begin
+    delete from vendas_diarias where true;
+    insert into vendas_diarias (data, pagamento, qtd, valor_total)
+    select data_transacao::date, coalesce(pagamento, ''), count(*), coalesce(sum(valor_total), 0)
+    from transacoes
+    where data_transacao is not null
+    group by 1, 2;
+end;
+$$;
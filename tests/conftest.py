@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.backends.sqlite_backend import SQLiteBackend
+from services.database import DatabaseService
+
+
+@pytest.fixture(autouse=True)
+def streamlit_sem_servidor(monkeypatch):
+    """Sem `streamlit run`: secrets e session_state viram dicts comuns."""
+    monkeypatch.setattr(st, 'secrets', {'DB_TENTATIVAS': 1})
+    monkeypatch.setattr(st, 'session_state', {})
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / 'farmacia.db'))
+
+
+@pytest.fixture
+def db(backend):
+    return DatabaseService(backend=backend, max_concorrencia=1)
@@ -0,0 +1,47 @@
+from services.cache import SharedDataCache
+
+
+def test_gravacao_durante_a_carga_invalida_a_copia_lida(db, monkeypatch):
+    cache = SharedDataCache()
+    db.cache = cache
+    id_produto = db.insert('produtos', {'nome': 'Chá de boldo', 'estoque': 5})[0]['id']
+
+    ler = db._fetch_table
+    def ler_e_outra_sessao_grava(tabela):
+        df = ler(tabela)
+        monkeypatch.setattr(db, '_fetch_table', ler)
+        db.update('produtos', {'estoque': 2}, id_produto)  # chega depois da leitura, antes de guardar
+        return df
+    monkeypatch.setattr(db, '_fetch_table', ler_e_outra_sessao_grava)
+
+    df = cache.get_tables(db, ['produtos'])['produtos']
+    assert df['estoque'].iloc[0] == 5      # a leitura é anterior à gravação...
+    assert not cache.atualizada('produtos')  # ...então já nasce inválida
+
+    df = cache.get_tables(db, ['produtos'])['produtos']
+    assert df['estoque'].iloc[0] == 2
+
+
+def test_linha_alterada_durante_a_delta_e_relida(db, monkeypatch):
+    cache = SharedDataCache()
+    db.cache = cache
+    venda = {'valor_total': 10.0, 'pagamento': 'Pix', 'data_transacao': '2026-01-05 10:00:00'}
+    id_transacao = db.insert('transacoes', venda)[0]['id']
+    cache.get_tables(db, ['transacoes'])
+    db.insert('transacoes', {**venda, 'valor_total': 7.0})  # a próxima leitura é uma delta
+
+    delta = db._fetch_table_delta
+    def delta_e_outra_sessao_grava(*args, **kwargs):
+        df = delta(*args, **kwargs)
+        monkeypatch.setattr(db, '_fetch_table_delta', delta)
+        # transacoes não tem updated_at: só o id guardado faz a delta achar a alteração
+        db.update('transacoes', {'valor_total': 12.0}, id_transacao)
+        return df
+    monkeypatch.setattr(db, '_fetch_table_delta', delta_e_outra_sessao_grava)
+
+    df = cache.get_tables(db, ['transacoes'])['transacoes']
+    assert len(df) == 2
+    assert not cache.atualizada('transacoes')
+
+    df = cache.get_tables(db, ['transacoes'])['transacoes']
+    assert df.set_index('id').loc[id_transacao, 'valor_total'] == 12.0
@@ -0,0 +1,74 @@
+import pytest
+
+from services.database import DatabaseService
+from services.fila_escrita import FilaEscrita
+
+
+@pytest.fixture
+def fila(tmp_path, db):
+    # Sem iniciar a thread: o teste decide quando a fila envia
+    return FilaEscrita(str(tmp_path / 'fila_escrita.db'), db)
+
+
+@pytest.fixture
+def caixa(backend, fila):
+    """Serviço de uma sessão com a fila ligada."""
+    return DatabaseService(backend=backend, fila=fila)
+
+
+def test_reenvio_com_a_mesma_chave_nao_grava_duas_vezes(caixa, fila, backend, monkeypatch):
+    caixa.insert('clientes', {'nome': 'Dona Maria'})
+
+    aplicar = fila.db.aplicar_operacoes
+    def aplica_e_perde_a_resposta(operacoes):
+        aplicar(operacoes)
+        raise ConnectionError("timeout lendo a resposta")
+    monkeypatch.setattr(fila.db, 'aplicar_operacoes', aplica_e_perde_a_resposta)
+    with pytest.raises(ConnectionError):
+        fila.descarregar()
+    assert fila.situacao()['pendentes'] == 1  # sem resposta, continua na fila
+
+    monkeypatch.setattr(fila.db, 'aplicar_operacoes', aplicar)
+    assert fila.descarregar() == 1  # o servidor reconhece a chave e devolve o resultado guardado
+
+    assert [c['nome'] for c in backend.select('clientes')] == ['Dona Maria']
+    assert fila.situacao()['pendentes'] == 0
+
+
+def test_id_provisorio_e_trocado_pelo_do_servidor(caixa, fila, backend):
+    backend.insert('clientes', {'nome': 'Cadastrado antes'})
+    id_produto = backend.insert('produtos', {'nome': 'Óleo de copaíba', 'estoque': 4})[0]['id']
+
+    # Sem conexão: cliente novo e uma venda para ele, os dois só na fila
+    cliente = caixa.insert('clientes', {'nome': 'Cliente novo'})[0]
+    assert cliente['id'] < 0
+    caixa.registrar_venda(
+        {'valor_total': 30.0, 'pagamento': 'Pix', 'origem': 'Balcão',
+         'data_transacao': '2026-01-05 10:00:00', 'id_cliente': cliente['id']},
+        [{'id_produto': id_produto, 'quantidade': 1, 'valor_unitario': 30.0}],
+    )
+    assert fila.reservas_de_estoque() == {id_produto: 1}
+
+    assert fila.descarregar() == 2
+    id_servidor = backend.select('clientes', 'id', [('nome', 'eq', 'Cliente novo')])[0]['id']
+    assert id_servidor > 0
+    assert [t['id_cliente'] for t in backend.select('transacoes')] == [id_servidor]
+    assert backend.select('produtos', 'estoque')[0]['estoque'] == 3
+    assert fila.reservas_de_estoque() == {}
+
+
+def test_venda_sem_estoque_e_recusada_no_envio(caixa, fila, backend):
+    id_produto = backend.insert('produtos', {'nome': 'Chá verde', 'estoque': 1})[0]['id']
+
+    # O caixa não espera o servidor: a venda volta na hora, com id provisório
+    venda = caixa.registrar_venda(
+        {'valor_total': 20.0, 'pagamento': 'Dinheiro', 'origem': 'Balcão', 'data_transacao': '2026-01-05 11:00:00'},
+        [{'id_produto': id_produto, 'quantidade': 2, 'valor_unitario': 10.0}],
+    )
+    assert venda['id'] < 0
+
+    assert fila.descarregar() == 0
+    assert fila.situacao()['recusadas'] == 1
+    assert fila.recusadas()[0]['tipo'] == 'registrar_venda'
+    assert backend.select('transacoes') == []
+    assert backend.select('produtos', 'estoque')[0]['estoque'] == 1
@@ -0,0 +1,15 @@
+def test_delta_remove_linhas_apagadas_no_servidor(db, backend, monkeypatch):
+    venda = {'valor_total': 10.0, 'pagamento': 'Pix', 'data_transacao': '2026-01-05 10:00:00'}
+    ids = [backend.insert('transacoes', venda)[0]['id'] for _ in range(3)]
+    df = db.fetch_all_tables(['transacoes'])['transacoes']
+    marca = db.marca_dagua(df)
+
+    backend.delete('transacoes', [('id', 'eq', ids[1])])
+    novo = backend.insert('transacoes', {**venda, 'valor_total': 5.0})[0]['id']
+
+    def sem_carga_completa(tabela):
+        raise AssertionError("devia sincronizar por delta")
+    monkeypatch.setattr(db, '_fetch_table', sem_carga_completa)
+
+    df = db.fetch_delta({'transacoes': df}, {'transacoes': marca}, tabelas=['transacoes'])['transacoes']
+    assert sorted(df['id'].tolist()) == sorted([ids[0], ids[2], novo])
@@ -0,0 +1,38 @@
+import pytest
+import streamlit as st
+
+from components import tempo_real
+from services.backends.sqlite_backend import SQLiteBackend
+from services.cache import SharedDataCache
+from utils import session
+
+
+# total=False: o AssinanteSupabase ao desconectar; total=True: "Atualizar Tudo" sem conexão
+@pytest.mark.parametrize('total', [False, True])
+def test_banco_fora_nao_roda_a_pagina_sem_parar(db, backend, monkeypatch, total):
+    cache = SharedDataCache()
+    db.cache = cache
+    monkeypatch.setattr(session, 'get_shared_cache', lambda: cache)
+    st.session_state.update(db_service=db, refresh=False, versoes={}, versoes_tentadas={})
+    db.insert('produtos', {'nome': 'Chá de camomila', 'estoque': 3})
+
+    session.refresh_data(['produtos'])
+    tentadas = st.session_state['versoes_tentadas']
+    assert not tempo_real.mudaram(cache, ['produtos'], tentadas)
+
+    # A conexão cai: o assinante invalida o cache e a recarga falha
+    def sem_rede(*args, **kwargs):
+        raise ConnectionError("sem rede")
+    monkeypatch.setattr(backend, 'select', sem_rede)
+    cache.invalidar_tudo(total=total)
+    assert tempo_real.mudaram(cache, ['produtos'], tentadas)  # versão nova: roda uma vez
+
+    session.refresh_data(['produtos'])
+    assert 'produtos' in cache.falhas()
+    assert len(st.session_state['produtos']) == 1  # a sessão fica com os últimos dados
+    assert not tempo_real.mudaram(cache, ['produtos'], tentadas)  # e não roda de novo pela mesma versão
+
+    # A conexão volta e chega uma alteração: aí sim a página roda de novo
+    monkeypatch.setattr(backend, 'select', SQLiteBackend.select.__get__(backend))
+    cache.invalidar('produtos')
+    assert tempo_real.mudaram(cache, ['produtos'], tentadas)
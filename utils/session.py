@@ -1,37 +1,66 @@
 import streamlit as st
 import pandas as pd
-from services.database import DatabaseService
+from services import schema
+from services.database import DatabaseService, TODAS_TABELAS
+from services.cache import get_shared_cache
+from services.fila_escrita import get_fila_escrita
+from services.alteracoes import get_feed
 
 def init_session_state():
     """Inicializa as variáveis de estado e carrega dados se necessário."""
-    
-    tabelas_padrao = {
-        'transacoes': pd.DataFrame(columns=['id', 'created_at', 'data_transacao', 'pagamento', 'origem', 'valor_total', 'id_cliente']),
-        'clientes': pd.DataFrame(columns=['id', 'nome', 'cpf', 'telefone']),
-        'produtos': pd.DataFrame(columns=['id', 'nome', 'tipo', 'valor_original', 'estoque']),
-        'servicos': pd.DataFrame(columns=['id', 'nome', 'valor', 'duracao_estimada']),
-        'atendentes': pd.DataFrame(columns=['id', 'nome', 'ativo', 'observacao', 'valor']), 
-        'agendamentos': pd.DataFrame(columns=['id', 'data_agendamento', 'horario', 'status', 'Cliente', 'Serviço', 'Profissional']),
-        'compras': pd.DataFrame(columns=['id', 'created_at', 'id_produto', 'quantidade', 'valor_total', 'fornecedor', 'data_compra'])
-    }
-
-    for key, df_vazio in tabelas_padrao.items():
+
+    # Tabelas vazias já com as colunas e os tipos do registro (services/schema.py)
+    for key in TODAS_TABELAS:
         if key not in st.session_state:
-            st.session_state[key] = df_vazio
+            st.session_state[key] = schema.vazio(key)
 
     if 'refresh' not in st.session_state:
         st.session_state['refresh'] = True
-    
+
+    # Versão de cada tabela que esta sessão está exibindo
+    if 'versoes' not in st.session_state:
+        st.session_state['versoes'] = {}
+    # ...e a última que tentou carregar (components/tempo_real.py)
+    if 'versoes_tentadas' not in st.session_state:
+        st.session_state['versoes_tentadas'] = {}
+
     if 'db_service' not in st.session_state:
-        st.session_state['db_service'] = DatabaseService()
+        st.session_state['db_service'] = DatabaseService(
+            cache=get_shared_cache(), fila=get_fila_escrita(), feed=get_feed()
+        )
+
+def refresh_data(tabelas: list = None):
+    """
+    Atualiza a sessão a partir do cache compartilhado do processo.
+    Só as `tabelas` pedidas (as declaradas em TABELAS pela tela aberta) são
+    carregadas; as outras ficam de fora até alguma tela precisar delas.
+    As sessões recebem referências aos mesmos DataFrames (somente leitura);
+    o cache só vai ao banco quando uma tabela foi invalidada ou expirou,
+    então depois de uma gravação só a tabela alterada é relida.
+    'refresh_total' (botão "Atualizar Tudo") força a recarga completa.
+    Se o banco não responder, a sessão continua com os últimos dados e avisa.
+    """
+    cache = get_shared_cache()
+    db = st.session_state['db_service']
 
-def refresh_data():
-    """Força atualização dos dados do banco para a sessão."""
     if st.session_state['refresh']:
-        db = st.session_state['db_service']
-        novos_dados = db.fetch_all_tables()
-        if novos_dados:
-            for k, v in novos_dados.items():
-                if isinstance(v, pd.DataFrame):
-                    st.session_state[k] = v
-        st.session_state['refresh'] = False
\ No newline at end of file
+        if st.session_state.pop('refresh_total', False):
+            cache.invalidar_tudo(total=True)
+        st.session_state['refresh'] = False
+
+    versoes = st.session_state['versoes']
+    antes = {t: cache.versao(t) for t in (tabelas or TODAS_TABELAS)}
+    for k, v in cache.get_tables(db, tabelas).items():
+        versao = cache.versao(k)
+        if versoes.get(k) != versao and isinstance(v, pd.DataFrame):
+            st.session_state[k] = v
+            versoes[k] = versao
+    # Tentada mesmo se a carga falhou: o vigia só roda a página de novo numa versão mais nova
+    tentadas = st.session_state['versoes_tentadas']
+    for t, versao in antes.items():
+        tentadas[t] = max(versao, versoes.get(t, 0))
+
+    falhas = cache.falhas()
+    sem_conexao = [t for t in (tabelas or TODAS_TABELAS) if t in falhas]
+    if sem_conexao:
+        st.warning(f"⚠️ Sem resposta do banco. Exibindo os últimos dados carregados de: {', '.join(sem_conexao)}.")
@@ -0,0 +1,66 @@
+"""
+Medição do tempo de inicialização.
+
+No app, `with etapa('nome'):` registra quanto cada parte da execução levou.
+A primeira vez que cada etapa roda no processo (partida a frio, pagando os
+imports) fica em PARTIDA_FRIA para comparar com a execução atual no painel
+da barra lateral.
+
+Pela linha de comando, mede o import de cada dependência pesada num
+processo Python novo (nada em cache), útil para comparar máquinas:
+    python -m utils.startup
+"""
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Etapa -> segundos na primeira vez que rodou neste processo
+PARTIDA_FRIA = {}
+
+MODULOS_PESADOS = [
+    'streamlit', 'pandas', 'numpy', 'plotly.express', 'supabase',
+    'services.database', 'views.dashboard',
+]
+
+
+@contextmanager
+def etapa(nome: str):
+    """Cronometra um trecho da execução do script (vale também se ele parar com st.stop/st.rerun)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        st.session_state.setdefault('tempos_execucao', {})[nome] = duracao
+        PARTIDA_FRIA.setdefault(nome, duracao)
+
+
+def render_painel():
+    """Painel na barra lateral: tempo de cada etapa agora e na partida a frio."""
+    tempos = st.session_state.get('tempos_execucao', {})
+    if not tempos:
+        return
+    with st.sidebar.expander("⏱️ Tempo de inicialização", expanded=False):
+        st.dataframe(
+            [{'Etapa': nome, 'Agora (s)': round(seg, 3), 'A frio (s)': round(PARTIDA_FRIA.get(nome, seg), 3)}
+             for nome, seg in tempos.items()],
+            hide_index=True, use_container_width=True,
+        )
+
+
+def tempo_de_import(modulo: str) -> float:
+    """Segundos para importar `modulo` num interpretador novo (None se falhar)."""
+    codigo = f"import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+    proc = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    for modulo in sys.argv[1:] or MODULOS_PESADOS:
+        segundos = tempo_de_import(modulo)
+        print(f"{modulo:<20} {'não instalado/erro' if segundos is None else f'{segundos:.3f} s'}")
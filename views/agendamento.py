@@ -1,6 +1,12 @@
 import streamlit as st
 from datetime import datetime, time, timedelta
 import pandas as pd
+from services import agenda
+from services.cache import tabela_atual
+from services.lookups import lookup
+
+# Tabelas em cache que esta tela lê (carregadas sob demanda pelo main.py)
+TABELAS = ['clientes', 'servicos', 'atendentes', 'agendamentos']
 
 def render_view():
     st.title("🗓️ Marcar um Horário")
@@ -12,12 +18,11 @@ def render_view():
     df_serv = st.session_state['servicos']
     df_prof = st.session_state['atendentes']
     
-    # Cria dicionários para os Selectboxes (ID -> Nome/Valor)
-    cli_dict = df_cli.set_index('id')['nome'].to_dict() if not df_cli.empty else {}
-    serv_dict = df_serv.set_index('id')['nome'].to_dict() if not df_serv.empty else {}
-    # Dicionário de duração para calcular horários de fim
-    duracao_dict = df_serv.set_index('id')['duracao_estimada'].to_dict() if not df_serv.empty else {}
-    prof_dict = df_prof.set_index('id')['nome'].to_dict() if not df_prof.empty else {}
+    # Índices compartilhados (ID -> Nome/Duração), montados uma vez por versão
+    servicos = lookup(db, 'servicos', df_serv)
+    cli_dict = lookup(db, 'clientes', df_cli).nomes
+    serv_dict = servicos.nomes
+    prof_dict = lookup(db, 'atendentes', df_prof).nomes
     
     # --- 1. FILTROS ---
     c_filtro1, c_filtro2 = st.columns(2)
@@ -30,63 +35,19 @@ def render_view():
         c_filtro2.warning("Cadastre profissionais na aba Cadastros.")
 
     # --- 2. BUSCA AGENDAMENTOS ---
-    agendamentos_dia = []
+    # Consulta local no índice (dia, profissional) montado a partir do cache
+    intervalos_dia = agenda.montar_intervalos(None)
     if prof_id:
         try:
-            res_ag = db.client.table('agendamentos')\
-                .select('horario, id_servico, id_cliente, servicos(nome, duracao_estimada), clientes(nome)')\
-                .eq('id_atendente', prof_id)\
-                .eq('data_agendamento', str(dt_sel))\
-                .execute()
-            agendamentos_dia = res_ag.data if res_ag.data else []
+            intervalos_dia = _agenda_do_dia(db, dt_sel, prof_id)
         except Exception as e:
             st.error(f"Erro ao buscar agenda: {e}")
 
     # --- 3. VISUALIZAÇÃO GRÁFICA ---
-    horarios_visuais = []
-    start_time = time(8, 0) # Início do expediente
-    end_time = time(19, 0)  # Fim do expediente
-    
-    current = datetime.combine(dt_sel, start_time)
-    end_dt = datetime.combine(dt_sel, end_time)
-        
-    while current < end_dt:
-        h_str = current.strftime('%H:%M')
-        status = "Livre"
-        cliente_info = "-"
-        servico_info = "-"
-            
-        slot_start = current
-        slot_end = current + timedelta(minutes=30) # Visualização em blocos de 30min
-            
-        for ag in agendamentos_dia:
-            try:
-                ag_h_str = ag['horario']
-                ag_time = datetime.strptime(ag_h_str, '%H:%M:%S').time()
-                ag_start = datetime.combine(dt_sel, ag_time)
-                
-                dur = ag['servicos']['duracao_estimada'] if ag.get('servicos') else 30
-                ag_end = ag_start + timedelta(minutes=dur)
-                
-                # Checagem de colisão de horário
-                if slot_start < ag_end and slot_end > ag_start:
-                    status = "Ocupado"
-                    cliente_info = ag['clientes']['nome'] if ag.get('clientes') else "?"
-                    servico_info = ag['servicos']['nome'] if ag.get('servicos') else "?"
-                    break
-            except:
-                continue
-            
-        horarios_visuais.append({
-            "Horário": h_str,
-            "Status": status,
-            "Cliente": cliente_info,
-            "Serviço": servico_info
-        })
-        current += timedelta(minutes=30)
-            
+    indice_dia = agenda.IndiceIntervalos.de_frame(intervalos_dia)
+
     # Renderiza tabela colorida
-    df_visual = pd.DataFrame(horarios_visuais)
+    df_visual = agenda.grade_dia(intervalos_dia)
     st.dataframe(
         df_visual.style.applymap(
             lambda v: 'background-color: #ffcdd2' if v == 'Ocupado' else 'background-color: #c8e6c9', 
@@ -124,21 +85,9 @@ def render_view():
             if st.form_submit_button("✅ Confirmar Agendamento"):
                 if cli_id and srv_id and prof_id:
                     try:
-                        new_start = datetime.combine(dt_sel, hr_input)
-                        duracao_nova = duracao_dict.get(srv_id, 30)
-                        new_end = new_start + timedelta(minutes=duracao_nova)
-                        
-                        conflito = False
-                        
-                        for ag in agendamentos_dia:
-                            ag_time = datetime.strptime(ag['horario'], '%H:%M:%S').time()
-                            ag_start = datetime.combine(dt_sel, ag_time)
-                            dur = ag['servicos']['duracao_estimada'] if ag.get('servicos') else 30
-                            ag_end = ag_start + timedelta(minutes=dur)
-                            
-                            if new_start < ag_end and new_end > ag_start:
-                                conflito = True
-                                break
+                        inicio_novo = hr_input.hour * 60 + hr_input.minute
+                        duracao_nova = int(servicos.get(srv_id, 'duracao_estimada', agenda.DURACAO_PADRAO))
+                        conflito = indice_dia.conflita(inicio_novo, inicio_novo + duracao_nova)
                         
                         if conflito:
                             st.error("❌ Conflito! Já existe um agendamento neste horário.")
@@ -160,4 +109,77 @@ def render_view():
                 else:
                     st.warning("Preencha todos os campos para agendar.")
     else:
-        st.info("Selecione um profissional acima para liberar o agendamento.")
\ No newline at end of file
+        st.info("Selecione um profissional acima para liberar o agendamento.")
+
+    st.divider()
+
+    # --- 5. BUSCA DO PRÓXIMO HORÁRIO LIVRE ---
+    st.subheader("3. Próximo Horário Livre")
+    _render_busca_horarios(db, servicos, df_prof, serv_dict, prof_dict)
+
+def _indice_agenda(db):
+    """Índice (dia, profissional) dos agendamentos em cache, remontado só quando a tabela muda."""
+    df_ag = st.session_state.get('agendamentos', pd.DataFrame())
+    if not db.cache:
+        return agenda.IndiceAgenda(df_ag)
+    # Montado da cópia do cache (a da versão), não do frame desta sessão
+    return db.cache.derivado(('indice_agenda',), ['agendamentos'],
+                             lambda: agenda.IndiceAgenda(tabela_atual(db, 'agendamentos', df_ag)))
+
+def _agenda_do_dia(db, dt_sel, prof_id):
+    """
+    Intervalos do dia/profissional. Com a tabela em cache atualizada, é só uma
+    consulta ao índice local; se a cópia local estiver velha ou ausente, busca
+    no banco e guarda o resultado até a próxima mudança em agendamentos.
+    """
+    if db.cache and db.cache.atualizada('agendamentos'):
+        return _indice_agenda(db).intervalos_do_dia(dt_sel, prof_id)
+
+    def consultar():
+        linhas = db.select(
+            'agendamentos',
+            'horario, status, data_agendamento, id_atendente, servicos(nome, duracao_estimada), clientes(nome)',
+            [('id_atendente', 'eq', prof_id), ('data_agendamento', 'eq', str(dt_sel))]
+        )
+        df = pd.DataFrame([{
+            'horario': ag.get('horario'),
+            'status': ag.get('status'),
+            'duracao': ag['servicos'].get('duracao_estimada') if ag.get('servicos') else None,
+            'Cliente': ag['clientes']['nome'] if ag.get('clientes') else "?",
+            'Serviço': ag['servicos']['nome'] if ag.get('servicos') else "?",
+        } for ag in linhas])
+        if not df.empty:
+            df = df[df['status'] != 'Cancelado']
+        return agenda.montar_intervalos(df)
+
+    if not db.cache:
+        return consultar()
+    return db.cache.derivado(('agenda_dia', str(dt_sel), int(prof_id)), ['agendamentos'], consultar)
+
+def _render_busca_horarios(db, servicos, df_prof, serv_dict, prof_dict):
+    if not serv_dict or not prof_dict:
+        st.info("Cadastre serviços e profissionais para buscar horários.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    srv_busca = c1.selectbox("Serviço", list(serv_dict.keys()), format_func=lambda x: serv_dict[x], key="busca_srv")
+    prof_busca = c2.selectbox("Profissional", [None] + list(prof_dict.keys()),
+                              format_func=lambda x: "Qualquer um" if x is None else prof_dict[x], key="busca_prof")
+    qtd_busca = c3.number_input("Quantos horários", 1, 50, 5, key="busca_qtd")
+
+    hoje = datetime.now().date()
+    periodo = st.date_input("Período", (hoje, hoje + timedelta(days=30)), key="busca_periodo")
+    if not isinstance(periodo, (tuple, list)) or len(periodo) != 2:
+        st.caption("Escolha a data inicial e a final.")
+        return
+
+    duracao = int(servicos.get(srv_busca, 'duracao_estimada', agenda.DURACAO_PADRAO))
+
+    livres = agenda.proximos_horarios(
+        _indice_agenda(db), df_prof, duracao, periodo[0], periodo[1],
+        n=int(qtd_busca), id_atendente=prof_busca, agora=datetime.now()
+    )
+    if livres.empty:
+        st.warning("Nenhum horário livre no período.")
+    else:
+        st.dataframe(livres.drop(columns=['id_atendente']), use_container_width=True, hide_index=True)
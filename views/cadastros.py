@@ -1,18 +1,30 @@
 import streamlit as st
+import pandas as pd
 from components.crud import render_generic_crud
 import re
 
+# Tabelas em cache que esta tela lê (carregadas sob demanda pelo main.py)
+TABELAS = ['clientes', 'produtos', 'servicos', 'atendentes']
+
+def _qtd_digitos(valor):
+    """Quantos números tem o valor (ou cada valor de uma coluna, na importação em lote)."""
+    if isinstance(valor, pd.Series):
+        return valor.astype(str).str.count(r'\d')
+    return len(re.sub(r'\D', '', str(valor)))
+
+def _resultado(validos, msg):
+    """(válidos, mensagem); a mensagem é None quando tudo passou."""
+    tudo_valido = validos.all() if isinstance(validos, pd.Series) else validos
+    return validos, None if tudo_valido else msg
+
+# Os validadores aceitam um valor (formulário) ou uma coluna inteira
+# (importação): aí devolvem uma máscara de válidos no lugar do booleano.
 def validate_cpf(cpf):
-    cpf_clean = re.sub(r'\D', '', str(cpf))
-    if len(cpf_clean) != 11:
-        return False, "CPF deve ter 11 números."
-    return True, ""
+    return _resultado(_qtd_digitos(cpf) == 11, "CPF deve ter 11 números.")
 
 def validate_phone(phone):
-    phone_clean = re.sub(r'\D', '', str(phone))
-    if len(phone_clean) < 10 or len(phone_clean) > 11:
-        return False, "Telefone deve ter 10 ou 11 números (com DDD)."
-    return True, ""
+    qtd = _qtd_digitos(phone)
+    return _resultado((qtd >= 10) & (qtd <= 11), "Telefone deve ter 10 ou 11 números (com DDD).")
 
 def render_view():
     st.title("📝 Meus Cadastros")
@@ -26,7 +38,8 @@ def render_view():
             {'name': 'cpf', 'label': 'CPF (apenas números)', 'type': 'text', 'validator': validate_cpf},
             {'name': 'telefone', 'label': 'Telefone (com DDD)', 'type': 'text', 'validator': validate_phone}
         ]
-        render_generic_crud('clientes', 'Cliente', fields, st.session_state['clientes'])
+        # Importação em lote: o mesmo cliente é achado pelo CPF ou, sem CPF, pelo nome
+        render_generic_crud('clientes', 'Cliente', fields, st.session_state['clientes'], import_keys=['cpf', 'nome'])
 
     with tab_prod:
         fields = [
@@ -35,7 +48,7 @@ def render_view():
             {'name': 'valor_original', 'label': 'Preço (R$)', 'type': 'number', 'step': 0.01},
             {'name': 'estoque', 'label': 'Quantidade em Estoque', 'type': 'number', 'step': 1, 'min': 0}
         ]
-        render_generic_crud('produtos', 'Produto', fields, st.session_state['produtos'])
+        render_generic_crud('produtos', 'Produto', fields, st.session_state['produtos'], import_keys=['nome'])
 
     with tab_serv:
         fields = [
@@ -1,36 +1,47 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from datetime import datetime
+from services import derivados
+from services.lookups import lookup
+from components.painel_exportacao import render_exportacao
+
+# Tabelas em cache que esta tela lê (carregadas sob demanda pelo main.py)
+TABELAS = ['clientes', 'servicos', 'atendentes']
+
+# Quantas transações a tabela de histórico recente mostra
+HISTORICO_RECENTE = 200
 
 def render_view():
+    # Import pesado: só quando o dashboard é aberto
+    import plotly.express as px
+
     st.title("📊 Dashboard Estratégico")
     st.write("Visão geral de performance, financeiro e operacional.")
 
+    db = st.session_state['db_service']
+
     # 1. CARREGAMENTO E PREPARAÇÃO DE DADOS
-    # Recuperamos os DataFrames da sessão com segurança
-    df_trans = st.session_state.get('transacoes', pd.DataFrame())
+    # Os números vêm já agrupados do banco (services/aggregates.py):
+    # só o resumo trafega, não o histórico inteiro.
     df_cli = st.session_state.get('clientes', pd.DataFrame())
-    df_ag = st.session_state.get('agendamentos', pd.DataFrame())
-    
-    # Garantir tipos de data
-    if not df_trans.empty and 'data_transacao' in df_trans.columns:
-        df_trans['data_transacao'] = pd.to_datetime(df_trans['data_transacao'])
-    
-    if not df_ag.empty and 'data_agendamento' in df_ag.columns:
-        df_ag['data_agendamento'] = pd.to_datetime(df_ag['data_agendamento'])
+    df_serv = st.session_state.get('servicos', pd.DataFrame())
+    df_prof = st.session_state.get('atendentes', pd.DataFrame())
+
+    totais = db.agregar('vendas_totais').iloc[0]
+    # Evolução semanal lida do resumo diário: O(dias), não O(transações)
+    vendas_tempo = derivados.vendas_por_periodo(db, 'W')
+    pagamentos = db.agregar('vendas_por_pagamento')
+    ag_servico = db.agregar('agendamentos_por_servico')
+    ag_prof = db.agregar('atendimentos_por_profissional')
 
     # --- 2. CÁLCULO DE KPIS (INDICADORES) ---
-    faturamento_total = df_trans['valor_total'].sum() if not df_trans.empty else 0.0
-    qtd_vendas = len(df_trans)
+    faturamento_total = float(totais['faturamento'] or 0.0)
+    qtd_vendas = int(totais['qtd_vendas'] or 0)
     ticket_medio = (faturamento_total / qtd_vendas) if qtd_vendas > 0 else 0.0
     
     # Cálculo de novos clientes (mês atual)
-    novos_clientes = 0
-    if not df_cli.empty and 'created_at' in df_cli.columns:
-        df_cli['created_at'] = pd.to_datetime(df_cli['created_at'])
-        mes_atual = datetime.now().month
-        novos_clientes = len(df_cli[df_cli['created_at'].dt.month == mes_atual])
+    inicio_mes = datetime.now().date().replace(day=1)
+    novos_clientes = int(db.agregar('clientes_novos', desde=inicio_mes).iloc[0]['qtd'] or 0)
 
     # --- 3. EXIBIÇÃO DOS KPIS ---
     c1, c2, c3, c4 = st.columns(4)
@@ -46,15 +57,13 @@ def render_view():
 
     with col_g1:
         st.subheader("📈 Evolução de Vendas")
-        if not df_trans.empty:
-            vendas_tempo = df_trans.set_index('data_transacao').resample('W')['valor_total'].sum().reset_index()
-            
+        if not vendas_tempo.empty:
             fig_evolucao = px.area(
                 vendas_tempo, 
-                x='data_transacao', 
+                x='periodo', 
                 y='valor_total',
                 title="Faturamento Semanal",
-                labels={'data_transacao': 'Período', 'valor_total': 'Faturamento (R$)'},
+                labels={'periodo': 'Período', 'valor_total': 'Faturamento (R$)'},
                 color_discrete_sequence=['#00B4D8']
             )
             fig_evolucao.update_layout(hovermode="x unified")
@@ -64,9 +73,8 @@ def render_view():
 
     with col_g2:
         st.subheader("💳 Meios de Pagamento")
-        if not df_trans.empty:
-            pagamentos = df_trans['pagamento'].value_counts().reset_index()
-            pagamentos.columns = ['Meio', 'Qtd']
+        if not pagamentos.empty:
+            pagamentos = pagamentos.rename(columns={'pagamento': 'Meio', 'qtd': 'Qtd'})
             
             fig_pizza = px.pie(
                 pagamentos, 
@@ -86,9 +94,11 @@ def render_view():
 
     with col_g3:
         st.subheader("🏆 Serviços Mais Agendados")
-        if not df_ag.empty:
-            top_serv = df_ag['Serviço'].value_counts().head(5).reset_index()
-            top_serv.columns = ['Serviço', 'Agendamentos']
+        if not ag_servico.empty:
+            top_serv = pd.DataFrame({
+                'Serviço': lookup(db, 'servicos', df_serv).mapear(ag_servico['id_servico'], padrao='N/A'),
+                'Agendamentos': ag_servico['qtd'],
+            }).groupby('Serviço', as_index=False)['Agendamentos'].sum().nlargest(5, 'Agendamentos')
             
             fig_bar = px.bar(
                 top_serv, 
@@ -106,9 +116,11 @@ def render_view():
 
     with col_g4:
         st.subheader("👥 Carga de Atendimentos")
-        if not df_ag.empty:
-            rank = df_ag[df_ag['status'] == 'Concluído']['Profissional'].value_counts().reset_index()
-            rank.columns = ['Profissional', 'Atendimentos']
+        if not df_prof.empty:
+            rank = pd.DataFrame({
+                'Profissional': lookup(db, 'atendentes', df_prof).mapear(ag_prof['id_atendente'], padrao='N/A'),
+                'Atendimentos': ag_prof['qtd'],
+            }).sort_values('Atendimentos', ascending=False)
             
             if not rank.empty:
                 st.dataframe(
@@ -134,19 +146,11 @@ def render_view():
     # --- 6. TABELA DETALHADA ---
     st.subheader("📑 Histórico Recente de Transações")
     
-    if not df_trans.empty:
-        df_display = df_trans.copy()
-        
-        if not df_cli.empty:
-            df_display['id_cliente'] = df_display['id_cliente'].fillna(0).astype(int)
-            df_cli['id'] = df_cli['id'].astype(int)
-            mapa_nomes = df_cli.set_index('id')['nome'].to_dict()
-            df_display['Cliente'] = df_display['id_cliente'].map(mapa_nomes).fillna("Consumidor Final")
-        else:
-            df_display['Cliente'] = "Consumidor Final"
+    # Datas já convertidas e nome do cliente já mapeado (memoizado por versão)
+    df_trans = derivados.transacoes_recentes(db, df_cli, HISTORICO_RECENTE)
 
-        df_final = df_display[['data_transacao', 'Cliente', 'valor_total', 'pagamento', 'origem']].copy()
-        df_final = df_final.sort_values('data_transacao', ascending=False)
+    if not df_trans.empty:
+        df_final = df_trans[['data_transacao', 'Cliente', 'valor_total', 'pagamento', 'origem']]
         
         st.dataframe(
             df_final,
@@ -175,4 +179,8 @@ def render_view():
             use_container_width=True
         )
     else:
-        st.warning("Nenhuma transação registrada no sistema.")
\ No newline at end of file
+        st.warning("Nenhuma transação registrada no sistema.")
+
+    # --- 7. EXPORTAÇÃO ---
+    # Lida do banco página por página, direto para o arquivo (services/exportacao.py)
+    render_exportacao(db)
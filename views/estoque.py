@@ -1,5 +1,9 @@
 import streamlit as st
 from datetime import datetime
+from services.lookups import lookup
+
+# Tabelas em cache que esta tela lê (carregadas sob demanda pelo main.py)
+TABELAS = ['produtos']
 
 def render_view():
     st.title("📦 Repor Estoque (Compras)")
@@ -12,7 +16,8 @@ def render_view():
         
         c_date_compra = st.date_input("Data da Compra", datetime.now()) 
         
-        prod_opts = df_p.set_index('id')['nome'].to_dict() if not df_p.empty else {}
+        produtos = lookup(db, 'produtos', df_p)
+        prod_opts = produtos.nomes
         prod_id = None
         
         if prod_opts:
@@ -24,13 +29,10 @@ def render_view():
         qtd = c1.number_input("Quantidade que chegou", 1, 1000, 1)
             
         custo_unitario = 0.0
-        if prod_id and not df_p.empty:
-            try: 
-                val_orig = df_p.loc[df_p['id']==prod_id, 'valor_original'].values[0]
-                if val_orig is not None:
-                    custo_unitario = float(val_orig) * 0.5 
-            except: 
-                pass
+        if prod_id:
+            val_orig = produtos.get(prod_id, 'valor_original')
+            if val_orig is not None:
+                custo_unitario = float(val_orig) * 0.5 
                 
         custo = c2.number_input("Custo Total da Compra (R$)", value=float(custo_unitario * qtd), step=0.01)
             
@@ -40,23 +42,24 @@ def render_view():
         if st.form_submit_button("✅ Confirmar Entrada de Estoque"):
             if prod_id:
                 try:
-                    # 1. Registrar a Compra
-                    db.insert('compras', {
+                    # Compra e soma ao estoque numa operação só, no servidor
+                    # (sem ler o saldo antes: duas entradas não se sobrescrevem)
+                    db.registrar_compra({
                         'id_produto': int(prod_id), 
                         'quantidade': int(qtd), 
                         'valor_total': custo,
                         'fornecedor': fornecedor,
                         'data_compra': str(c_date_compra)
                     })
-                        
-                    # 2. Atualizar Estoque 
-                    res_p = db.client.table('produtos').select('estoque').eq('id', prod_id).execute()
-                    est_atual = res_p.data[0]['estoque'] if res_p.data else 0
-                    novo_estoque = int(est_atual) + int(qtd)
-                        
-                    db.update('produtos', {'estoque': novo_estoque}, prod_id)
-                        
-                    st.success(f"Estoque atualizado! Agora temos {novo_estoque} unidades. 🎉")
+                    if db.fila:
+                        # Ainda na fila de escrita: o saldo no banco só muda quando ela enviar
+                        st.success(f"Entrada de {int(qtd)} unidades registrada! O estoque é atualizado "
+                                   "assim que a compra for enviada ao banco. 🎉")
+                    else:
+                        # Saldo do servidor (o do cache pode estar atrás de vendas de outros caixas)
+                        res = db.select('produtos', 'estoque', [('id', 'eq', int(prod_id))])
+                        novo_estoque = res[0]['estoque'] if res else None
+                        st.success(f"Estoque atualizado! Agora temos {novo_estoque} unidades. 🎉")
                     st.session_state['refresh'] = True
                     st.rerun()
                 except Exception as e:
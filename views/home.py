@@ -1,25 +1,26 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from services import derivados, rollup
+
+# Tabelas em cache que esta tela lê (carregadas sob demanda pelo main.py)
+TABELAS = ['agendamentos']
 
 def render_view():
     st.title("🏠 Olá, Bem-vinda!")
     st.write(f"Resumo de hoje: **{datetime.now().strftime('%d/%m/%Y')}**")
     
+    db = st.session_state['db_service']
     df_ag = st.session_state.get('agendamentos', pd.DataFrame())
-    df_trans = st.session_state.get('transacoes', pd.DataFrame())
     
-    hoje_str = datetime.now().strftime('%Y-%m-%d')
+    agora = datetime.now()
+    hoje = agora.date()
     
-    vendas_hoje = 0.0
-    if not df_trans.empty and 'data_transacao' in df_trans.columns:
-        temp_dt = pd.to_datetime(df_trans['data_transacao'])
-        mask = temp_dt.dt.strftime('%Y-%m-%d') == hoje_str
-        vendas_hoje = df_trans[mask]['valor_total'].sum()
+    # Caixa do dia vem do resumo diário (uma linha por forma de pagamento)
+    vendas_hoje = rollup.caixa_do_dia(db, hoje)
 
-    agendamentos_hoje = pd.DataFrame()
-    if not df_ag.empty and 'data_agendamento' in df_ag.columns:
-        agendamentos_hoje = df_ag[df_ag['data_agendamento'] == hoje_str]
+    # Agendamentos de hoje já tipados e ordenados por horário (memoizado por versão)
+    agendamentos_hoje = derivados.agendamentos_do_dia(db, df_ag, hoje)
 
     # --- MÉTRICAS DO DIA ---
     col1, col2, col3 = st.columns(3)
@@ -30,18 +31,13 @@ def render_view():
     # Lógica para mostrar o "Próximo Cliente"
     proximo = "Ninguém na fila"
     if not agendamentos_hoje.empty:
-        agora = datetime.now().time()
-        try:
-            agendamentos_hoje['obj_time'] = pd.to_datetime(agendamentos_hoje['horario'], format='%H:%M:%S').dt.time
-            futuros = agendamentos_hoje[agendamentos_hoje['obj_time'] > agora].sort_values('obj_time')
-            
-            if not futuros.empty:
-                next_one = futuros.iloc[0]
-                proximo = f"{next_one['horario']} - {next_one['Cliente']}"
-            else:
-                proximo = "Agenda finalizada"
-        except:
-            proximo = "-"
+        minuto_atual = agora.hour * 60 + agora.minute
+        futuros = agendamentos_hoje[agendamentos_hoje['inicio'] > minuto_atual]
+        if not futuros.empty:
+            next_one = futuros.iloc[0]
+            proximo = f"{next_one['horario']} - {next_one['Cliente']}"
+        else:
+            proximo = "Agenda finalizada"
             
     col3.metric("Próximo Cliente", proximo)
 
@@ -51,8 +47,7 @@ def render_view():
     st.subheader("📅 Sua Agenda Hoje")
     
     if not agendamentos_hoje.empty:
-        df_show = agendamentos_hoje[['horario', 'Cliente', 'Serviço', 'Profissional', 'status']].copy()
-        df_show = df_show.sort_values('horario')
+        df_show = agendamentos_hoje[['horario', 'Cliente', 'Serviço', 'Profissional', 'status']]
         
         def highlight_status(val):
             color = '#c8e6c9' if val == 'Concluído' else '#ffcdd2' if val == 'Cancelado' else '#fff9c4'
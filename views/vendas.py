@@ -1,161 +1,226 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 import time
+from services.database import EstoqueInsuficiente
+from services.lookups import lookup
+
+# Tabelas em cache que esta tela lê (carregadas sob demanda pelo main.py)
+TABELAS = ['clientes', 'produtos']
+
+def _carrinho():
+    """Itens da venda em andamento: [{'id_produto', 'nome', 'quantidade', 'valor_unitario'}]."""
+    if 'carrinho' not in st.session_state:
+        st.session_state['carrinho'] = []
+    return st.session_state['carrinho']
+
+def _qtd_no_carrinho(prod_id):
+    return sum(i['quantidade'] for i in _carrinho() if i['id_produto'] == prod_id)
+
+def _montar_recibo(data_final, nome_cliente, itens, valor, pgto):
+    linhas = "\n".join(
+        f"                    {i['quantidade']}x {i['nome']}  R$ {i['quantidade'] * i['valor_unitario']:.2f}"
+        for i in itens
+    )
+    # Itens a preço de tabela; a diferença para o total cobrado sai numa linha própria
+    ajuste = valor - sum(i['quantidade'] * i['valor_unitario'] for i in itens)
+    if round(ajuste, 2) != 0:
+        rotulo = "Doação" if pgto == "Doação" else "Desconto" if ajuste < 0 else "Acréscimo"
+        linhas += f"\n                    {rotulo}  {'-' if ajuste < 0 else ''}R$ {abs(ajuste):.2f}"
+    return f"""
+                    ================================
+                                FARMÁCIA
+                    ================================
+                    Data: {data_final.strftime('%d/%m/%Y %H:%M')}
+                    Cliente: {nome_cliente}
+                    --------------------------------
+{linhas}
+                    --------------------------------
+                    Total: R$ {valor:.2f}
+                    Pagamento: {pgto}
+                    --------------------------------
+                    Obrigado pela preferência!
+                    ================================
+                    """
 
 def render_view():
     st.title("💰 Fazer uma Venda")
-    st.write("Preencha os dados abaixo para registrar uma venda.")
-    
+    st.write("Adicione os produtos ao carrinho e finalize a venda.")
+
     # Recupera o serviço de banco de dados da sessão
     db = st.session_state['db_service']
-    
+
     # --- Seção de Recibo (Pós-Venda) ---
     if 'ultimo_recibo' in st.session_state:
         st.success("✅ Venda realizada com sucesso!")
         st.markdown("### 🧾 Comprovante de Venda")
         st.code(st.session_state['ultimo_recibo'], language="text")
+        if db.fila:
+            st.caption("📡 A venda vai ao banco em segundo plano. Se o servidor recusar "
+                       "(estoque), ela aparece na barra lateral, em gravações recusadas.")
         if st.button("Nova Venda"):
             del st.session_state['ultimo_recibo']
             st.rerun()
-        return 
-    
+        return
+
     # Recupera os dados atuais da sessão para preencher os selects
     df_c = st.session_state['clientes']
     df_p = st.session_state['produtos']
-    
-    # Dicionários para lookup
-    cli_opts = {None: "👤 Consumidor Final (Sem Cadastro)"}
-    if not df_c.empty:
-        cli_opts.update(dict(zip(df_c['id'], df_c['nome'])))
-    
-    prod_opts = dict(zip(df_p['id'], df_p['nome'])) if not df_p.empty else {}
-    
+    carrinho = _carrinho()
+
+    # Índices id -> nome/preço/estoque (montados uma vez por versão da tabela)
+    produtos = lookup(db, 'produtos', df_p)
+    cli_opts = {None: "👤 Consumidor Final (Sem Cadastro)", **lookup(db, 'clientes', df_c).nomes}
+    prod_opts = produtos.nomes
+    # Vendas e compras ainda na fila de escrita, que o cache não reflete
+    reservado = db.fila.reservas_de_estoque() if db.fila else {}
+
     # Layout de colunas
-    col_data, c_cli, c_prod = st.columns([1, 2, 2])
-    
+    col_data, c_cli = st.columns([1, 2])
+
     # Input de Data
     c_date = col_data.date_input("Data", datetime.now())
-    
+
     # Seleção de Cliente
     cli_id = c_cli.selectbox("Cliente", list(cli_opts.keys()), format_func=lambda x: cli_opts[x])
-    
+
+    # --- 1. ADICIONAR AO CARRINHO ---
+    st.subheader("1. Produtos")
+    c_prod, c_qtd, c_add = st.columns([3, 1, 1])
+
     # Seleção de Produto
-    if not prod_opts: 
+    if not prod_opts:
         c_prod.warning("Precisa cadastrar produtos antes!")
         prod_id = None
-    else: 
+    else:
         prod_id = c_prod.selectbox("Produto", list(prod_opts.keys()), format_func=lambda x: prod_opts[x])
-    
-    # Validação de Estoque (Visualização Inicial)
+
+    # Validação de Estoque (Visualização Inicial), descontando o que já está no carrinho
     estoque_visual = 0
-    pode_vender = False
-    
-    if prod_id and not df_p.empty:
-        try:
-            estoque_visual = int(df_p.loc[df_p['id']==prod_id, 'estoque'].values[0])
-        except:
-            estoque_visual = 0
-        
+    if prod_id:
+        estoque_visual = int(produtos.get(prod_id, 'estoque', 0)) - reservado.get(prod_id, 0) - _qtd_no_carrinho(prod_id)
+
         if estoque_visual > 0:
-            st.info(f"📦 Estoque Atual (Cache): {estoque_visual} unidades")
-            pode_vender = True
+            st.info(f"📦 Estoque Disponível (Cache): {estoque_visual} unidades")
         else:
-            st.error(f"🚫 Produto sem estoque! (Atual: {estoque_visual}) - Reposição necessária.")
-            pode_vender = False
-
-    c1, c2 = st.columns(2)
-    
-    # Limita a quantidade ao estoque disponível se houver estoque
-    max_qtd = estoque_visual if estoque_visual > 0 else 1
-    qtd = c1.number_input("Quantidade", 1, max_qtd, 1, disabled=not pode_vender)
-    
-    # Busca o preço sugerido do produto selecionado
-    preco_sugerido = 0.0
-    nome_produto = ""
-    if prod_id and not df_p.empty:
-        try: 
-            val_orig = df_p.loc[df_p['id']==prod_id, 'valor_original'].values[0]
-            nome_produto = df_p.loc[df_p['id']==prod_id, 'nome'].values[0]
-            if val_orig is not None:
-                preco_sugerido = float(val_orig)
-        except: 
-            pass
-        
+            st.error(f"🚫 Produto sem estoque! (Disponível: {estoque_visual}) - Reposição necessária.")
+
+    pode_adicionar = estoque_visual > 0
+    max_qtd = estoque_visual if pode_adicionar else 1
+    qtd = c_qtd.number_input("Quantidade", 1, max_qtd, 1, disabled=not pode_adicionar)
+
+    c_add.write("")
+    if c_add.button("➕ Adicionar", disabled=not pode_adicionar):
+        carrinho.append({
+            'id_produto': int(prod_id),
+            'nome': prod_opts[prod_id],
+            'quantidade': int(qtd),
+            'valor_unitario': float(produtos.get(prod_id, 'valor_original', 0.0)),
+        })
+        st.rerun()
+
+    if not carrinho:
+        st.caption("🛒 Carrinho vazio.")
+        return
+
+    # --- 2. CARRINHO ---
+    df_cart = pd.DataFrame(carrinho)
+    df_cart['subtotal'] = df_cart['quantidade'] * df_cart['valor_unitario']
+    st.dataframe(
+        df_cart[['nome', 'quantidade', 'valor_unitario', 'subtotal']],
+        column_config={
+            "nome": "Produto",
+            "quantidade": "Qtd",
+            "valor_unitario": st.column_config.NumberColumn("Preço", format="R$ %.2f"),
+            "subtotal": st.column_config.NumberColumn("Subtotal", format="R$ %.2f"),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+    c_rem, c_limpa = st.columns([3, 1])
+    idx_rem = c_rem.selectbox("Remover item", [None] + list(range(len(carrinho))),
+                              format_func=lambda i: "Selecione..." if i is None else f"{carrinho[i]['quantidade']}x {carrinho[i]['nome']}")
+    if idx_rem is not None and c_rem.button("🗑️ Remover"):
+        carrinho.pop(idx_rem)
+        st.rerun()
+    c_limpa.write("")
+    if c_limpa.button("Limpar carrinho"):
+        carrinho.clear()
+        st.rerun()
+
+    total_carrinho = float(df_cart['subtotal'].sum())
+
     # Checkbox de Doação
-    is_donation = st.checkbox("É doação?", disabled=not pode_vender)
-    
+    is_donation = st.checkbox("É doação?")
+
     if is_donation:
-        valor = c2.number_input("Valor Total (R$)", value=0.0, disabled=True)
-        st.subheader("2. Pagamento")
+        valor = st.number_input("Valor Total (R$)", value=0.0, disabled=True)
+        st.subheader("3. Pagamento")
         pgto = st.selectbox("Forma de Pagamento", ["Doação"], disabled=True)
     else:
-        valor = c2.number_input("Valor Total (R$)", value=float(preco_sugerido * qtd), disabled=not pode_vender)
-        st.subheader("2. Pagamento")
-        pgto = st.selectbox("Forma de Pagamento", ["Pix", "Dinheiro", "Cartão", "Boleto"], disabled=not pode_vender)
-    
+        valor = st.number_input("Valor Total (R$)", value=total_carrinho)
+        st.subheader("3. Pagamento")
+        pgto = st.selectbox("Forma de Pagamento", ["Pix", "Dinheiro", "Cartão", "Boleto"])
+
     st.divider()
 
     # Botão de Envio
-    if st.button("✅ Finalizar Venda", type="primary", disabled=not pode_vender):
-        if prod_id and pode_vender:
+    if st.button("✅ Finalizar Venda", type="primary"):
+        try:
+            # --- CONFERÊNCIA DE ESTOQUE: uma consulta só para todos os itens ---
+            qtd_por_produto = df_cart.groupby('id_produto')['quantidade'].sum()
+            if db.fila:
+                # Sem ida ao servidor: saldo em cache menos o que ainda está na fila de escrita
+                # (o servidor confere de novo no envio e recusa a venda se faltar saldo)
+                estoque_real = {pid: int(produtos.get(pid, 'estoque', 0) or 0) - reservado.get(pid, 0)
+                                for pid in qtd_por_produto.index}
+            else:
+                res_check = db.select('produtos', 'id, estoque', [('id', 'in', [int(i) for i in qtd_por_produto.index])])
+                estoque_real = {r['id']: r['estoque'] or 0 for r in res_check}
+            faltando = [
+                f"{prod_opts.get(pid, pid)} (tem {estoque_real.get(pid, 0)}, pedido {q})"
+                for pid, q in qtd_por_produto.items() if estoque_real.get(pid, 0) < q
+            ]
+            if faltando:
+                st.error("⚠️ Estoque insuficiente: " + "; ".join(faltando))
+                st.stop()
+
+            data_final = datetime.combine(c_date, datetime.now().time())
+
+            payload_transacao = {
+                'valor_total': valor,
+                'pagamento': pgto,
+                'origem': 'Balcão',
+                'data_transacao': str(data_final)
+            }
+            if cli_id is not None:
+                payload_transacao['id_cliente'] = int(cli_id)
+            else:
+                payload_transacao['id_cliente'] = None
+
+            # Desconto/acréscimo no total é rateado proporcionalmente entre os itens
+            fator = (valor / total_carrinho) if total_carrinho else 0.0
+            itens = [{
+                'id_produto': i['id_produto'],
+                'quantidade': i['quantidade'],
+                'valor_unitario': round(i['valor_unitario'] * fator, 2)
+            } for i in carrinho]
+
+            # Uma chamada só: confere e baixa o estoque, grava transação,
+            # todos os itens e o resumo diário de forma atômica no servidor
             try:
-                # --- DOUBLE CHECK DE ESTOQUE ---
-                res_check = db.client.table('produtos').select('estoque').eq('id', prod_id).execute()
-                estoque_real = res_check.data[0]['estoque'] if res_check.data else 0
-                
-                if estoque_real < qtd:
-                    st.error(f"⚠️ Erro de Concorrência! O estoque real é {estoque_real}, insuficiente para vender {qtd}.")
-                    st.stop()
-                
-                data_final = datetime.combine(c_date, datetime.now().time())
-                
-                payload_transacao = {
-                    'valor_total': valor, 
-                    'pagamento': pgto, 
-                    'origem': 'Balcão',
-                    'data_transacao': str(data_final)
-                }
-                if cli_id is not None:
-                    payload_transacao['id_cliente'] = int(cli_id)
-                else:
-                        payload_transacao['id_cliente'] = None
-
-                # 1. Insere a transação
-                res_t = db.insert('transacoes', payload_transacao)
-                
-                # 2. Insere itens e atualiza estoque
-                if res_t.data:
-                    new_id = res_t.data[0]['id']
-                    
-                    db.insert('itens_transacao', {
-                        'id_transacao': new_id, 
-                        'id_produto': int(prod_id), 
-                        'quantidade': qtd, 
-                        'valor_unitario': valor
-                    })
-                    
-                    novo_estoque = estoque_real - qtd
-                    db.update('produtos', {'estoque': novo_estoque}, prod_id)
-                    
-                    # --- GERAÇÃO DE RECIBO ---
-                    nome_cliente = cli_opts.get(cli_id, "Consumidor Final")
-                    recibo = f"""
-                    ================================
-                                FARMÁCIA 
-                    ================================
-                    Data: {data_final.strftime('%d/%m/%Y %H:%M')}
-                    Cliente: {nome_cliente}
-                    --------------------------------
-                    Produto: {nome_produto}
-                    Qtd: {qtd}
-                    Total: R$ {valor:.2f}
-                    Pagamento: {pgto}
-                    --------------------------------
-                    Obrigado pela preferência!
-                    ================================
-                    """
-                    st.session_state['ultimo_recibo'] = recibo
-                    st.session_state['refresh'] = True
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Erro ao registrar venda: {e}")
\ No newline at end of file
+                res_t = db.registrar_venda(payload_transacao, itens)
+            except EstoqueInsuficiente as e:
+                st.error(f"⚠️ Erro de Concorrência! Estoque insuficiente para {prod_opts.get(e.id_produto, 'um dos produtos')}.")
+                st.stop()
+
+            if res_t:
+                # --- GERAÇÃO DE RECIBO ---
+                nome_cliente = cli_opts.get(cli_id, "Consumidor Final")
+                st.session_state['ultimo_recibo'] = _montar_recibo(data_final, nome_cliente, carrinho, valor, pgto)
+                carrinho.clear()
+                st.session_state['refresh'] = True
+                st.rerun()
+        except Exception as e:
+            st.error(f"Erro ao registrar venda: {e}")